@@ -0,0 +1,261 @@
+# api.py
+"""
+Headless JSON API around the calculator (tornado, so asyncio-based).
+
+    POST /calculate       one scenario → calculate() outputs
+    POST /batch           {"scenarios": [...]} → one result per scenario
+    GET  /catalog/<key>   catalog specs by minerstat id or name
+    GET  /health          market snapshot age/source and cache stats
+    GET  /metrics         spans and counters in Prometheus text format
+
+A scenario has chp_mw, load_factor, roc_rtfo and eii (one of ROC_RTFO_OPTIONS /
+EII_OPTIONS), mining_mw and a miner: miner_model (a MINER_SPECS key), miner_id (catalog
+id or name, costed like the app's dropdown) or explicit j_th + cost_per_mw_gbp, and
+optionally reward_source ("subsidy" or "blocks", as in calculate(); default
+REWARD_SOURCE). Every request shares the one warm market snapshot (refreshed in the
+background) and the one catalog; results for identical inputs under the same market
+are memoized in an LRU.
+
+    python api.py [--port 8765]
+"""
+from __future__ import annotations
+import argparse, asyncio, json, math, threading
+from typing import Optional
+
+import numpy as np
+import tornado.web
+from cachetools import LRUCache
+
+from calculator import _baseline_cost_per_mw, _calculate_arrays, _with_reward_source
+from constants import (
+    MINER_SPECS, API_PORT, API_CACHE_SIZE, API_MAX_BATCH, REWARD_SOURCE, ROC_RTFO_OPTIONS, EII_OPTIONS,
+)
+from market_data import _CACHE as _MARKET_CACHE, get_market_snapshot
+import metrics
+
+SITE_FIELDS = ("chp_mw", "load_factor", "roc_rtfo", "eii", "mining_mw")
+
+
+class BadRequest(ValueError):
+    """Invalid scenario; reported to the client as HTTP 400."""
+
+
+class ResultCache:
+    """Thread-safe LRU of calculate() results keyed by (inputs, market)."""
+
+    def __init__(self, maxsize: int = API_CACHE_SIZE):
+        self._lru: LRUCache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._lru.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.inc("api_result_cache", result="miss" if value is None else "hit")
+        return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._lru[key] = value
+
+    def stats(self) -> dict:
+        return {"size": len(self._lru), "maxsize": self._lru.maxsize,
+                "hits": self.hits, "misses": self.misses}
+
+
+RESULTS = ResultCache()
+
+
+def _float(body: dict, name: str) -> float:
+    try:
+        value = float(body[name])
+    except KeyError:
+        raise BadRequest(f"missing field: {name}") from None
+    except (TypeError, ValueError):
+        raise BadRequest(f"{name} must be a number") from None
+    if not math.isfinite(value):
+        raise BadRequest(f"{name} must be finite")
+    return value
+
+def _miner(body: dict) -> tuple:
+    """(j_th, cost_per_mw_gbp) for a scenario's miner."""
+    if "miner_model" in body:
+        spec = MINER_SPECS.get(body["miner_model"])
+        if spec is None:
+            raise BadRequest(f"unknown miner_model: {body['miner_model']}")
+        return float(spec["j_th"]), float(spec["cost_per_mw_gbp"])
+    if "miner_id" in body:
+        from asics_data import get_specs_by_id
+        specs = get_specs_by_id(str(body["miner_id"]))
+        if not specs or not specs["efficiency_j_th"]:
+            raise BadRequest(f"unknown miner_id: {body['miner_id']}")
+        return specs["efficiency_j_th"], _baseline_cost_per_mw()
+    if "j_th" in body:
+        return _float(body, "j_th"), _float(body, "cost_per_mw_gbp")
+    raise BadRequest("need miner_model, miner_id or j_th + cost_per_mw_gbp")
+
+def scenario_key(body: dict) -> tuple:
+    """Normalised, hashable inputs: the memoization key (without the market)."""
+    if not isinstance(body, dict):
+        raise BadRequest("scenario must be a JSON object")
+    for name, options in (("roc_rtfo", ROC_RTFO_OPTIONS), ("eii", EII_OPTIONS)):
+        if not isinstance(body.get(name), str) or body[name] not in options:
+            raise BadRequest(f"{name} must be one of {', '.join(options)}")
+    reward_source = body.get("reward_source", REWARD_SOURCE)
+    if reward_source not in ("subsidy", "blocks"):
+        raise BadRequest(f"unknown reward_source: {reward_source}")
+    return (_float(body, "chp_mw"), _float(body, "load_factor"), body["roc_rtfo"], body["eii"],
+            _float(body, "mining_mw")) + _miner(body) + (reward_source,)
+
+def _network_btc_per_day(reward_source: str, market: tuple):
+    """The network_btc_per_day a reward source pays under `market` (None for the subsidy)."""
+    try:
+        return _with_reward_source({}, reward_source, market).get("network_btc_per_day")
+    except ValueError as e:      # e.g. an empty block store
+        raise BadRequest(str(e)) from None
+
+
+def evaluate_many(bodies: list, market: tuple) -> list:
+    """
+    Results for many scenarios: cached rows are reused, the rest computed in one pass per
+    reward source. The reward paid is part of the cache key, so a block-store update
+    never serves a stale "blocks" result.
+    """
+    keys = [scenario_key(b) for b in bodies]
+    rewards = {src: _network_btc_per_day(src, market) for src in {k[-1] for k in keys}}
+    cache_keys = [(k, market, rewards[k[-1]]) for k in keys]
+    out = [RESULTS.get(k) for k in cache_keys]
+    names = SITE_FIELDS + ("j_th", "cost_per_mw_gbp")
+    for src in rewards:
+        todo = [i for i, r in enumerate(out) if r is None and keys[i][-1] == src]
+        if not todo:
+            continue
+        cols = zip(*(keys[i][:-1] for i in todo))
+        scenarios = _with_reward_source({k: np.asarray(c) for k, c in zip(names, cols)}, src, market)
+        arrays = _calculate_arrays(scenarios, market)
+        for row, i in enumerate(todo):
+            result = {k: _jsonable(v[row]) for k, v in arrays.items()}
+            RESULTS.put(cache_keys[i], result)
+            out[i] = result
+    return out
+
+def _jsonable(v):
+    v = v.item() if hasattr(v, "item") else v
+    return None if isinstance(v, float) and not math.isfinite(v) else v
+
+
+class _Handler(tornado.web.RequestHandler):
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json")
+
+    def body_json(self):
+        try:
+            return json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise BadRequest("body is not valid JSON") from None
+
+    def write_error(self, status_code, **kwargs):
+        exc = kwargs.get("exc_info", (None, None))[1]
+        message = str(exc) if isinstance(exc, BadRequest) else self._reason
+        self.finish({"error": message})
+
+    def _handle_request_exception(self, e):
+        if isinstance(e, BadRequest):
+            self.send_error(400, exc_info=(type(e), e, e.__traceback__))
+        else:
+            super()._handle_request_exception(e)
+
+
+def _needs_catalog(bodies) -> bool:
+    return any(isinstance(b, dict) and "miner_id" in b for b in bodies)
+
+
+class CalculateHandler(_Handler):
+    async def post(self):
+        body = self.body_json()
+        snap = get_market_snapshot()
+        if _needs_catalog([body]):   # the catalog may have to load or refresh: keep the loop free
+            result = await asyncio.get_running_loop().run_in_executor(None, evaluate_many, [body], snap.market)
+        else:
+            result = evaluate_many([body], snap.market)
+        self.write({"result": result[0], "market": _market_info(snap)})
+
+
+class BatchHandler(_Handler):
+    async def post(self):
+        scenarios = self.body_json().get("scenarios")
+        if not isinstance(scenarios, list):
+            raise BadRequest("scenarios must be a list")
+        if len(scenarios) > API_MAX_BATCH:
+            raise BadRequest(f"at most {API_MAX_BATCH} scenarios per batch")
+        snap = get_market_snapshot()
+        results = await asyncio.get_running_loop().run_in_executor(None, evaluate_many, scenarios, snap.market)
+        self.write({"results": results, "market": _market_info(snap)})
+
+
+class CatalogHandler(_Handler):
+    async def get(self, key):
+        from asics_data import get_specs_by_id
+        specs = await asyncio.get_running_loop().run_in_executor(None, get_specs_by_id, key)
+        if specs is None:
+            raise tornado.web.HTTPError(404, reason=f"unknown miner: {key}")
+        self.write({k: _jsonable(v) for k, v in specs.items()})   # no bare NaN in the JSON
+
+
+class HealthHandler(_Handler):
+    def get(self):
+        self.write({"market": _market_info(get_market_snapshot()), "cache": RESULTS.stats()})
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.write(metrics.prometheus_text())
+
+
+def _log_request(handler: tornado.web.RequestHandler) -> None:
+    name = type(handler).__name__.removesuffix("Handler").lower()
+    metrics.observe(f"api_{name}", handler.request.request_time())
+    metrics.inc("api_requests", handler=name, status=handler.get_status())
+
+
+def _market_info(snap) -> dict:
+    return {"btc_price": snap.btc_price, "hashrate": snap.hashrate, "source": snap.source,
+            "age_seconds": _jsonable(np.float64(round(snap.age_seconds(), 1)))}
+
+
+def make_app() -> tornado.web.Application:
+    return tornado.web.Application([
+        (r"/calculate", CalculateHandler),
+        (r"/batch", BatchHandler),
+        (r"/catalog/(.+)", CatalogHandler),
+        (r"/health", HealthHandler),
+        (r"/metrics", MetricsHandler),
+    ], log_function=_log_request)
+
+
+async def serve(port: int = API_PORT, ready: Optional[asyncio.Event] = None) -> None:
+    _MARKET_CACHE.start()
+    # warm the catalog off the loop so the first /catalog request does not pay for it
+    from asics_data import get_catalog
+    asyncio.get_running_loop().run_in_executor(None, lambda: get_catalog().df())
+    make_app().listen(port)
+    if ready is not None:
+        ready.set()
+    await asyncio.Event().wait()
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Calculator JSON API")
+    ap.add_argument("--port", type=int, default=API_PORT)
+    args = ap.parse_args(argv)
+    print(f"listening on http://127.0.0.1:{args.port}")
+    asyncio.run(serve(args.port))
+
+
+if __name__ == "__main__":
+    main()
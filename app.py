@@ -2,222 +2,529 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import contextlib
 from datetime import datetime
 
-from calculator import calculate
+import metrics
+
+from response_surface import evaluate
+from market_data import get_market_snapshot
 from constants import *  # uses MINER_SPECS, BLOCKS_PER_DAY, BLOCK_REWARD, POOL_FEE_PCT, etc.
 from asics_data import (
     get_dropdown_options_from_constants,
-    ensure_today_csv,
-    get_specs_by_id,   # make sure this exists in asics_data.py
+    ensure_today_snapshot,
+    get_catalog,
+    get_specs_by_id,
 )
+from calculator import _baseline_cost_per_mw
 
 st.set_page_config(page_title="AD → BTC Mining Calculator", layout="centered")
+_trace = metrics.start_trace()
+_rerun = metrics.span("rerun").start()
+_debug = st.query_params.get("debug") == "1"
 
-st.subheader("ASIC picker")
-
-col1, col2 = st.columns([1, 1])
-with col1:
-    if st.button("Refresh list"):
-        st.cache_data.clear()
-        ensure_today_csv()   # will fetch if today's CSV is missing
-        st.success("Refreshed")
-
-@st.cache_data(ttl=3600)
-def _opts():
-    return get_dropdown_options_from_constants()
-
-opts = _opts()
-labels = [l for (l, _) in opts]
-values = {l: v for (l, v) in opts}
-
-choice = st.selectbox("Choose a miner", labels or ["No options"], index=0)
-selected_id = values.get(choice)
-st.caption(f"Selected id: `{selected_id}`")
-
-# === Use dropdown miner to drive the calculator ===
-dynamic_key = "DYNAMIC"
-selected_specs = get_specs_by_id(selected_id) if selected_id else None
-
-def _baseline_spec():
-    """Pick the first spec in MINER_SPECS as a baseline for any required keys."""
-    try:
-        first_key = next(iter(MINER_SPECS.keys()))
-        return dict(MINER_SPECS[first_key])
-    except Exception:
-        return {}
-
-def _put_dynamic_spec():
-    """Inject a DYNAMIC miner that matches calculator's expected keys, merged with a baseline."""
-    if not selected_specs:
-        return False
-    ths = selected_specs.get("hashrate_ths")
-    watts = selected_specs.get("power_w")
-    j_th = selected_specs.get("efficiency_j_th")
-    if not (ths and watts):
-        return False
-
-    base = _baseline_spec()
-
-    # Start from baseline so all cost/finance fields exist, then override core hardware fields
-    dynamic = dict(base)
-    dynamic.update({
-        "name": f"{selected_specs.get('brand','')} {selected_specs.get('name','')}".strip(),
-        # Calculator-expected keys:
-        "j_th": j_th,          # efficiency (J/TH)
-        "th_s": ths,           # hashrate TH/s
-        "watts": watts,        # power W
-        # Friendly duplicate keys for UI/use elsewhere:
-        "efficiency_j_th": j_th,
-        "hashrate_ths": ths,
-        "power_w": watts,
-    })
+@contextlib.contextmanager
+def _fragment_span(name):
+    # nested in the rerun's trace; a fragment rerunning on its own gets a trace of its own
+    with metrics.section(name) as trace:
+        yield
+    if trace is not None and _debug:
+        st.dataframe(pd.DataFrame(metrics.trace_rows(trace)), hide_index=True)
 
-    # Ensure any absolutely required finance fields exist (fallbacks if baseline lacked them)
-    dynamic.setdefault("cost_per_mw_gbp", base.get("cost_per_mw_gbp", 0))
-    dynamic.setdefault("capex_per_mw_gbp", base.get("capex_per_mw_gbp", 0))
-    dynamic.setdefault("opex_per_mw_gbp", base.get("opex_per_mw_gbp", 0))
-
-    MINER_SPECS[dynamic_key] = dynamic
-    return True
-
-if not _put_dynamic_spec():
-    # If dropdown lookup failed, fall back to the first static spec
-    dynamic_key = next(iter(MINER_SPECS.keys()))
-
-# === INPUTS ===
-with st.sidebar:
-    st.header("AD Plant")
-    chp_mw = st.slider("CHP Size (MW)", 0.1, 5.0, 1.0, 0.1)
-    load_factor = st.slider("Load Factor (%)", 80, 98, 95, 1) / 100
-    roc_rtfo = st.selectbox("ROC/RTFO Status", [
-        "ROC + RTFO (5% min export)", "ROC only (10% min export)", "None (0% min export)"
-    ])
-    eii = st.selectbox("EII Exempt?", ["Yes (0 CCL)", "No"])
-
-    st.header("Mining Setup")
-    max_mining = min(chp_mw * 0.95, 5.0)
-    mining_mw = st.slider("Mining Power (MW)", 0.05, chp_mw * 1.1, min(1.0, max_mining), 0.05)
-
-    # Toggle: use dropdown-selected miner or legacy list
-    use_dropdown = st.toggle("Use dropdown miner", value=True)
-    if use_dropdown and dynamic_key in MINER_SPECS:
-        miner_model = dynamic_key
-        st.caption(f"Using dropdown miner: {MINER_SPECS[dynamic_key].get('name','(unknown)')}")
-    else:
-        miner_model = st.selectbox("Miner Model (legacy list)", list(MINER_SPECS.keys()), index=0)
-
-    st.caption("Cooling: Immersion using digestate heat → **£0 cost**")
-
-# === CALCULATE ===
-results = calculate(chp_mw, load_factor, roc_rtfo, eii, miner_model, mining_mw)
-
-# === UI ===
-st.title("AD Plant → Bitcoin Mining Calculator")
-st.caption(f"Updated: {datetime.now().strftime('%H:%M:%S')} • BTC £{results['btc_price']:,} • {results['hashrate']} EH/s")
-
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.metric("BTC / year", f"{results['total_btc']:.4f}", f"£{results['revenue_btc']:,.0f}")
-with col2:
-    st.metric("£ / MWh net", f"£{results['net_per_mwh']:.1f}")
-with col3:
-    st.metric("Payback", f"{results['payback_months']:.0f} months")
-
-# === Chart ===
-df_chart = pd.DataFrame({
-    "Category": [
-        f"Grid Savings (£{results['grid_savings']:,.0f})",
-        f"Capex + Opex (£{results['capex_annuity'] + results['opex_annual']:,.0f})",
-        f"BTC Revenue (£{results['revenue_btc']:,.0f})"
-    ],
-    "GBP": [
-        results['grid_savings'],
-        results['capex_annuity'] + results['opex_annual'],
-        results['revenue_btc']
-    ]
-})
-fig = px.pie(
-    df_chart, values="GBP", names="Category", hole=0.4,
-    color_discrete_sequence=["#2a9d8f", "#e76f51", "#f4a261"],
-    title="Year 1 Revenue Breakdown"
-)
-fig.update_traces(textinfo="percent", textposition="inside")
-fig.update_layout(height=400, legend=dict(orientation="h", yanchor="bottom", y=-0.2))
-st.plotly_chart(fig, use_container_width=True)
-
-# === Transparency ===
-with st.expander("Detailed Breakdown"):
-    st.write(f"**Annual MWh**: {results['annual_mwh']:,.0f} | **Max Mining MWh**: {results['max_mining_mwh']:,.0f}")
-    st.write(f"**BTC Revenue**: £{results['revenue_btc']:,.0f} ({results['total_btc']:.6f} BTC @ £{results['btc_price']:,.0f})")
-    st.write(f"**Grid savings**: £{results['grid_savings']:,.0f} (@ £72/MWh if EII)")
-    st.write(f"**Capex annuity**: £{results['capex_annuity']:,.0f} | **Opex**: £{results['opex_annual']:,.0f}")
-
-with st.expander("Bitcoin mining: full transparency"):
-    st.markdown("<small>These drive 98% of BTC revenue uncertainty.</small>", unsafe_allow_html=True)
-    col1, col2, col3 = st.columns(3)
+def _on_demand(label, key, compute):
+    """
+    compute()'s result once the user has run it for these inputs (`key`), else None.
+    Heavy stages sit behind this so a sidebar rerun never recomputes them: only the
+    button does, and the last result is kept per section in session state.
+    """
+    slot = f"on_demand:{label}"
+    if st.button(label, key=f"{slot}:run"):
+        st.session_state[slot] = (key, compute())
+    done = st.session_state.get(slot)
+    if done is None or done[0] != key:
+        st.caption("Not run for the current inputs yet.")
+        return None
+    return done[1]
+
+try:
+    # Stages: inputs → market (process-wide cache) → catalog ranking (keyed on site, market and
+    # catalog version) → miner spec (session state) → economics (response surface) → charts.
+    # Widgets that only affect one section live in a fragment, so using them reruns just that
+    # section. MINER_SPECS is shared by every session and is never written to.
+
+    # === INPUTS ===
+    with st.sidebar:
+        st.header("AD Plant")
+        chp_mw = st.slider("CHP Size (MW)", 0.1, 5.0, 1.0, 0.1)
+        load_factor = st.slider("Load Factor (%)", 80, 98, 95, 1) / 100
+        roc_rtfo = st.selectbox("ROC/RTFO Status", ROC_RTFO_OPTIONS)
+        eii = st.selectbox("EII Exempt?", EII_OPTIONS)
+
+        st.header("Mining Setup")
+        max_mining = min(chp_mw * 0.95, 5.0)
+        mining_mw = st.slider("Mining Power (MW)", 0.05, chp_mw * 1.1, min(1.0, max_mining), 0.05)
+        use_blocks = st.toggle("Include transaction fees (block data)", value=REWARD_SOURCE == "blocks")
+
+    market = get_market_snapshot()
+    site = {"chp_mw": chp_mw, "load_factor": load_factor, "roc_rtfo": roc_rtfo, "eii": eii, "mining_mw": mining_mw}
+
+    # Engines and plotly.graph_objects are imported in the sections that use them, so a cold
+    # start only pays for what the first render draws.
+    blocks = None
+    if use_blocks:
+        from block_store import BLOCKS
+        BLOCKS.refresh_async()   # tops up in the background; this rerun uses what is stored
+        blocks = BLOCKS.latest()
+    if use_blocks and blocks is None:
+        st.sidebar.info("No block data stored yet (fetching in the background); using the subsidy-only reward.")
+    reward_source = "blocks" if blocks is not None else "subsidy"
+    # cache key for every stage that pays BTC: the source and, for blocks, the store's tip
+    reward = (reward_source, None if blocks is None else int(blocks.name))
+
+    @st.cache_data(ttl=3600, max_entries=256)
+    def _opts(site, market, catalog_version, reward):
+        # whole catalog ranked by economics at this site, then a brand-diverse top six
+        return get_dropdown_options_from_constants(site=site, market=market, reward_source=reward[0])
+
+    st.subheader("ASIC picker")
+
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        if st.button("Refresh list"):
+            # only catalog-derived state; market data, surfaces and risk tables stay warm
+            ensure_today_snapshot()   # will fetch if today's snapshot is missing
+            get_catalog().invalidate()
+            _opts.clear()
+            st.session_state.pop("dropdown_miner", None)
+            st.success("Refreshed")
+
+    opts = _opts(site, market.market, get_catalog().version, reward)
+    labels = [l for (l, _) in opts]
+    values = {l: v for (l, v) in opts}
 
-    # 1. Network data
+    choice = st.selectbox("Choose a miner", labels or ["No options"], index=0)
+    selected_id = values.get(choice)
+    st.caption(f"Selected id: `{selected_id}`")
+
+    # === Use dropdown miner to drive the calculator ===
+    def _dropdown_spec(miner_id):
+        """
+        Calculator spec (j_th, cost_per_mw_gbp plus display fields) for the dropdown pick, or
+        None if the catalog has no usable row. Kept in session state per id, so reruns that
+        only move a slider skip the lookup. Catalog rows carry no price: costed like the
+        first MINER_SPECS entry.
+        """
+        cached = st.session_state.get("dropdown_miner")
+        if cached is not None and cached[0] == miner_id:
+            return cached[1]
+        specs = get_specs_by_id(miner_id) if miner_id else None
+        spec = None
+        if specs and specs["hashrate_ths"] and specs["power_w"]:
+            spec = {
+                "name": f"{specs.get('brand') or ''} {specs.get('name') or ''}".strip(),
+                "j_th": specs["efficiency_j_th"] or specs["power_w"] / specs["hashrate_ths"],
+                "cost_per_mw_gbp": _baseline_cost_per_mw(),
+                "th_s": specs["hashrate_ths"],
+                "watts": specs["power_w"],
+            }
+        st.session_state["dropdown_miner"] = (miner_id, spec)
+        return spec
+
+    dropdown_spec = _dropdown_spec(selected_id)
+
+    with st.sidebar:
+        # Toggle: use dropdown-selected miner or legacy list
+        use_dropdown = st.toggle("Use dropdown miner", value=True)
+        if use_dropdown and dropdown_spec is not None:
+            miner = dropdown_spec
+            st.caption(f"Using dropdown miner: {miner['name'] or '(unknown)'}")
+        else:
+            # If dropdown lookup failed, fall back to the static specs
+            miner_model = st.selectbox("Miner Model (legacy list)", list(MINER_SPECS.keys()), index=0)
+            miner = {"name": miner_model, **MINER_SPECS[miner_model]}
+
+        st.caption("Cooling: Immersion using digestate heat → **£0 cost**")
+
+    # === CALCULATE ===
+    # served from the precomputed response surface once it is built for this market/miner
+    results = evaluate(chp_mw, load_factor, roc_rtfo, eii, None, mining_mw, market.market, miner_spec=miner,
+                       reward_source=reward_source)
+
+    def _market_age_label(snap):
+        if snap.source == "fallback":
+            return "no live data yet (using Nov 2025 fallback values)"
+        age = snap.age_seconds()
+        ago = f"{age:.0f}s ago" if age < 120 else f"{age / 60:.0f} min ago" if age < 7200 else f"{age / 3600:.1f} h ago"
+        return f"as of {datetime.fromtimestamp(snap.fetched_at).strftime('%H:%M:%S')} ({ago})"
+
+    # === UI ===
+    st.title("AD Plant → Bitcoin Mining Calculator")
+    st.caption(f"Market data {_market_age_label(market)} • BTC £{results['btc_price']:,} • {results['hashrate']} EH/s")
+
+    col1, col2, col3 = st.columns(3)
     with col1:
-        st.write("**<u>1. Network data</u>**", unsafe_allow_html=True)
-        st.write("External variables")
-        st.write("**a) Network Hashrate (Hn)**")
-        st.write(f"{results['hashrate']:,} EH/s live")
-        st.write("**b) Blocks / day**")
-        st.write(f"{BLOCKS_PER_DAY}")
-        st.write("**c) Block Subsidy**")
-        st.write(f"{BLOCK_REWARD} BTC est.")
-        st.write("**d) Pool fee (assumed)**")
-        st.write(f"{POOL_FEE_PCT:.0%}")
-        st.write("**e) BTC price**")
-        st.write(f"£{results['btc_price']:,}")
-
-    # 2. Hardware data
+        st.metric("BTC / year", f"{results['total_btc']:.4f}", f"£{results['revenue_btc']:,.0f}")
     with col2:
-        st.write("**<u>2. Hardware data</u>**", unsafe_allow_html=True)
-        st.write("Miner specific")
-        hw = MINER_SPECS.get(miner_model, {})
-        ths = hw.get("th_s", hw.get("hashrate_ths", "n/a"))
-        watts = hw.get("watts", hw.get("power_w", "n/a"))
-        jth = hw.get("j_th", hw.get("efficiency_j_th", "n/a"))
-        st.write("**a) Miner hashrate (Hm)**")
-        st.write(f"{ths} TH/s")
-        st.write("**b) Miner power**")
-        st.write(f"{watts} W")
-        st.write("**c) Miner efficiency**")
-        st.write(f"{jth} J/TH")
-
-    # 3. Site specific inputs
+        st.metric("£ / MWh net", f"£{results['net_per_mwh']:.1f}")
     with col3:
-        st.write("**<u>3. Site specific inputs</u>**", unsafe_allow_html=True)
-        st.write("Electricity & overheads")
-        st.write("**a) Power capacity**")
-        st.write(f"{mining_mw} MW")
-        st.write("**b) Electricity cost (Ce)**")
-        st.write("Model input (site-specific)")
-        st.write("**c) Cooling (Cc)**")
-        st.write("£0 using digestate heat")
-        st.write("**d) Maintenance (Cm)**")
-        st.write("Hydro, typically <1% failure")
-        st.write("**e) Number of miners**")
-        st.write("Derived: site MW / miner power")
-
-    st.caption("**<u>4. Economics</u>**", unsafe_allow_html=True)
-    st.markdown("<small>These drive 98% of BTC revenue uncertainty.</small>", unsafe_allow_html=True)
-    col1, col2 = st.columns(2)
-    with col1:
-        st.write("1. BTC Price", f"£{results['btc_price']:,}")
-        st.write("2. Network Hashrate", f"{results['hashrate']:,} EH/s")
-        st.write("3. Block Reward", f"{BLOCK_REWARD} BTC")
-    st.caption("Next halving: ~April 2028 → reward → 1.5625 BTC")
-
-    st.caption("Calculations")
-    st.caption("Notes:")
-    st.caption("Block reward = BLOCK_SUBSIDY + TX_FEE; TX_FEE not included in this model yet.")
-    st.write("1. Miner specific calculations")
-    st.write("daily_revenue_btc = Hm/Hn * blocks_per_day * block_reward")
-    st.write("daily_revenue = daily_revenue_btc * btc_price")
-    st.write("daily_opex = ((W * 24)/1000) * Ce + Cc + Cm")
-    st.write("Daily profit = daily_revenue - daily_opex")
-
-st.caption("Built for AD operators • Share: ad-bmc.streamlit.app")
+        st.metric("Payback", f"{results['payback_months']:.0f} months")
+
+    # === Chart ===
+    _render = metrics.span("render_pie_chart").start()
+    df_chart = pd.DataFrame({
+        "Category": [
+            f"Grid Savings (£{results['grid_savings']:,.0f})",
+            f"Capex + Opex (£{results['capex_annuity'] + results['opex_annual']:,.0f})",
+            f"BTC Revenue (£{results['revenue_btc']:,.0f})"
+        ],
+        "GBP": [
+            results['grid_savings'],
+            results['capex_annuity'] + results['opex_annual'],
+            results['revenue_btc']
+        ]
+    })
+    fig = px.pie(
+        df_chart, values="GBP", names="Category", hole=0.4,
+        color_discrete_sequence=["#2a9d8f", "#e76f51", "#f4a261"],
+        title="Year 1 Revenue Breakdown"
+    )
+    fig.update_traces(textinfo="percent", textposition="inside")
+    fig.update_layout(height=400, legend=dict(orientation="h", yanchor="bottom", y=-0.2))
+    st.plotly_chart(fig, use_container_width=True)
+    _render.stop()
+
+    # === Transparency ===
+    with st.expander("Detailed Breakdown"):
+        st.write(f"**Annual MWh**: {results['annual_mwh']:,.0f} | **Max Mining MWh**: {results['max_mining_mwh']:,.0f}")
+        st.write(f"**BTC Revenue**: £{results['revenue_btc']:,.0f} ({results['total_btc']:.6f} BTC @ £{results['btc_price']:,.0f})")
+        st.write(f"**Grid savings**: £{results['grid_savings']:,.0f} (@ £72/MWh if EII)")
+        st.write(f"**Capex annuity**: £{results['capex_annuity']:,.0f} | **Opex**: £{results['opex_annual']:,.0f}")
+
+    def _cost_spec(miner):
+        """The part of a miner spec the economics depend on: the cache key for derived stages."""
+        return {"j_th": float(miner["j_th"]), "cost_per_mw_gbp": float(miner["cost_per_mw_gbp"])}
+
+    @st.cache_data(ttl=600, max_entries=64, show_spinner="Simulating price/hashrate paths…")
+    def _risk_table(chp_mw, load_factor, roc_rtfo, eii, miner_spec, mining_mw, _snapshot, snapshot_key, reward):
+        from monte_carlo import run_monte_carlo
+        mc = run_monte_carlo(chp_mw, load_factor, roc_rtfo, eii, None, mining_mw, snapshot=_snapshot,
+                             miner_spec=miner_spec, n_paths=20_000, seed=0, reward_source=reward[0])
+        table = mc.percentiles().loc[["btc_per_year", "net_per_mwh", "payback_months"]]
+        table.index = ["BTC / year", "£ / MWh net", "Payback (months)"]
+        return table, mc.params
+
+    @st.fragment
+    def _risk_section(site, miner_spec, snapshot, reward):
+        # 20,000 paths: run on request, never on a sidebar rerun
+        with _fragment_span("fragment_risk"):
+            args = (site["chp_mw"], site["load_factor"], site["roc_rtfo"], site["eii"], miner_spec,
+                    site["mining_mw"], snapshot, (snapshot.market, snapshot.fetched_at), reward)
+            out = _on_demand("Simulate", (site, miner_spec, args[-2], reward), lambda: _risk_table(*args))
+            if out is None:
+                return
+            risk, gbm = out
+            st.dataframe(risk.style.format("{:,.2f}"))
+            st.caption(f"20,000 correlated GBM paths over 1 year • price σ {gbm.price_sigma:.0%}, "
+                       f"hashrate drift {gbm.hashrate_mu:+.0%}/yr, ρ {gbm.rho:.2f}")
+
+    with st.expander("Risk range: BTC price & hashrate (Monte Carlo)"):
+        _risk_section(site, _cost_spec(miner), market, reward)
+
+    @st.cache_resource(max_entries=64)
+    def _projection(site, miner_spec, market, horizon, reward):
+        # shared read-only across sessions; the arrays are not copied per rerun
+        from projection import project
+        miners = pd.DataFrame([miner_spec])
+        return project(site["chp_mw"], site["load_factor"], site["roc_rtfo"], site["eii"], site["mining_mw"],
+                       miners=miners, market=market, horizon_years=horizon, reward_source=reward[0])
+
+    @st.fragment
+    def _projection_section(site, miner_spec, market, reward):
+        # the horizon slider reruns only this section
+        with _fragment_span("fragment_projection"):
+            horizon = st.select_slider("Horizon (years)", options=[5, 6, 7, 8, 9, 10], value=5)
+            proj = _projection(site, miner_spec, market, horizon, reward)
+            row = proj.summary().iloc[0]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("NPV (10%)", f"£{row['npv']:,.0f}")
+            with col2:
+                st.metric("IRR", "n/a" if pd.isna(row["irr"]) else f"{row['irr']:.0%}")
+            with col3:
+                st.metric("Payback date", "not reached" if pd.isna(row["payback_date"])
+                          else pd.Timestamp(row["payback_date"]).strftime("%b %Y"))
+            df_cash = pd.DataFrame({"Date": proj.dates, "Cumulative cash (£)": proj.cumulative[0]})
+            st.plotly_chart(px.line(df_cash, x="Date", y="Cumulative cash (£)", height=300),
+                            use_container_width=True)
+            st.caption(f"Upfront capex £{row['capex']:,.0f} • subsidy halves on estimated halving dates • "
+                       f"{PROJECTION_HASHRATE_GROWTH:.0%}/yr hashrate growth • "
+                       f"{PROJECTION_MINER_DEGRADATION:.0%}/yr miner degradation • flat BTC price"
+                       + (" • fees flat at today's, in BTC" if reward[0] == "blocks" else ""))
+
+    with st.expander("Multi-year projection (halvings, hashrate growth)"):
+        _projection_section(site, _cost_spec(miner), market.market, reward)
+
+    @st.fragment
+    def _backtest_section(site, miner_spec, reward):
+        # replays recorded prices/hashrate; the date picker reruns only this section
+        with _fragment_span("fragment_backtest"):
+            from backtest import backtest
+            from market_history import HISTORY as MARKET_HISTORY
+            window = MARKET_HISTORY.window()
+            if window is None:
+                st.info("No market history recorded yet: it builds up from each live price/hashrate fetch.")
+                return
+            lo, hi = (pd.Timestamp(d).date() for d in window)
+            since = st.date_input("Since", value=lo, min_value=lo, max_value=hi)
+            bt = backtest(site["chp_mw"], site["load_factor"], site["roc_rtfo"], site["eii"], site["mining_mw"],
+                          miners=pd.DataFrame([miner_spec]), start=since)
+            row = bt.summary().iloc[0]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("BTC mined", f"{row['btc']:.4f}")
+            with col2:
+                st.metric("Net revenue", f"£{row['net_revenue']:,.0f}")
+            with col3:
+                st.metric("£ / MWh net", f"£{row['net_per_mwh']:.1f}")
+            df_net = pd.DataFrame({"Date": bt.dates, "Cumulative net (£)": bt.net.cumsum(axis=1)[0]})
+            st.plotly_chart(px.line(df_net, x="Date", y="Cumulative net (£)", height=300),
+                            use_container_width=True)
+            st.caption(f"{len(bt.dates)} days from {bt.dates[0]} • {bt.coverage:.0%} of days with recorded "
+                       f"prices and hashrate (gaps carry the last value) • capex as a 20%/yr annuity"
+                       + (" • subsidy only (no per-day fee history)" if reward[0] == "blocks" else ""))
+
+    @st.cache_data(ttl=3600, max_entries=64)
+    def _catalog_break_even(site, market, catalog_version, reward):
+        # every catalog model at once; the dataframe is small enough to hand to each session
+        from breakeven import break_even
+        be = break_even(market=market, reward_source=reward[0], **site)
+        return be[["brand", "name", "efficiency_J_per_TH", "breakeven_btc_price", "breakeven_hashrate",
+                   "breakeven_load_factor", "price_headroom"]].head(10)
+
+    @st.fragment
+    def _catalog_break_even_section(site, market, reward):
+        # every catalog model: run on request, never on a sidebar rerun
+        with _fragment_span("fragment_catalog_break_even"):
+            st.caption("Most robust catalog models at this site (lowest break-even BTC price)")
+            version = get_catalog().version
+            table = _on_demand("Rank the catalog", (site, market, version, reward),
+                               lambda: _catalog_break_even(site, market, version, reward))
+            if table is not None:
+                st.dataframe(table.style.format({
+                    "efficiency_J_per_TH": "{:.1f}", "breakeven_btc_price": "£{:,.0f}", "breakeven_hashrate": "{:,.0f}",
+                    "breakeven_load_factor": "{:.0%}", "price_headroom": "{:.0%}"}), hide_index=True)
+
+    @st.fragment
+    def _sensitivity_section(site, miner_spec, market, reward):
+        # the ±% slider reruns only this section
+        with _fragment_span("fragment_sensitivity"):
+            import plotly.graph_objects as go
+            from breakeven import break_even, sensitivities
+            be = break_even(market=market, catalog=pd.DataFrame([miner_spec]), reward_source=reward[0], **site).iloc[0]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Break-even BTC price", f"£{be['breakeven_btc_price']:,.0f}",
+                          f"{be['price_headroom']:.0%} headroom", delta_color="off")
+            with col2:
+                st.metric("Break-even hashrate", "never" if be["breakeven_hashrate"] == float("inf")
+                          else f"{be['breakeven_hashrate']:,.0f} EH/s")
+            with col3:
+                st.metric("Break-even load factor", "none pays" if pd.isna(be["breakeven_load_factor"])
+                          else f"{be['breakeven_load_factor']:.0%}")
+            delta = st.select_slider("Move each input by", options=[0.05, 0.1, 0.2, 0.3, 0.5],
+                                     value=SENSITIVITY_DELTA, format_func=lambda d: f"±{d:.0%}")
+            sens = sensitivities(site["chp_mw"], site["load_factor"], site["roc_rtfo"], site["eii"],
+                                 site["mining_mw"], miner_spec["j_th"], miner_spec["cost_per_mw_gbp"],
+                                 market=market, delta=delta, reward_source=reward[0]).iloc[::-1]
+            base = float(sens["base"].iloc[0])
+            fig = go.Figure([
+                go.Bar(y=sens.index, x=sens["low"] - base, base=base, orientation="h", name="Input down",
+                       marker_color="#e76f51", customdata=sens["low_input"],
+                       hovertemplate="%{customdata}: £%{x:,.1f}/MWh<extra></extra>"),
+                go.Bar(y=sens.index, x=sens["high"] - base, base=base, orientation="h", name="Input up",
+                       marker_color="#2a9d8f", customdata=sens["high_input"],
+                       hovertemplate="%{customdata}: £%{x:,.1f}/MWh<extra></extra>"),
+            ])
+            fig.update_layout(barmode="overlay", height=420, xaxis_title="£ / MWh net",
+                              legend=dict(orientation="h", yanchor="bottom", y=-0.3))
+            st.plotly_chart(fig, use_container_width=True)
+            rate = be["breakeven_grid_save_mwh"]
+            st.caption(f"Each input moved on its own from today's £{base:,.1f}/MWh (load factor and uptime "
+                       f"capped at 100%); ROC/RTFO and EII span their options. "
+                       + ("BTC revenue alone covers the costs." if rate <= 0
+                          else f"Needs at least £{rate:,.0f}/MWh of grid savings."))
+
+    @st.cache_data(ttl=600, max_entries=32, show_spinner="Simulating the fleet…")
+    def _fleet_sim(site, unit_spec, market, failure_rate, spares_pct, reward):
+        from fleet_sim import build_fleet, simulate_fleet, fleet_revenue
+        fleet = build_fleet(unit_spec, site["mining_mw"], spares_pct=spares_pct)
+        sim = simulate_fleet(fleet, failure_rate=failure_rate, seed=0)
+        res = fleet_revenue(sim, site["chp_mw"], site["load_factor"], site["roc_rtfo"], site["eii"], market,
+                            reward_source=reward[0])
+        return res, sim.profile(24)["mw"], (sim.failures, sim.stockouts, sim.max_queue, sim.curtailments)
+
+    @st.fragment
+    def _fleet_section(site, unit_spec, market, flat_net, reward):
+        # per-unit failures, repairs, spares and curtailment; the sliders rerun only this section
+        with _fragment_span("fragment_fleet"):
+            if unit_spec is None or unit_spec["watts"] * 1e-6 > site["mining_mw"]:
+                st.info("Needs a catalog miner (unit power and hashrate) that fits the mining power.")
+                return
+            col1, col2 = st.columns(2)
+            with col1:
+                failure_rate = st.slider("Failures per unit-year (%)", 0.5, 30.0, FLEET_FAILURE_RATE * 100, 0.5) / 100
+            with col2:
+                spares_pct = st.slider("Spares held (% of units)", 0.0, 10.0, FLEET_SPARES_PCT * 100, 0.5) / 100
+            out = _on_demand("Simulate the fleet", (site, unit_spec, market, failure_rate, spares_pct, reward),
+                             lambda: _fleet_sim(site, unit_spec, market, failure_rate, spares_pct, reward))
+            if out is None:
+                return
+            res, daily_mw, (failures, stockouts, max_queue, curtailments) = out
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Units", f"{res['units']:,}", f"+{res['spares']:,} spares", delta_color="off")
+            with col2:
+                st.metric("Availability", f"{res['availability']:.1%}", f"{res['availability'] - MINING_UPTIME:+.1%} vs flat")
+            with col3:
+                diff = res["net_revenue"] - flat_net
+                st.metric("Net revenue", f"£{res['net_revenue']:,.0f}", f"{'-' if diff < 0 else '+'}£{abs(diff):,.0f} vs flat")
+            df_mw = pd.DataFrame({"Day": daily_mw.index / 24, "Mining MW online": daily_mw.to_numpy()})
+            st.plotly_chart(px.line(df_mw, x="Day", y="Mining MW online", height=250), use_container_width=True)
+            st.caption(f"One simulated year: {failures} failures ({stockouts} with no spare on the shelf), repair "
+                       f"queue up to {max_queue}, {curtailments} curtailments shedding "
+                       f"{FLEET_CURTAIL_SHARE:.0%} of power • {FLEET_REPAIR_SLOTS} repairs at a time, "
+                       f"~{FLEET_REPAIR_HOURS} h each • flat model: {MINING_UPTIME:.0%} uptime")
+
+    def _unit_spec(miner):
+        """Cost spec plus unit hashrate/power, or None for specs without them (the legacy list)."""
+        if not miner.get("th_s") or not miner.get("watts"):
+            return None
+        return {**_cost_spec(miner), "th_s": float(miner["th_s"]), "watts": float(miner["watts"])}
+
+    with st.expander("Break-even & sensitivity: where does mining stop paying?"):
+        _sensitivity_section(site, _cost_spec(miner), market.market, reward)
+        _catalog_break_even_section(site, market.market, reward)
+
+    with st.expander("Fleet reliability: failures, repairs, spares, curtailment"):
+        _fleet_section(site, _unit_spec(miner), market.market, results["net_revenue"], reward)
+
+    with st.expander("Backtest: what would this site have earned?"):
+        _backtest_section(site, _cost_spec(miner), reward)
+
+    @st.cache_data(max_entries=16, show_spinner="Dispatching meter data…")
+    def _dispatch(_meter, file_id, mining_mw, roc_rtfo, eii, miner_spec, market, reward):
+        # keyed on the upload's id rather than hashing its bytes
+        from dispatch import dispatch_file
+        _meter.seek(0)
+        return dispatch_file(_meter, mining_mw, roc_rtfo, eii, j_th=miner_spec["j_th"],
+                             cost_per_mw_gbp=miner_spec["cost_per_mw_gbp"], market=market,
+                             reward_source=reward[0])
+
+    @st.fragment
+    def _dispatch_section(mining_mw, roc_rtfo, eii, miner_spec, market, reward):
+        # uploading a file reruns only this section
+        with _fragment_span("fragment_dispatch"):
+            meter = st.file_uploader("CHP meter file (CSV or Parquet: chp_mw or chp_mwh, optional "
+                                     "export_price_gbp_mwh, site_id, timestamp)", type=["csv", "parquet"])
+            if meter is not None:
+                sites = _dispatch(meter, meter.file_id, mining_mw, roc_rtfo, eii, miner_spec, market, reward)
+                st.dataframe(sites[["hours", "generation_mwh", "mining_mwh", "export_mwh", "btc",
+                                    "net_revenue", "net_per_mwh", "mining_uptime"]].style.format("{:,.2f}"))
+                st.caption("Each period exports its ROC/RTFO minimum first; miners run only when mining "
+                           "beats that period's export price. Costs are pro-rated to the metered hours.")
+
+    with st.expander("Half-hourly meter data (dispatch per settlement period)"):
+        _dispatch_section(mining_mw, roc_rtfo, eii, _cost_spec(miner), market.market, reward)
+
+    with st.expander("Bitcoin mining: full transparency"):
+        st.markdown("<small>These drive 98% of BTC revenue uncertainty.</small>", unsafe_allow_html=True)
+        col1, col2, col3 = st.columns(3)
+
+        # 1. Network data
+        with col1:
+            st.write("**<u>1. Network data</u>**", unsafe_allow_html=True)
+            st.write("External variables")
+            st.write("**a) Network Hashrate (Hn)**")
+            st.write(f"{results['hashrate']:,} EH/s live")
+            st.write("**b) Blocks / day**")
+            st.write(f"{BLOCKS_PER_DAY}")
+            st.write("**c) Block Subsidy**")
+            st.write(f"{BLOCK_REWARD} BTC est.")
+            st.write("**d) Pool fee (assumed)**")
+            st.write(f"{POOL_FEE_PCT:.0%}")
+            st.write("**e) BTC price**")
+            st.write(f"£{results['btc_price']:,}")
+
+        # 2. Hardware data
+        with col2:
+            st.write("**<u>2. Hardware data</u>**", unsafe_allow_html=True)
+            st.write("Miner specific")
+            hw = miner
+            ths = hw.get("th_s", hw.get("hashrate_ths", "n/a"))
+            watts = hw.get("watts", hw.get("power_w", "n/a"))
+            jth = hw.get("j_th", hw.get("efficiency_j_th", "n/a"))
+            st.write("**a) Miner hashrate (Hm)**")
+            st.write(f"{ths} TH/s")
+            st.write("**b) Miner power**")
+            st.write(f"{watts} W")
+            st.write("**c) Miner efficiency**")
+            st.write(f"{jth} J/TH")
+
+        # 3. Site specific inputs
+        with col3:
+            st.write("**<u>3. Site specific inputs</u>**", unsafe_allow_html=True)
+            st.write("Electricity & overheads")
+            st.write("**a) Power capacity**")
+            st.write(f"{mining_mw} MW")
+            st.write("**b) Electricity cost (Ce)**")
+            st.write("Model input (site-specific)")
+            st.write("**c) Cooling (Cc)**")
+            st.write("£0 using digestate heat")
+            st.write("**d) Maintenance (Cm)**")
+            st.write("Hydro, typically <1% failure")
+            st.write("**e) Number of miners**")
+            if miner.get("watts"):
+                st.write(f"{int(mining_mw * 1e6 // miner['watts']):,} (site MW / miner power)")
+            else:
+                st.write("Derived: site MW / miner power")
+
+        st.caption("**<u>4. Economics</u>**", unsafe_allow_html=True)
+        st.markdown("<small>These drive 98% of BTC revenue uncertainty.</small>", unsafe_allow_html=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("1. BTC Price", f"£{results['btc_price']:,}")
+            st.write("2. Network Hashrate", f"{results['hashrate']:,} EH/s")
+            st.write("3. Block Reward", f"{BLOCK_REWARD} BTC")
+        st.caption("Next halving: ~April 2028 → reward → 1.5625 BTC")
+
+        st.caption("Calculations")
+        st.caption("Notes:")
+        if blocks is not None:
+            st.caption(f"Block reward = BLOCK_SUBSIDY + TX_FEE, per unit of work over the last "
+                       f"{BLOCK_WINDOW:,} blocks to {blocks['time']:%d %b %H:%M} UTC: "
+                       f"{blocks['btc_per_th_day'] * 1e8:,.1f} sat per TH/s per day, fees "
+                       f"{blocks['fee_share']:.2%} of rewards, {blocks['blocks_per_day']:.1f} blocks/day.")
+        else:
+            st.caption("Block reward = BLOCK_SUBSIDY + TX_FEE; TX_FEE not included (toggle "
+                       "'Include transaction fees' to use block data).")
+        st.write("1. Miner specific calculations")
+        st.write("daily_revenue_btc = Hm/Hn * blocks_per_day * block_reward")
+        st.write("daily_revenue = daily_revenue_btc * btc_price")
+        st.write("daily_opex = ((W * 24)/1000) * Ce + Cc + Cm")
+        st.write("Daily profit = daily_revenue - daily_opex")
+
+    st.caption("Built for AD operators • Share: ad-bmc.streamlit.app")
+finally:
+    # also when st.rerun(), st.stop() or a widget change interrupts the script: fragment-only
+    # reruns must not append to this rerun's trace
+    _rerun.stop()
+    metrics.end_trace()
+
+if METRICS_FILE:
+    metrics.write_file(METRICS_FILE)
+# ?debug=1 shows where this rerun's time went
+if _debug:
+    with st.expander("Debug: timing breakdown for this rerun", expanded=True):
+        st.dataframe(pd.DataFrame(metrics.trace_rows(_trace)), hide_index=True)
+        st.caption("Process-wide counters")
+        st.json(metrics.counters())
@@ -0,0 +1,215 @@
+# asic_history.py
+"""
+Columnar history of minerstat SHA-256 snapshots.
+
+Snapshots are stored as a hive-partitioned Parquet dataset
+(data/minerstat_history/retrieved_date=YYYY-MM-DD/*.parquet). Each append only writes
+rows that are new or changed since the previous snapshot, plus `removed` tombstones for
+models that disappeared, so the catalog as it stood at any moment is "latest version
+per id with retrieved_at <= t". Reads are memory-mapped Parquet scans.
+"""
+from __future__ import annotations
+import datetime as dt
+import glob, shutil, threading, uuid
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from constants import HISTORY_RETENTION_DAYS
+
+VALUE_COLUMNS = ["name", "brand", "url", "hashrate_THs", "power_W", "efficiency_J_per_TH"]
+COLUMNS = ["id", *VALUE_COLUMNS, "retrieved_at", "removed"]
+
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("name", pa.string()),
+    ("brand", pa.string()),
+    ("url", pa.string()),
+    ("hashrate_THs", pa.float64()),
+    ("power_W", pa.float64()),
+    ("efficiency_J_per_TH", pa.float64()),
+    ("retrieved_at", pa.timestamp("s", tz="UTC")),
+    ("removed", pa.bool_()),
+])
+_PARTITIONING = ds.partitioning(pa.schema([("retrieved_date", pa.string())]), flavor="hive")
+_MARKER = "_LAST_INGEST"
+
+
+def _to_utc(when) -> pd.Timestamp:
+    ts = pd.Timestamp(when)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+def _key(df: pd.DataFrame) -> pd.Series:
+    # minerstat ids are stable; fall back to the name for the odd row without one
+    return df["id"].astype("string").fillna(df["name"].astype("string"))
+
+def _latest(df: pd.DataFrame) -> pd.DataFrame:
+    """Latest version per model, tombstones dropped."""
+    if df.empty:
+        return df
+    df = df.assign(_key=_key(df)).sort_values("retrieved_at", kind="stable")
+    df = df.drop_duplicates("_key", keep="last")
+    return df[~df["removed"]].drop(columns="_key")
+
+def _normalise(df: pd.DataFrame, retrieved_at) -> pd.DataFrame:
+    out = pd.DataFrame({c: df[c] if c in df.columns else None for c in ["id", *VALUE_COLUMNS]})
+    for c in ("id", "name", "brand", "url"):
+        out[c] = out[c].astype("string")
+    for c in ("hashrate_THs", "power_W", "efficiency_J_per_TH"):
+        out[c] = pd.to_numeric(out[c], errors="coerce").astype("float64")
+    if "retrieved_at" in df.columns and retrieved_at is None:
+        stamp = pd.to_datetime(df["retrieved_at"].astype(str).str.replace(" UTC", "", regex=False), utc=True)
+    else:
+        stamp = _to_utc(retrieved_at or dt.datetime.now(dt.timezone.utc))
+    out["retrieved_at"] = stamp
+    out["retrieved_at"] = out["retrieved_at"].dt.floor("s")
+    out["removed"] = False
+    return out
+
+
+class AsicHistory:
+    """Append-only, deduplicated Parquet history of minerstat snapshots."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.RLock()
+
+    # --- bookkeeping -------------------------------------------------------
+
+    @property
+    def marker(self) -> Path:
+        """Touched on every write; its mtime is the cache key for readers."""
+        return self.root / _MARKER
+
+    def last_ingest(self) -> Optional[dt.datetime]:
+        try:
+            return dt.datetime.fromisoformat(self.marker.read_text().strip())
+        except Exception:
+            return None
+
+    def _touch(self, ingested: bool) -> None:
+        """Bump the marker's mtime; record the time only for a live ingest."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        last = self.last_ingest()
+        stamp = dt.datetime.now() if ingested else last
+        self.marker.write_text(stamp.isoformat(timespec="seconds") if stamp else "")
+
+    def mark_ingested(self) -> None:
+        """Record a live check that found nothing new (e.g. HTTP 304)."""
+        with self._lock:
+            self._touch(True)
+
+    def _files(self):
+        return sorted(self.root.glob("retrieved_date=*/*.parquet"))
+
+    def is_empty(self) -> bool:
+        return not self._files()
+
+    # --- reads -------------------------------------------------------------
+
+    def read(self, until=None) -> pd.DataFrame:
+        """Every stored row version (optionally only those retrieved at or before `until`)."""
+        filters = None
+        if until is not None:
+            until = _to_utc(until)
+            filters = [("retrieved_date", "<=", until.strftime("%Y-%m-%d")),
+                       ("retrieved_at", "<=", until.to_pydatetime())]
+        with self._lock:   # never mid-compact()
+            if self.is_empty():
+                return SCHEMA.empty_table().to_pandas()
+            table = pq.read_table(self.root, partitioning=_PARTITIONING, filters=filters,
+                                  memory_map=True, columns=COLUMNS)
+        return table.to_pandas()
+
+    def as_of(self, when=None) -> pd.DataFrame:
+        """The catalog as it stood at `when` (default: now), best efficiency first."""
+        df = _latest(self.read(until=when)).drop(columns="removed")
+        return df.sort_values(["efficiency_J_per_TH", "hashrate_THs"], ascending=[True, False],
+                              na_position="last").reset_index(drop=True)
+
+    # --- writes ------------------------------------------------------------
+
+    def _write(self, rows: pd.DataFrame) -> None:
+        rows = rows.assign(retrieved_date=rows["retrieved_at"].dt.strftime("%Y-%m-%d"))
+        for day, part in rows.groupby("retrieved_date"):
+            folder = self.root / f"retrieved_date={day}"
+            folder.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(part[COLUMNS], schema=SCHEMA, preserve_index=False)
+            pq.write_table(table, folder / f"part-{uuid.uuid4().hex}.parquet")
+
+    def append(self, snapshot: pd.DataFrame, retrieved_at=None, ingested: bool = True) -> int:
+        """
+        Merge a full snapshot into the history; only changed/new rows and tombstones for
+        vanished models are written. Returns the number of rows written. Pass
+        ingested=False when replaying old data so last_ingest() is left untouched.
+        """
+        with self._lock:
+            new = _normalise(snapshot, retrieved_at)
+            stamp = new["retrieved_at"].max()
+            prev = self.as_of(stamp)
+            new_keys, prev_keys = _key(new), _key(prev)
+
+            merged = new.assign(_key=new_keys).merge(
+                prev.assign(_key=prev_keys)[["_key", *VALUE_COLUMNS]],
+                on="_key", how="left", suffixes=("", "_prev"), indicator=True)
+            changed = merged["_merge"] == "left_only"
+            for c in VALUE_COLUMNS:
+                a, b = merged[c], merged[f"{c}_prev"]
+                changed |= ~((a == b).fillna(False) | (a.isna() & b.isna()))
+            rows = new[changed.to_numpy()]
+
+            gone = prev[~prev_keys.isin(new_keys)].assign(retrieved_at=stamp, removed=True)
+            rows = pd.concat([rows, gone[COLUMNS]], ignore_index=True) if not gone.empty else rows
+            if not rows.empty:
+                self._write(rows)
+            self._touch(ingested)
+            return len(rows)
+
+    def import_csvs(self, pattern: str) -> int:
+        """Replay legacy CSV snapshots (oldest first) into the history."""
+        frames = [pd.read_csv(p) for p in sorted(glob.glob(pattern))]
+        frames = [f for f in frames if not f.empty and "retrieved_at" in f.columns]
+        frames.sort(key=lambda f: str(f["retrieved_at"].iloc[0]))
+        return sum(self.append(f, ingested=False) for f in frames)
+
+    def compact(self, retain_days: int = HISTORY_RETENTION_DAYS) -> None:
+        """
+        For partitions older than `retain_days`, keep only the versions still current at
+        the cutoff (superseded versions and tombstones are dropped), one file per
+        partition. Newer partitions are left as they are. Each partition is swapped on its
+        own under the lock readers take; a crash part-way leaves duplicate versions,
+        which reads already collapse.
+        """
+        with self._lock:
+            if self.is_empty():
+                return
+            last_ingest = self.marker.read_text() if self.marker.exists() else ""
+            cutoff = pd.Timestamp.now(tz="UTC").normalize() - pd.Timedelta(days=retain_days)
+            old = self.read(until=cutoff - pd.Timedelta(seconds=1))
+            if old.empty:
+                return
+            keep = _latest(old)
+            keep = keep.assign(retrieved_date=keep["retrieved_at"].dt.strftime("%Y-%m-%d"))
+            stored = old["retrieved_at"].dt.strftime("%Y-%m-%d").value_counts()
+            changed = False
+            for day, n_stored in stored.items():
+                folder = self.root / f"retrieved_date={day}"
+                files = sorted(folder.glob("*.parquet"))
+                part = keep[keep["retrieved_date"] == day]
+                if len(files) == 1 and len(part) == n_stored:
+                    continue                          # already compact
+                if not part.empty:
+                    tmp = folder / f".part-{uuid.uuid4().hex}.tmp"   # hidden from readers
+                    pq.write_table(pa.Table.from_pandas(part[COLUMNS], schema=SCHEMA, preserve_index=False), tmp)
+                    tmp.rename(folder / f"part-{uuid.uuid4().hex}.parquet")
+                for f in files:
+                    f.unlink()
+                if part.empty:
+                    shutil.rmtree(folder, ignore_errors=True)
+                changed = True
+            if changed:
+                self.marker.write_text(last_ingest)   # new mtime, same last_ingest()
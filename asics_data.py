@@ -1,15 +1,28 @@
 from __future__ import annotations
-import glob, math, datetime as dt
+import codecs, json, math, os, threading, datetime as dt
 from pathlib import Path
-from typing import List, Optional, Tuple
-import requests
-import pandas as pd
+from typing import Iterable, Iterator, List, Optional, Tuple
 import traceback
 
-from constants import PREFERRED_BRAND_ASICS, MUST_INCLUDE_ASICS
+from constants import PREFERRED_BRAND_ASICS, MUST_INCLUDE_ASICS, FAST_START, STARTUP_SNAPSHOT, REWARD_SOURCE
+import metrics
 
+# nothing is created at import; the history store makes its directories on first write
 DATA_DIR = Path("data")
-DATA_DIR.mkdir(exist_ok=True)
+_VALIDATORS_PATH = DATA_DIR / "minerstat_history" / "_minerstat_validators.json"
+# pandas, pyarrow (asic_history) and calculator are imported where first used, so importing
+# this module (the app, the API) stays cheap; HISTORY is built on first use for the same reason.
+HISTORY = None
+_HISTORY_LOCK = threading.Lock()
+
+def _history():
+    """The minerstat AsicHistory under DATA_DIR, created on first use."""
+    global HISTORY
+    with _HISTORY_LOCK:
+        if HISTORY is None:
+            from asic_history import AsicHistory
+            HISTORY = AsicHistory(DATA_DIR / "minerstat_history")
+        return HISTORY
 
 def _strip_brand(name: str, brand: str) -> str:
     if not isinstance(name, str) or not brand:
@@ -28,144 +41,420 @@ def _fmt(x, nd=2):
 def _today_prefix() -> str:
     return dt.datetime.now().strftime("%y%m%d_")
 
-def _make_filename(ext="csv") -> Path:
-    return DATA_DIR / f"minerstat_asic_sha256_{dt.datetime.now().strftime('%y%m%d_%H%M%S')}.{ext}"
+def _iter_json_array(chunks: Iterable[bytes]) -> Iterator:
+    """
+    Incrementally decode a top-level JSON array, yielding each element as soon as it
+    is complete, so a large payload never has to be held (or parsed) in one piece.
+    """
+    decoder, text = json.JSONDecoder(), codecs.getincrementaldecoder("utf-8")()
+    buf, pos, done = "", 0, False
+    state = "open"          # open -> value -> sep -> value ... -> closed
+    chunks = iter(chunks)
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos < len(buf):
+            ch = buf[pos]
+            if state == "open":
+                if ch != "[":
+                    raise ValueError(f"expected a JSON array, got {buf[pos:pos + 200]!r}")
+                state, pos = "first", pos + 1
+                continue
+            if ch == "]" and state in ("first", "sep"):
+                return
+            if state == "sep":
+                if ch != ",":
+                    raise ValueError(f"expected ',' or ']' in JSON array, got {ch!r}")
+                state, pos = "value", pos + 1
+                continue
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if done:
+                    raise
+                item = end = None
+            # only trust an element once its ',' or ']' has arrived (guards truncated scalars)
+            rest = buf[end:].lstrip() if end is not None else ""
+            if end is not None and (done or rest[:1] in (",", "]")):
+                yield item
+                buf, pos, state = buf[end:], 0, "sep"
+                continue
+        elif done:
+            raise ValueError("JSON array ended unexpectedly")
+        chunk = next(chunks, None)
+        if chunk is None:
+            buf, done = buf[pos:] + text.decode(b"", final=True), True
+        else:
+            buf = buf[pos:] + text.decode(chunk)
+        pos = 0
 
-def _find_todays_file(ext="csv") -> Optional[Path]:
-    pattern = str(DATA_DIR / f"minerstat_asic_sha256_{_today_prefix()}*.{ext}")
-    matches = sorted(glob.glob(pattern))
-    return Path(matches[-1]) if matches else None
+def _sha256_row(item: dict, fetched_at: str) -> Optional[dict]:
+    if not isinstance(item, dict) or str(item.get("type", "")).lower() != "asic":
+        return None
+    sha = (item.get("algorithms") or {}).get("SHA-256") or {}
+    if not isinstance(sha, dict):
+        return None
+    speed = sha.get("speed")   # H/s
+    power = sha.get("power")   # W
+    if not isinstance(speed, (int, float)) or speed <= 0:
+        return None
+    ths = speed / 1e12
+    eff = (power / ths) if power else math.nan
+    return {
+        "id": item.get("id"),
+        "name": item.get("name"),
+        "brand": item.get("brand"),
+        "url": item.get("url"),
+        "hashrate_THs": round(ths, 2),
+        "power_W": power,
+        "efficiency_J_per_TH": round(eff, 2) if eff == eff else None,
+        "retrieved_at": fetched_at,
+    }
 
-def _find_latest_file(ext="csv") -> Optional[Path]:
-    pattern = str(DATA_DIR / f"minerstat_asic_sha256_*.{ext}")
-    matches = sorted(glob.glob(pattern))
-    return Path(matches[-1]) if matches else None
+@metrics.timed("minerstat_fetch")
+def _fetch_minerstat_sha256(validators: Optional[dict] = None) -> Tuple[Optional[pd.DataFrame], dict]:
+    """
+    Stream minerstat's hardware list, keeping only SHA-256 ASICs as they are parsed.
+    `validators` ({"etag": ..., "last_modified": ...}) from a previous download make
+    the request conditional. Returns (df, validators); df is None when minerstat
+    answers 304 Not Modified.
+    """
+    validators = validators or {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
 
-def _fetch_minerstat_sha256() -> pd.DataFrame:
+    rows, fetched_at = [], dt.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
     try:
-        resp = requests.get("https://api.minerstat.com/v2/hardware", timeout=60)
-        resp.raise_for_status()
-        try:
-            j = resp.json()
-        except Exception as exc:
-            snippet = (resp.text or "").replace("\n", "\\n")[:200]
-            raise RuntimeError(f"Minerstat returned non-JSON payload (status {resp.status_code}, starts with: {snippet})") from exc
+        import http_client   # requests is only loaded once something is actually fetched
+        resp = http_client.get("minerstat", headers=headers, stream=True)
+        with resp:
+            if resp.status_code == 304:
+                return None, validators
+            resp.raise_for_status()
+            head = bytearray()
+
+            def _chunks():
+                for chunk in resp.iter_content(chunk_size=1 << 16):
+                    if len(head) < 200:
+                        head.extend(chunk[:200])
+                    yield chunk
+
+            try:
+                for item in _iter_json_array(_chunks()):
+                    row = _sha256_row(item, fetched_at)
+                    if row is not None:
+                        rows.append(row)
+            except ValueError as exc:
+                snippet = bytes(head[:200]).decode("utf-8", "replace").replace("\n", "\\n")
+                raise RuntimeError(f"Minerstat returned non-JSON payload (status {resp.status_code}, starts with: {snippet})") from exc
+            new_validators = {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            }
     except Exception as exc:
         raise RuntimeError("Failed to download minerstat SHA-256 hardware list") from exc
 
-    rows, fetched_at = [], dt.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-    for item in j:
-        if str(item.get("type", "")).lower() != "asic":
-            continue
-        sha = (item.get("algorithms") or {}).get("SHA-256") or {}
-        if not isinstance(sha, dict):
-            continue
-        speed = sha.get("speed")   # H/s
-        power = sha.get("power")   # W
-        if not isinstance(speed, (int, float)) or speed <= 0:
-            continue
-        ths = speed / 1e12
-        eff = (power / ths) if power else math.nan
-        rows.append({
-            "id": item.get("id"),
-            "name": item.get("name"),
-            "brand": item.get("brand"),
-            "url": item.get("url"),
-            "hashrate_THs": round(ths, 2),
-            "power_W": power,
-            "efficiency_J_per_TH": round(eff, 2) if eff == eff else None,
-            "retrieved_at": fetched_at,
-        })
+    import pandas as pd
     df = pd.DataFrame(rows)
     if not df.empty:
         df = df.sort_values(["efficiency_J_per_TH", "hashrate_THs"], ascending=[True, False], na_position="last")
         df["brand"] = df["brand"].fillna("Unknown")
-    return df
-
-def ensure_today_csv() -> Path:
-    existing = _find_todays_file("csv")
-    if existing and existing.exists():
-        return existing
+    return df, new_validators
 
+def _load_validators() -> dict:
     try:
-        df = _fetch_minerstat_sha256()
-        if df.empty:
-            raise RuntimeError("Minerstat returned no ASIC data")
-        out = _make_filename("csv")
-        df.to_csv(out, index=False)
-        return out
+        return json.loads(_VALIDATORS_PATH.read_text())
     except Exception:
-        traceback.print_exc()
-        # If fetch fails, prefer today's file if present, else the most recent snapshot or bundled CSV.
-        fallback = existing if existing and existing.exists() else _find_latest_file("csv")
-        if fallback and fallback.exists():
-            return fallback
-        bundled = DATA_DIR / "minerstat_asic_sha.csv"
-        if bundled.exists():
-            return bundled
-        # Otherwise rethrow with context
-        raise
+        return {}
+
+@metrics.timed("ensure_today_snapshot")
+def ensure_today_snapshot() -> Path:
+    """
+    Make sure today's minerstat snapshot is in the history store (fetching it if not)
+    and return the file the catalog should be read from: the store's marker file, or
+    the bundled CSV if the store is still empty.
+    """
+    history = _history()
+    if history.is_empty():
+        # one-off migration of the legacy daily CSV snapshots (and the bundled CSV)
+        history.import_csvs(str(DATA_DIR / "minerstat_asic_sha*.csv"))
+
+    last = history.last_ingest()
+    if last is None or last.date() != dt.date.today():
+        try:
+            # Conditional request: an unchanged catalog costs one 304 round trip.
+            validators = _load_validators() if last is not None else {}
+            df, validators = _fetch_minerstat_sha256(validators)
+            if df is None:
+                history.mark_ingested()
+                metrics.inc("minerstat_ingest", result="not_modified")
+            else:
+                if df.empty:
+                    raise RuntimeError("Minerstat returned no ASIC data")
+                # only changed rows are written; the rest of the history is untouched
+                changed = history.append(df)
+                if changed:
+                    history.compact()
+                    _CATALOG.invalidate()
+                metrics.inc("minerstat_ingest", result="changed" if changed else "unchanged")
+            _VALIDATORS_PATH.write_text(json.dumps(validators))
+        except Exception:
+            # If fetch fails, keep serving the most recent snapshot in the store.
+            traceback.print_exc()
+            metrics.inc("minerstat_ingest", result="failed")
+
+    if not history.is_empty():
+        return history.marker
+    bundled = DATA_DIR / "minerstat_asic_sha.csv"
+    if bundled.exists():
+        return bundled
+    raise RuntimeError("No minerstat snapshot available (fetch failed and no local data)")
+
+def _read_source(path: Path) -> pd.DataFrame:
+    """A catalog source as returned by ensure_today_snapshot() (or the startup snapshot)."""
+    import pandas as pd
+    history = _history()
+    if path == history.marker:
+        return history.as_of()
+    if path.suffix == ".json":
+        import startup
+        return pd.DataFrame(startup.read(path)["catalog"])
+    return pd.read_csv(path)
+
+def _fast_start_source() -> Optional[Path]:
+    """
+    With FAST_START, the source to read while today's snapshot is not in the store yet:
+    the prebuilt startup snapshot while a background refresh runs, the store as it is
+    between attempts. None (block on ensure_today_snapshot) when nothing is prebuilt.
+    """
+    history = _history()
+    last = history.last_ingest()
+    if last is not None and last.date() == dt.date.today():
+        return None
+    import startup
+    if startup.read(STARTUP_SNAPSHOT) is None:
+        return None
+    if not startup.refresh_async() and not history.is_empty():
+        return history.marker
+    return Path(STARTUP_SNAPSHOT)
+
+class AsicCatalog:
+    """
+    In-memory ASIC catalog built from the current snapshot.
+    The snapshot is read once into column arrays plus hash indexes on `id` and `name`,
+    so lookups are O(1). The source is re-resolved on day rollover or after invalidate()
+    (a new snapshot was written); otherwise only its mtime is checked per access. On a
+    cold start with FAST_START, the startup snapshot is served until the store is fresh.
+    """
+
+    _SPEC_COLUMNS = ("id", "name", "brand", "hashrate_THs", "power_W", "efficiency_J_per_TH")
+
+    def __init__(self):
+        self._lock = threading.RLock()   # ensure_today_snapshot() may call invalidate() re-entrantly
+        self._path: Optional[Path] = None
+        self._mtime: Optional[int] = None
+        self._day: Optional[str] = None
+        self._df: Optional[pd.DataFrame] = None
+        self._cols: dict = {}
+        self._by_id: dict = {}
+        self._by_name: dict = {}
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._path = None
+
+    def _load(self, path: Path, mtime: int) -> None:
+        df = _read_source(path)
+        cols = {c: df[c].to_numpy() for c in self._SPEC_COLUMNS if c in df.columns}
+        by_id, by_name = {}, {}
+        # setdefault keeps the first occurrence, matching the old boolean-mask + iloc[0]
+        for i, key in enumerate(cols.get("id", ())):
+            by_id.setdefault(key, i)
+        for i, key in enumerate(cols.get("name", ())):
+            by_name.setdefault(key, i)
+        self._df, self._cols, self._by_id, self._by_name = df, cols, by_id, by_name
+        self._path, self._mtime = path, mtime
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            day = _today_prefix()
+            if self._path is not None and day == self._day:
+                path = self._path
+            else:
+                path = (FAST_START and _fast_start_source()) or ensure_today_snapshot()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                path = ensure_today_snapshot()
+                mtime = os.stat(path).st_mtime_ns
+            if path != self._path or mtime != self._mtime or self._df is None:
+                with metrics.span("catalog_load"):
+                    self._load(path, mtime)
+                metrics.inc("catalog_cache", result="reload")
+            else:
+                metrics.inc("catalog_cache", result="hit")
+            self._day = day
+
+    @property
+    def path(self) -> Path:
+        self._ensure_fresh()
+        return self._path
+
+    @property
+    def version(self) -> tuple:
+        """Changes whenever a different snapshot is loaded: a cache key for catalog-derived data."""
+        self._ensure_fresh()
+        return (str(self._path), self._mtime)
+
+    def df(self) -> pd.DataFrame:
+        """The parsed snapshot. Shared between callers: treat it as read-only."""
+        self._ensure_fresh()
+        return self._df
 
+    def lookup(self, key) -> Optional[int]:
+        """Row position for an id, falling back to a name match; None if unknown."""
+        with self._lock:
+            self._ensure_fresh()
+            pos = self._by_id.get(key)
+            return self._by_name.get(key) if pos is None else pos
+
+    def get(self, key) -> Optional[dict]:
+        """The spec columns of the row for an id (or name), read from the same load as the lookup."""
+        with self._lock:
+            pos = self.lookup(key)
+            return None if pos is None else {c: arr[pos] for c, arr in self._cols.items()}
+
+
+_CATALOG = AsicCatalog()
+
+def get_catalog() -> AsicCatalog:
+    return _CATALOG
+
+@metrics.timed("load_today_df")
 def load_today_df() -> pd.DataFrame:
-    return pd.read_csv(ensure_today_csv())
+    return _CATALOG.df()
 
-def _pick_diverse_top_six(df: pd.DataFrame, must_include: list[str]) -> pd.DataFrame:
-    base = df.copy()
-    base = base.sort_values(["efficiency_J_per_TH", "hashrate_THs"], ascending=[True, False], na_position="last")
+_EFFICIENCY_ORDER = (["efficiency_J_per_TH", "hashrate_THs"], [True, False])
+_ECONOMICS_ORDER = (["net_revenue", "efficiency_J_per_TH", "hashrate_THs"], [False, True, False])
+
+def _catalog_cost_per_mw(df: pd.DataFrame, cost_per_mw_gbp: Optional[float] = None):
+    """
+    Capex per MW for every catalog row: a per-unit price_gbp over the unit's power_W, else
+    a cost_per_mw_gbp column, else (and for rows with no usable value) `cost_per_mw_gbp`
+    or the baseline. minerstat rows carry no price, so today's catalog is costed flat.
+    """
+    import pandas as pd
+    from calculator import _baseline_cost_per_mw
+    default = cost_per_mw_gbp if cost_per_mw_gbp is not None else _baseline_cost_per_mw()
+    if "price_gbp" in df.columns:
+        cost = df["price_gbp"].astype(float) / (df["power_W"].astype(float) / 1e6)
+    elif "cost_per_mw_gbp" in df.columns:
+        cost = df["cost_per_mw_gbp"].astype(float)
+    else:
+        return pd.Series(default, index=df.index, dtype=float).to_numpy()
+    return cost.where((cost > 0) & (cost < float("inf")), default).to_numpy()
 
-    chosen = []
-    seen = set()
+def rank_catalog(df: pd.DataFrame, chp_mw, load_factor, roc_rtfo, eii, mining_mw,
+                 market=None, cost_per_mw_gbp: Optional[float] = None,
+                 reward_source: str = REWARD_SOURCE) -> pd.DataFrame:
+    """
+    Site economics for every ASIC in the catalog in one calculate_batch() pass, best
+    net revenue first, with BTC paid per `reward_source` as in calculate(). Adds
+    btc_per_year, revenue_btc, net_revenue, net_per_mwh and payback_months columns.
+
+    Models are costed per row (price_gbp or cost_per_mw_gbp columns, see
+    _catalog_cost_per_mw). The minerstat catalog has neither, so every model then costs
+    the same per MW: at a fixed mining_mw capex and power are equal across models and
+    the ranking is effectively by J/TH (payback still differs through revenue).
+    """
+    from calculator import calculate_batch
+    cost = _catalog_cost_per_mw(df, cost_per_mw_gbp)
+    econ = calculate_batch({
+        "chp_mw": chp_mw, "load_factor": load_factor, "roc_rtfo": roc_rtfo, "eii": eii,
+        "mining_mw": mining_mw,
+        "j_th": df["efficiency_J_per_TH"].to_numpy(dtype=float),
+        "cost_per_mw_gbp": cost,
+    }, market, reward_source)
+    ranked = df.reset_index(drop=True).assign(
+        btc_per_year=econ["total_btc"].to_numpy(),
+        revenue_btc=econ["revenue_btc"].to_numpy(),
+        net_revenue=econ["net_revenue"].to_numpy(),
+        net_per_mwh=econ["net_per_mwh"].to_numpy(),
+        payback_months=econ["payback_months"].to_numpy(),
+    )
+    cols, asc = _ECONOMICS_ORDER
+    return ranked.sort_values(cols, ascending=asc, na_position="last", kind="stable")
+
+def _pick_diverse_top_k(base: pd.DataFrame, must_include: list[str], k: int = 6) -> pd.DataFrame:
+    """
+    Brand-diverse top-k of an already-ranked frame: best model of each must-include
+    brand, then the best model of each further brand, then the best of the rest.
+    Each step is a single vectorized pass, so cost is O(n) after the sort.
+    """
+    base = base.reset_index(drop=True)
+    brand = base["brand"]
+    lower = brand.str.lower()
 
     # 1) Guarantee brands in MUST_INCLUDE_ASICS (best model per brand, if present)
-    want = [b.lower() for b in must_include]
-    for b in want:
-        match = base[base["brand"].str.lower() == b]
-        if not match.empty:
-            row = match.iloc[0]
-            chosen.append(row)
-            seen.add(row["brand"])
+    first_by_lower = dict(zip(lower[~lower.duplicated()], base.index[~lower.duplicated()]))
+    chosen = [first_by_lower[b.lower()] for b in must_include if b.lower() in first_by_lower]
 
     # 2) Fill remaining with next-best while keeping brand diversity
-    for _, row in base.iterrows():
-        if len(chosen) == 6:
-            break
-        if row["brand"] in seen:
-            continue
-        chosen.append(row)
-        seen.add(row["brand"])
-
-    # 3) If still < 6, top-up ignoring diversity
-    if len(chosen) < 6:
-        for _, row in base.iterrows():
-            if len(chosen) == 6:
-                break
-            if any(row["id"] == r["id"] for r in chosen):
-                continue
-            chosen.append(row)
+    if len(chosen) < k:
+        leaders = base.index[~brand.duplicated() & ~brand.isin(set(brand.iloc[chosen]))]
+        chosen += list(leaders[: k - len(chosen)])
 
-    return pd.DataFrame(chosen[:6])
+    # 3) If still < k, top-up ignoring diversity
+    if len(chosen) < k:
+        rest = base.index[~base.index.isin(chosen)]
+        chosen += list(rest[: k - len(chosen)])
+
+    return base.iloc[chosen[:k]]
+
+def _pick_diverse_top_six(df: pd.DataFrame, must_include: list[str]) -> pd.DataFrame:
+    cols, asc = _EFFICIENCY_ORDER
+    base = df.sort_values(cols, ascending=asc, na_position="last", kind="stable")
+    return _pick_diverse_top_k(base, must_include, 6)
 
 def _pick_top_six_single_brand(df: pd.DataFrame, brand: str) -> pd.DataFrame:
     base = df[df["brand"].str.lower() == brand.lower()].copy()
     base = base.sort_values(["efficiency_J_per_TH", "hashrate_THs"], ascending=[True, False], na_position="last")
     return base.head(6)
 
-def pick_top_six(df: pd.DataFrame, preferred_brand: Optional[str] = None, must_include: Optional[list[str]] = None) -> pd.DataFrame:
+def pick_top_six(df: pd.DataFrame, preferred_brand: Optional[str] = None, must_include: Optional[list[str]] = None,
+                 ranked: bool = False) -> pd.DataFrame:
     """
     Selection logic:
     - If preferred_brand provided (or constant set), return top 6 from that brand.
     - Else, use must_include list to guarantee brand presence, then fill best remaining.
+    "Best" is J/TH, or the existing row order when ranked=True (e.g. rank_catalog output).
     """
     brand = (preferred_brand if preferred_brand is not None else PREFERRED_BRAND_ASICS).strip()
+    if ranked:
+        if brand:
+            return df[df["brand"].str.lower() == brand.lower()].head(6)
+        return _pick_diverse_top_k(df, must_include if must_include is not None else MUST_INCLUDE_ASICS, 6)
     if brand:
         return _pick_top_six_single_brand(df, brand)
 
     must = must_include if must_include is not None else MUST_INCLUDE_ASICS
     return _pick_diverse_top_six(df, must)
 
-def get_dropdown_options(preferred_brand: Optional[str] = None) -> List[Tuple[str, str]]:
+@metrics.timed("get_dropdown_options")
+def get_dropdown_options(preferred_brand: Optional[str] = None, site: Optional[dict] = None,
+                         market=None, reward_source: str = REWARD_SOURCE) -> List[Tuple[str, str]]:
+    """
+    Dropdown (label, id) pairs. With `site` (calculate() inputs minus the miner) the
+    catalog is ranked by site economics via rank_catalog(); otherwise by J/TH.
+    """
+    import pandas as pd
     df = load_today_df()
-    reduced = pick_top_six(df, preferred_brand=preferred_brand)
+    if site:
+        df = rank_catalog(df, market=market, reward_source=reward_source, **site)
+    reduced = pick_top_six(df, preferred_brand=preferred_brand, ranked=bool(site))
     options: List[Tuple[str, str]] = []
     for _, r in reduced.iterrows():
         brand = (r.get("brand") or "").strip()
@@ -178,35 +467,35 @@ def get_dropdown_options(preferred_brand: Optional[str] = None) -> List[Tuple[st
     return options
 
 # at bottom of asics_data.py
-def get_dropdown_options_from_constants():
+def get_dropdown_options_from_constants(site: Optional[dict] = None, market=None,
+                                        reward_source: str = REWARD_SOURCE):
     """Uses PREFERRED_BRAND_ASICS (if set) else MUST_INCLUDE_ASICS (inside pick_top_six)."""
     pref = PREFERRED_BRAND_ASICS.strip()
-    return get_dropdown_options(preferred_brand=pref or None)
+    return get_dropdown_options(preferred_brand=pref or None, site=site, market=market,
+                                reward_source=reward_source)
 
 # --- add to end of asics_data.py ---
 
+@metrics.timed("get_specs_by_id")
 def get_specs_by_id(miner_id: str):
     """
-    Return a dict of specs for a given miner id from today's CSV.
+    Return a dict of specs for a given miner id from today's snapshot.
     Keys: id, name, brand, hashrate_ths, power_w, efficiency_j_th
     """
     if not miner_id:
         return None
 
-    df = load_today_df()
-    row = df[df["id"] == miner_id]
-    if row.empty:
-        # fallback: sometimes UI may pass name as value; try name match
-        row = df[df["name"] == miner_id]
-        if row.empty:
-            return None
+    # sometimes UI may pass name as value; the catalog falls back to a name match
+    r = _CATALOG.get(miner_id)
+    if r is None:
+        return None
 
-    r = row.iloc[0]
     def _as_float(val):
         try:
-            return float(val)
+            val = float(val)
         except Exception:
             return None
+        return val if math.isfinite(val) else None
 
     return {
         "id": r.get("id"),
@@ -0,0 +1,154 @@
+# backtest.py
+"""
+Replay a site over recorded market history: "what would this site have earned since X".
+
+Steps daily over a window of the local price/hashrate store (market_history.py), fully
+offline. Each day's BTC is the miners' share of that day's network hashrate times the
+block subsidy then in force (actual halving dates), valued at that day's closing price;
+grid savings, opex and the capex annuity accrue per day as in calculate(). Miners are
+MINER_SPECS keys or a catalog-shaped DataFrame; with a per-row mining_mw column (e.g.
+FleetPlan.fleet) the rows are one fleet and total() sums them. Arrays are (miners × days).
+
+    python backtest.py --chp-mw 1.0 --mining-mw 0.9 [--since 2025-11-01] [--miner KEY ...]
+"""
+from __future__ import annotations
+import argparse
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from calculator import _calculate_arrays, _miner_arrays
+from constants import (
+    BLOCKS_PER_DAY, BLOCK_REWARD, DAYS_PER_YEAR, POOL_FEE_PCT,
+    PAST_HALVING_DATES, ESTIMATED_HALVING_DATES, ROC_RTFO_OPTIONS, EII_OPTIONS,
+)
+from market_history import HISTORY, MarketHistory
+import metrics
+
+_HALVINGS = np.array(PAST_HALVING_DATES + ESTIMATED_HALVING_DATES, dtype="datetime64[D]")
+_FIRST_SUBSIDY = BLOCK_REWARD * 2 ** len(PAST_HALVING_DATES)   # 50 BTC
+
+
+def historical_subsidy(dates: np.ndarray) -> np.ndarray:
+    """Block subsidy (BTC) in force on each date, past halvings included."""
+    return _FIRST_SUBSIDY / 2.0 ** np.searchsorted(_HALVINGS, dates, side="right")
+
+
+def _miners(miners, mining_mw):
+    """(index, j_th, cost_per_mw_gbp, mining_mw) arrays for MINER_SPECS keys or a DataFrame."""
+    index, j_th, cost = _miner_arrays(miners)
+    if isinstance(miners, pd.DataFrame) and "mining_mw" in miners.columns:
+        mining_mw = miners["mining_mw"].to_numpy(dtype=float)
+    if mining_mw is None:
+        raise ValueError("mining_mw is required unless miners has a mining_mw column")
+    return index, j_th, cost, np.broadcast_to(np.asarray(mining_mw, dtype=float), j_th.shape)
+
+
+@dataclass
+class Backtest:
+    """Per-miner daily arrays (M × D) over the replayed days; accruals are per day (M)."""
+    miners: pd.Index
+    dates: np.ndarray
+    btc_price: np.ndarray           # (D,) GBP/BTC, the day's close carried over gaps
+    hashrate: np.ndarray            # (D,) EH/s, the day's mean carried over gaps
+    observed: np.ndarray            # (D,) both series were recorded that day
+    btc: np.ndarray
+    revenue_btc: np.ndarray
+    grid_savings: np.ndarray        # (M,) per day
+    costs: np.ndarray               # (M,) capex annuity + opex per day
+    mining_mwh: np.ndarray          # (M,) per day
+
+    @property
+    def net(self) -> np.ndarray:
+        """Daily net revenue (M × D)."""
+        return self.revenue_btc + (self.grid_savings - self.costs)[:, None]
+
+    @property
+    def coverage(self) -> float:
+        """Share of days with recorded (rather than carried-forward) market data."""
+        return float(self.observed.mean()) if len(self.observed) else 0.0
+
+    def summary(self) -> pd.DataFrame:
+        days = len(self.dates)
+        net = self.net.sum(axis=1)
+        mwh = self.mining_mwh * days
+        return pd.DataFrame({
+            "days": days,
+            "btc": self.btc.sum(axis=1),
+            "revenue_btc": self.revenue_btc.sum(axis=1),
+            "grid_savings": self.grid_savings * days,
+            "costs": self.costs * days,
+            "net_revenue": net,
+            "net_per_mwh": np.divide(net, mwh, out=np.zeros_like(net), where=mwh > 0),
+        }, index=self.miners)
+
+    def total(self) -> pd.Series:
+        """All rows as one fleet."""
+        out = self.summary().drop(columns=["days", "net_per_mwh"]).sum()
+        mwh = self.mining_mwh.sum() * len(self.dates)
+        out["days"] = len(self.dates)
+        out["net_per_mwh"] = out["net_revenue"] / mwh if mwh > 0 else 0.0
+        return out
+
+
+@metrics.timed("backtest")
+def backtest(chp_mw, load_factor, roc_rtfo, eii, mining_mw=None, miners=None, start=None, end=None,
+             history: Optional[MarketHistory] = None) -> Backtest:
+    """
+    Replay one site for each miner (or fleet row) over recorded days from `start` to
+    `end` (inclusive; default: all the history has), clipped to the recorded window.
+    """
+    history = history or HISTORY
+    window = history.window()
+    if window is None:
+        raise ValueError("no recorded market history yet (it builds up from live fetches)")
+    lo, hi = window
+    start = lo if start is None else max(np.datetime64(start, "D"), lo)
+    end = hi if end is None else min(np.datetime64(end, "D"), hi)
+    if start > end:
+        raise ValueError(f"no recorded market data in that window (history covers {lo} to {hi})")
+
+    dates = np.arange(start, end + 1)
+    price, price_seen = history.daily("price", start, end, how="last")
+    hashrate, hashrate_seen = history.daily("hashrate", start, end, how="mean")
+
+    index, j_th, cost, mw = _miners(miners, mining_mw)
+    base = _calculate_arrays({
+        "chp_mw": chp_mw, "load_factor": load_factor, "roc_rtfo": roc_rtfo, "eii": eii,
+        "mining_mw": mw, "j_th": j_th, "cost_per_mw_gbp": cost,
+    }, (float(price[-1]), float(hashrate[-1])))
+
+    per_th_btc = BLOCKS_PER_DAY * historical_subsidy(dates) * (1 - POOL_FEE_PCT) / (hashrate * 1_000_000)
+    btc = base["miner_th_s"][:, None] * per_th_btc[None, :]
+    return Backtest(
+        miners=index, dates=dates, btc_price=price, hashrate=hashrate,
+        observed=price_seen & hashrate_seen, btc=btc, revenue_btc=btc * price[None, :],
+        grid_savings=base["grid_savings"] / DAYS_PER_YEAR,
+        costs=(base["capex_annuity"] + base["opex_annual"]) / DAYS_PER_YEAR,
+        mining_mwh=base["actual_mining_mwh"] / DAYS_PER_YEAR,
+    )
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Backtest a site over recorded market history.")
+    ap.add_argument("--since", help="first day, YYYY-MM-DD (default: start of the history)")
+    ap.add_argument("--until", help="last day (default: end of the history)")
+    ap.add_argument("--chp-mw", type=float, required=True)
+    ap.add_argument("--load-factor", type=float, default=0.95)
+    ap.add_argument("--roc-rtfo", type=int, choices=range(len(ROC_RTFO_OPTIONS)), default=0,
+                    help="; ".join(f"{i}: {o}" for i, o in enumerate(ROC_RTFO_OPTIONS)))
+    ap.add_argument("--eii", type=int, choices=range(len(EII_OPTIONS)), default=0,
+                    help="; ".join(f"{i}: {o}" for i, o in enumerate(EII_OPTIONS)))
+    ap.add_argument("--mining-mw", type=float, required=True)
+    ap.add_argument("--miner", action="append", help="MINER_SPECS key (repeatable; default: all)")
+    args = ap.parse_args(argv)
+    bt = backtest(args.chp_mw, args.load_factor, ROC_RTFO_OPTIONS[args.roc_rtfo], EII_OPTIONS[args.eii],
+                  args.mining_mw, miners=args.miner, start=args.since, end=args.until)
+    print(f"{bt.dates[0]} to {bt.dates[-1]}: {len(bt.dates)} days, {bt.coverage:.0%} with recorded data")
+    print(bt.summary().to_string(float_format=lambda x: f"{x:,.2f}"))
+
+
+if __name__ == "__main__":
+    main()
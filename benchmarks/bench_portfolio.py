@@ -0,0 +1,53 @@
+# benchmarks/bench_portfolio.py
+"""
+Portfolio mode throughput on synthetic sites.
+
+    python benchmarks/bench_portfolio.py [--sites 10000] [--miners catalog|specs]
+"""
+import argparse, os, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from constants import ROC_RTFO_OPTIONS, EII_OPTIONS, FALLBACK_BTC_PRICE, FALLBACK_HASHRATE
+from portfolio import evaluate_portfolio
+
+
+def synthetic_sites(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    chp = np.round(rng.uniform(0.2, 5.0, n), 1)
+    return pd.DataFrame({
+        "site_id": [f"site{i:06d}" for i in range(n)],
+        "chp_mw": chp,
+        "load_factor": np.round(rng.uniform(0.80, 0.98, n), 2),
+        "roc_rtfo": rng.choice(ROC_RTFO_OPTIONS, n),
+        "eii": rng.choice(EII_OPTIONS, n),
+        "mining_mw": np.round(chp * rng.uniform(0.3, 1.1, n), 2),
+    })
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sites", type=int, default=10_000)
+    ap.add_argument("--miners", choices=["catalog", "specs"], default="catalog")
+    args = ap.parse_args()
+    market = (FALLBACK_BTC_PRICE, FALLBACK_HASHRATE)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "sites.csv"
+        synthetic_sites(args.sites).to_csv(src, index=False)
+        for processes in sorted({1, os.cpu_count() or 1}):
+            for suffix in (".parquet", ".csv"):
+                out = Path(tmp) / f"out{suffix}"
+                t = time.perf_counter()
+                n = evaluate_portfolio(src, out, args.miners, market=market, processes=processes)
+                dt = time.perf_counter() - t
+                print(f"{n:>8} sites  {args.miners:<7}  processes={processes:<3} {suffix:<8} "
+                      f"{dt:6.2f} s  {n / dt:9,.0f} sites/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start benchmark: time to first render of app.py in a fresh process, against a
+data directory holding only what the repo ships, with every upstream API served by
+benchmarks/stub_server.py and minerstat slowed down to a realistic full download.
+
+    python benchmarks/bench_startup.py [--repeats 3] [--minerstat-delay 5] [--blocking]
+
+Times run from the first line of the child process (interpreter start-up excluded) and
+are split into streamlit's import, the app's module imports and the script run itself;
+`refreshed` is when the background catalog refresh has landed. Exits 1 if the fast-start
+median misses STARTUP_BUDGET_S; run.py runs the same check as its "startup" group.
+"""
+import argparse, json, os, resource, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# stub route -> the constants.py URL it stands in for
+_URLS = {"coingecko": "COINGECKO_URL", "coingecko_history": "COINGECKO_HISTORY_URL",
+         "blockchain": "BLOCKCHAIN_URL", "minerstat": "MINERSTAT_URL"}
+
+
+def _child(base_url: str, fast: bool) -> None:
+    t0 = time.perf_counter()
+    import logging
+    logging.disable(logging.CRITICAL)
+    # patched before anything imports http_client, so requests stays lazily loaded
+    import constants
+    constants.FAST_START = fast
+    for route, attr in _URLS.items():
+        setattr(constants, attr, f"{base_url}/{route}")
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=300)
+    t1 = time.perf_counter()
+    at.run()
+    t2 = time.perf_counter()
+    import asics_data, metrics, startup
+    startup.wait(300)
+    t3 = time.perf_counter()
+    rerun = metrics.snapshot()[0]["rerun"][-1]
+    print(json.dumps({
+        "streamlit_s": t1 - t0, "app_imports_s": t2 - t1 - rerun, "script_s": rerun,
+        "first_render_s": t2 - t0, "refreshed_s": t3 - t0,
+        "catalog_source": asics_data.get_catalog().path.name,
+        "errors": [str(e.value) for e in at.exception],
+        "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def _cold_dir(tmp: Path) -> Path:
+    """A working directory whose data/ holds only the files tracked in git."""
+    tracked = subprocess.run(["git", "ls-files", "data"], cwd=ROOT, capture_output=True,
+                             text=True).stdout.split()
+    from constants import STARTUP_SNAPSHOT
+    for rel in {*tracked, STARTUP_SNAPSHOT}:
+        if (ROOT / rel).is_file():
+            (tmp / rel).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(ROOT / rel, tmp / rel)
+    return tmp
+
+
+def run_once(base_url: str, fast: bool = True) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = _cold_dir(Path(tmp))
+        env = dict(os.environ, PYTHONPATH=str(ROOT))
+        out = subprocess.run([sys.executable, __file__, "--child", base_url] + ([] if fast else ["--blocking"]),
+                             cwd=cwd, env=env, capture_output=True, text=True, timeout=600)
+    lines = out.stdout.strip().splitlines()
+    if out.returncode or not lines:
+        raise RuntimeError(f"startup child failed:\n{out.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def measure_startup(fast: bool = True, repeats: int = 3, minerstat_delay: float = 5.0) -> dict:
+    """Result in benchmarks/run.py's format, plus the budget and per-phase medians."""
+    import numpy as np
+    from constants import STARTUP_BUDGET_S
+    from stub_server import StubServer
+    with StubServer() as stub:
+        stub.delays["/minerstat"] = minerstat_delay
+        runs = [run_once(stub.base_url, fast) for _ in range(repeats)]
+    errors = [e for r in runs for e in r["errors"]]
+    if errors:
+        raise RuntimeError(f"app raised on first render: {errors[0]}")
+    s = np.array([r["first_render_s"] for r in runs])
+    result = {
+        "name": "startup_first_render" + ("" if fast else "_blocking"), "size": None,
+        "repeats": repeats, "number": 1,
+        "median_s": float(np.median(s)), "p95_s": float(np.percentile(s, 95)), "min_s": float(s.min()),
+        "throughput_per_s": float(1 / np.median(s)),
+        "peak_mem_mb": max(r["maxrss_mb"] for r in runs),
+        **{k: float(np.median([r[k] for r in runs]))
+           for k in ("streamlit_s", "app_imports_s", "script_s", "refreshed_s")},
+        "catalog_source": runs[-1]["catalog_source"],
+        "budget_s": STARTUP_BUDGET_S if fast else None,
+    }
+    print(f"{result['name']:<28} {'':>9}  median {result['median_s'] * 1e3:10.3f} ms  "
+          f"(streamlit {result['streamlit_s'] * 1e3:.0f} + imports {result['app_imports_s'] * 1e3:.0f} "
+          f"+ script {result['script_s'] * 1e3:.0f} ms)  refreshed {result['refreshed_s']:.2f} s "
+          f"from {result['catalog_source']}  peak RSS {result['peak_mem_mb']:.0f} MB", flush=True)
+    return result
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Cold-start time to first render")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--minerstat-delay", type=float, default=5.0, help="seconds the stub minerstat stalls")
+    ap.add_argument("--blocking", action="store_true", help="also measure with FAST_START off")
+    ap.add_argument("--child", metavar="BASE_URL", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        _child(args.child, fast=not args.blocking)
+        return
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    fast = measure_startup(True, args.repeats, args.minerstat_delay)
+    if args.blocking:
+        measure_startup(False, args.repeats, args.minerstat_delay)
+    if fast["median_s"] > fast["budget_s"]:
+        sys.exit(f"first render {fast['median_s']:.2f} s is over the {fast['budget_s']:.1f} s budget")
+    print(f"within the {fast['budget_s']:.1f} s budget")
+
+
+if __name__ == "__main__":
+    main()
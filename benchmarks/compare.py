@@ -0,0 +1,58 @@
+# benchmarks/compare.py
+"""
+Compare two benchmark runs written by benchmarks/run.py.
+
+    python benchmarks/compare.py BASE NEW [--threshold 0.15]
+
+BASE/NEW are result files or commit ids (looked up in benchmarks/results). Prints the
+median-time and peak-memory ratio per case and exits 1 if any case got slower (or
+hungrier) than the threshold allows.
+"""
+import argparse, json, sys
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def load(ref: str) -> dict:
+    path = Path(ref)
+    if not path.exists():
+        matches = sorted(RESULTS_DIR.glob(f"{ref}*.json"))
+        if not matches:
+            sys.exit(f"no results for {ref!r}")
+        path = matches[-1]
+    data = json.loads(path.read_text())
+    return {(r["name"], r["size"]): r for r in data["results"]} | {"_meta": data["meta"]}
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    args = ap.parse_args(argv)
+
+    base, new = load(args.base), load(args.new)
+    print(f"base {base.pop('_meta')['commit']}  →  new {new.pop('_meta')['commit']}")
+    print(f"{'case':<28} {'size':>9} {'base ms':>11} {'new ms':>11} {'time':>7} {'mem':>7}")
+    regressions = 0
+    for key in sorted(base.keys() & new.keys(), key=lambda k: (k[0], k[1] or 0)):
+        b, n = base[key], new[key]
+        t = n["median_s"] / b["median_s"]
+        m = n["peak_mem_mb"] / b["peak_mem_mb"] if b["peak_mem_mb"] else 1.0
+        flag = ""
+        if t > 1 + args.threshold or m > 1 + args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif t < 1 - args.threshold:
+            flag = "  faster"
+        name, size = key
+        print(f"{name:<28} {'' if size is None else size:>9} {b['median_s'] * 1e3:11.3f} "
+              f"{n['median_s'] * 1e3:11.3f} {t:6.2f}x {m:6.2f}x{flag}")
+    for key in sorted(base.keys() ^ new.keys(), key=lambda k: (k[0], k[1] or 0)):
+        print(f"{key[0]:<28} {'' if key[1] is None else key[1]:>9}  only in {'base' if key in base else 'new'}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
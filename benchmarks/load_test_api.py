@@ -0,0 +1,111 @@
+# benchmarks/load_test_api.py
+"""
+Load test for api.py: starts the service in a subprocess, fires requests with a fixed
+concurrency and reports p50/p99 latency and requests per second.
+
+    python benchmarks/load_test_api.py [--requests 5000] [--concurrency 32]
+        [--endpoint calculate|batch|catalog] [--unique 0.1]
+
+`--unique` is the fraction of distinct scenarios (the rest repeat, so hit the LRU).
+"""
+import argparse, asyncio, json, subprocess, sys, time
+from pathlib import Path
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from constants import ROC_RTFO_OPTIONS, EII_OPTIONS, MINER_SPECS
+
+
+def scenarios(n: int, unique: float, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    distinct = max(1, int(n * unique))
+    base = [{
+        "chp_mw": round(float(rng.uniform(0.2, 5.0)), 1),
+        "load_factor": round(float(rng.uniform(0.80, 0.98)), 2),
+        "roc_rtfo": str(rng.choice(ROC_RTFO_OPTIONS)),
+        "eii": str(rng.choice(EII_OPTIONS)),
+        "mining_mw": round(float(rng.uniform(0.1, 5.0)), 2),
+        "miner_model": str(rng.choice(list(MINER_SPECS))),
+    } for _ in range(distinct)]
+    return [base[i] for i in rng.integers(0, distinct, n)]
+
+
+async def _wait_ready(client, url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.fetch(url + "/health")
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def run(url: str, endpoint: str, n: int, concurrency: int, unique: float) -> None:
+    AsyncHTTPClient.configure(None, max_clients=concurrency)
+    client = AsyncHTTPClient()
+    await _wait_ready(client, url)
+    bodies = scenarios(n, unique)
+    if endpoint == "catalog":
+        from asics_data import load_today_df
+        ids = load_today_df()["id"].to_numpy()
+        reqs = [dict(request=f"{url}/catalog/{ids[i % len(ids)]}") for i in range(n)]
+    elif endpoint == "batch":
+        reqs = [dict(request=f"{url}/batch", method="POST",
+                     body=json.dumps({"scenarios": bodies[i:i + 100]})) for i in range(0, n, 100)]
+    else:
+        reqs = [dict(request=f"{url}/calculate", method="POST", body=json.dumps(b)) for b in bodies]
+
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for r in reqs:
+        queue.put_nowait(r)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            r = queue.get_nowait()
+            t = time.perf_counter()
+            try:
+                await client.fetch(**r)
+            except HTTPClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    lat = np.array(latencies) * 1000
+    stats = json.loads((await client.fetch(url + "/health")).body)["cache"]
+    print(f"{endpoint}: {len(reqs)} requests, concurrency {concurrency}, unique {unique:.0%}")
+    print(f"  p50 {np.percentile(lat, 50):.2f} ms  p99 {np.percentile(lat, 99):.2f} ms  "
+          f"{len(reqs) / elapsed:,.0f} req/s  errors {errors}")
+    print(f"  result cache: {stats}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--endpoint", choices=["calculate", "batch", "catalog"], default="calculate")
+    ap.add_argument("--unique", type=float, default=0.1)
+    ap.add_argument("--port", type=int, default=8799)
+    args = ap.parse_args()
+
+    server = subprocess.Popen([sys.executable, str(ROOT / "api.py"), "--port", str(args.port)],
+                              cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(run(f"http://127.0.0.1:{args.port}", args.endpoint, args.requests,
+                        args.concurrency, args.unique))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
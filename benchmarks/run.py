@@ -0,0 +1,315 @@
+# benchmarks/run.py
+"""
+Benchmark suite for the hot paths: calculate(), calculate_batch(), break_even() across
+a catalog, sensitivities(), pick_top_six(), load_today_df(), get_specs_by_id(),
+_fetch_minerstat_sha256(), the live market fetch, backtest() over five years of
+recorded market history, a year of per-unit fleet reliability simulation
+(fleet_sim.py), block store ingest and rolling rewards (block_store.py) and the app's
+cold-start time to first render (benchmarks/bench_startup.py).
+Upstream APIs are replaced by benchmarks/stub_server.py; catalogs are synthetic
+and scaled from 260 to 1M rows. Each case records latency (median/p95/min), throughput
+and peak traced memory, and the run is saved as JSON (by default
+benchmarks/results/<commit>.json) for benchmarks/compare.py. Cases with a budget
+(first render: STARTUP_BUDGET_S) fail the run when their median is over it.
+
+    python benchmarks/run.py [--quick] [--sizes 260 10000 ...] [--out results.json]
+"""
+import argparse, contextlib, datetime as dt, gc, json, os, platform, subprocess, sys
+import tempfile, time, tracemalloc
+from pathlib import Path
+from typing import Callable, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+import pandas as pd
+
+import asics_data
+from asic_history import AsicHistory
+from backtest import backtest
+from block_store import BLOCK, BlockStore, subsidy_sat
+from breakeven import break_even, sensitivities
+from calculator import calculate, calculate_batch
+from fleet_sim import build_fleet, simulate_fleet
+from constants import MINER_SPECS, ROC_RTFO_OPTIONS, EII_OPTIONS, FALLBACK_BTC_PRICE, FALLBACK_HASHRATE
+from market_data import _fetch_live
+from market_history import MarketHistory
+from stub_server import StubServer
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SIZES = [260, 10_000, 100_000, 1_000_000]
+QUICK_SIZES = [260, 10_000]
+MARKET = (FALLBACK_BTC_PRICE, FALLBACK_HASHRATE)
+BRANDS = ["Bitmain", "MicroBT", "Canaan", "Bitdeer", "Auradine", "Innosilicon", "Jasminer",
+          "Goldshell", "iPollo", "Ebang", "StrongU", "Bitaxe", "Fluminer", "Elphapex"]
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> pd.DataFrame:
+    """A catalog-shaped frame with n models (unique ids and names)."""
+    rng = np.random.default_rng(seed)
+    ths = np.round(rng.uniform(10, 1200, n), 2)
+    eff = np.round(rng.uniform(9.5, 40, n), 2)
+    brand = np.asarray(BRANDS, dtype=object)[rng.integers(0, len(BRANDS), n)]
+    ids = np.char.mod("%040x", np.arange(n)).astype(object)
+    return pd.DataFrame({
+        "id": ids,
+        "name": brand + " Model " + np.char.mod("%d", np.arange(n)).astype(object),
+        "brand": brand,
+        "url": np.char.mod("model-%d", np.arange(n)).astype(object),
+        "hashrate_THs": ths,
+        "power_W": np.round(ths * eff, 0),
+        "efficiency_J_per_TH": eff,
+        "retrieved_at": dt.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
+    })
+
+
+def synthetic_scenarios(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    chp = np.round(rng.uniform(0.1, 5.0, n), 1)
+    return pd.DataFrame({
+        "chp_mw": chp,
+        "load_factor": np.round(rng.uniform(0.80, 0.98, n), 2),
+        "roc_rtfo": rng.choice(ROC_RTFO_OPTIONS, n),
+        "eii": rng.choice(EII_OPTIONS, n),
+        "miner_model": rng.choice(list(MINER_SPECS), n),
+        "mining_mw": np.round(chp * rng.uniform(0.1, 1.1, n), 2),
+    })
+
+
+@contextlib.contextmanager
+def isolated_store(catalog: pd.DataFrame):
+    """Point asics_data at a temporary history store holding `catalog` (ingested today)."""
+    saved = (asics_data.DATA_DIR, asics_data.HISTORY, asics_data._VALIDATORS_PATH, asics_data._CATALOG)
+    with tempfile.TemporaryDirectory() as tmp:
+        history = AsicHistory(Path(tmp) / "minerstat_history")
+        history.append(catalog)
+        asics_data.DATA_DIR, asics_data.HISTORY = Path(tmp), history
+        asics_data._VALIDATORS_PATH = history.root / "_minerstat_validators.json"
+        asics_data._CATALOG = asics_data.AsicCatalog()
+        try:
+            yield history
+        finally:
+            (asics_data.DATA_DIR, asics_data.HISTORY,
+             asics_data._VALIDATORS_PATH, asics_data._CATALOG) = saved
+
+
+def measure(name: str, fn: Callable, size: Optional[int] = None, items: int = 1,
+            repeats: int = 7, setup: Optional[Callable] = None, min_sample: float = 0.002) -> dict:
+    """
+    Time `fn` (after `setup`, untimed, each sample). Fast calls are looped so a sample
+    lasts at least `min_sample` seconds. `items` per call gives the throughput. Peak
+    memory comes from one extra run under tracemalloc, so it does not skew timings.
+    """
+    if setup:
+        setup()
+    fn()  # warm-up
+    number = 1
+    if setup is None:
+        t = time.perf_counter()
+        fn()
+        once = time.perf_counter() - t
+        number = max(1, int(min_sample / max(once, 1e-9)))
+    samples = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        gc.collect()
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t) / number)
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    s = np.array(samples)
+    result = {
+        "name": name, "size": size, "repeats": repeats, "number": number,
+        "median_s": float(np.median(s)), "p95_s": float(np.percentile(s, 95)), "min_s": float(s.min()),
+        "throughput_per_s": float(items / np.median(s)), "peak_mem_mb": peak / 1e6,
+    }
+    print(f"{name:<28} {'' if size is None else size:>9}  median {result['median_s'] * 1e3:10.3f} ms  "
+          f"p95 {result['p95_s'] * 1e3:10.3f} ms  {result['throughput_per_s']:14,.0f}/s  "
+          f"peak {result['peak_mem_mb']:8.1f} MB", flush=True)
+    return result
+
+
+def bench_calculator(sizes: List[int]) -> List[dict]:
+    out = [measure("calculate", lambda: calculate(1.0, 0.92, ROC_RTFO_OPTIONS[0], EII_OPTIONS[0],
+                                                  next(iter(MINER_SPECS)), 0.5, market=MARKET))]
+    for n in sizes:
+        sc = synthetic_scenarios(n)
+        out.append(measure("calculate_batch", lambda: calculate_batch(sc, MARKET), n, items=n,
+                           repeats=3 if n >= 1_000_000 else 7))
+    site = (1.0, 0.92, ROC_RTFO_OPTIONS[0], EII_OPTIONS[1], 0.5)
+    out.append(measure("sensitivities", lambda: sensitivities(*site, 22.0, 1_800_000, market=MARKET)))
+    for n in sizes:
+        cat = synthetic_catalog(n)
+        out.append(measure("break_even_catalog", lambda: break_even(*site, catalog=cat, market=MARKET), n,
+                           items=n, repeats=3 if n >= 1_000_000 else 7))
+    return out
+
+
+def bench_catalog(sizes: List[int]) -> List[dict]:
+    out = []
+    for n in sizes:
+        cat = synthetic_catalog(n)
+        repeats = 3 if n >= 1_000_000 else 7
+        out.append(measure("pick_top_six", lambda: asics_data.pick_top_six(cat), n, repeats=repeats))
+        with isolated_store(cat):
+            out.append(measure("load_today_df_cold", asics_data.load_today_df, n, repeats=repeats,
+                               setup=asics_data._CATALOG.invalidate))
+            asics_data.load_today_df()
+            out.append(measure("load_today_df_warm", asics_data.load_today_df, n))
+            keys = cat["id"].to_numpy()[np.random.default_rng(1).integers(0, n, 1000)]
+            out.append(measure("get_specs_by_id", lambda: [asics_data.get_specs_by_id(k) for k in keys],
+                               n, items=len(keys)))
+    return out
+
+
+def bench_fetch(sizes: List[int]) -> List[dict]:
+    out = []
+    with StubServer() as stub:
+        out.append(measure("market_fetch_live", _fetch_live))
+        out.append(measure("minerstat_fetch_fixture", asics_data._fetch_minerstat_sha256, 262, items=262))
+        for n in sizes:
+            stub.minerstat_rows = n
+            stub.payload("/minerstat")   # build the synthetic payload outside the timings
+            out.append(measure("minerstat_fetch", asics_data._fetch_minerstat_sha256, n, items=n,
+                               repeats=3 if n >= 100_000 else 7))
+            validators = {"etag": stub.etag("/minerstat")}
+            out.append(measure("minerstat_fetch_304", lambda: asics_data._fetch_minerstat_sha256(validators), n))
+    return out
+
+
+def synthetic_market_history(root: Path, years: int = 5, seed: int = 0) -> MarketHistory:
+    """Hourly price and daily hashrate random walks ending today."""
+    rng = np.random.default_rng(seed)
+    end = np.datetime64(dt.date.today(), "s")
+    hours = np.arange(end - np.timedelta64(years * 365 * 24, "h"), end, np.timedelta64(1, "h"))
+    days = hours[::24]
+    history = MarketHistory(root)
+    history.append("price", zip(hours.astype(float), 80_000 * np.exp(np.cumsum(rng.normal(0, 0.007, len(hours))))))
+    history.append("hashrate", zip(days.astype(float), 1_000 * np.exp(np.cumsum(rng.normal(0.0008, 0.02, len(days))))))
+    return history
+
+
+def bench_backtest(sizes: List[int]) -> List[dict]:
+    site = (1.0, 0.92, ROC_RTFO_OPTIONS[0], EII_OPTIONS[0], 0.5)
+    with tempfile.TemporaryDirectory() as tmp:
+        history = synthetic_market_history(Path(tmp) / "market_history")
+        out = [measure("backtest_5y", lambda: backtest(*site, history=history), len(MINER_SPECS))]
+        for n in sizes:
+            cat = synthetic_catalog(n)
+            out.append(measure("backtest_5y_catalog", lambda: backtest(*site, miners=cat, history=history), n,
+                               items=n))
+    return out
+
+
+def bench_fleet(sizes: List[int]) -> List[dict]:
+    # a year of a two-model fleet: failures, repairs, spares and curtailment
+    out = []
+    for n in sizes:
+        fleet = build_fleet(pd.DataFrame({"hashrate_THs": [200.0, 100.0], "power_W": [3500.0, 3000.0],
+                                          "units": [n - n // 2, n // 2]}))
+        out.append(measure("fleet_sim_1y", lambda: simulate_fleet(fleet, seed=0), n, items=n))
+    return out
+
+
+def synthetic_blocks(n: int, seed: int = 0) -> np.ndarray:
+    """n consecutive BLOCK records ending at height 920,000 (exponential spacing, lognormal fees)."""
+    rng = np.random.default_rng(seed)
+    out = np.zeros(n, BLOCK)
+    out["height"] = np.arange(920_000 - n, 920_000)
+    out["time"] = 1_760_000_000 + np.cumsum(rng.exponential(600, n)).astype(np.int64)
+    out["subsidy"] = subsidy_sat(out["height"])
+    out["fees"] = rng.lognormal(np.log(2_000_000), 0.5, n).astype(np.int64)
+    out["difficulty"] = 150e12 * np.repeat(1.02 ** np.arange(n // 2016 + 1), 2016)[:n]
+    return out
+
+
+def bench_blocks(sizes: List[int]) -> List[dict]:
+    # ingest into an empty store, then one rolling pass (every 1008-block window) over it
+    out = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            blocks = synthetic_blocks(n)
+            path = Path(tmp) / f"blocks_{n}.bin"
+            store = BlockStore(path)
+
+            def fresh():
+                path.unlink(missing_ok=True)
+                store._map, store._rolled = (-1, np.empty(0, BLOCK)), {}
+
+            out.append(measure("block_store_append", lambda: store.append(blocks), n, items=n, setup=fresh))
+            out.append(measure("block_store_rolling", lambda: store.rolling(), n, items=n,
+                               setup=lambda: setattr(store, "_rolled", {})))
+    return out
+
+
+def bench_startup() -> List[dict]:
+    from bench_startup import measure_startup
+    return [measure_startup(fast=True)]
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Hot-path benchmark suite")
+    ap.add_argument("--quick", action="store_true", help=f"sizes {QUICK_SIZES} only")
+    ap.add_argument("--sizes", type=int, nargs="+", help=f"catalog/batch sizes (default {SIZES})")
+    ap.add_argument("--max-fetch-rows", type=int, default=100_000,
+                    help="largest synthetic minerstat payload to download")
+    ap.add_argument("--only", choices=["calculator", "catalog", "fetch", "backtest", "fleet", "blocks", "startup"], nargs="+")
+    ap.add_argument("--out", type=Path, help="results file (default results/<commit>.json)")
+    args = ap.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    groups = args.only or ["calculator", "catalog", "fetch", "backtest", "fleet", "blocks", "startup"]
+    results = []
+    if "calculator" in groups:
+        results += bench_calculator(sizes)
+    if "catalog" in groups:
+        results += bench_catalog(sizes)
+    if "fetch" in groups:
+        results += bench_fetch([n for n in sizes if n <= args.max_fetch_rows])
+    if "backtest" in groups:
+        results += bench_backtest([n for n in sizes if n <= 10_000])   # M × 1826-day arrays
+    if "fleet" in groups:
+        results += bench_fleet([n for n in sizes if n <= 100_000])   # units
+    if "blocks" in groups:
+        results += bench_blocks(sizes)   # blocks (1M ≈ 19 years)
+    if "startup" in groups:
+        results += bench_startup()
+
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    meta = {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+        "platform": platform.platform(), "cpu_count": os.cpu_count(),
+    }
+    out = args.out or RESULTS_DIR / f"{commit}{'-dirty' if meta['dirty'] else ''}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": meta, "results": results}, indent=1))
+    print(f"wrote {out}")
+
+    over = [r for r in results if r.get("budget_s") and r["median_s"] > r["budget_s"]]
+    for r in over:
+        print(f"OVER BUDGET: {r['name']} median {r['median_s']:.3f} s > {r['budget_s']} s")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/stub_server.py
+"""
+Local stand-in for minerstat, CoinGecko and blockchain.info, serving the payloads in
+benchmarks/fixtures. The minerstat route can also serve a synthetic hardware list of
+any size (the fixture's models repeated under fresh ids) and honours If-None-Match,
+so full and 304 downloads can both be timed. `delays` slows a route down, e.g. to a
+realistic minerstat download.
+
+    with StubServer() as stub:      # http_client endpoints point at the stub inside
+        stub.minerstat_rows = 100_000
+        stub.delays["/minerstat"] = 5.0
+        ...
+"""
+import json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+import http_client
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+_ROUTES = {
+    "/coingecko": "coingecko_price.json",
+    "/coingecko_history": "coingecko_history.json",
+    "/blockchain": "blockchain_hashrate.json",
+    "/minerstat": "minerstat_hardware.json",
+}
+
+
+def synthetic_hardware(items: list, rows: int) -> bytes:
+    """A minerstat-style JSON array of `rows` entries cycled from `items`."""
+    parts = []
+    for i in range(rows):
+        item = dict(items[i % len(items)])
+        k = i // len(items)
+        if k:
+            item["id"] = f"{item['id']}-{k}"
+            item["name"] = f"{item['name']} #{k}"
+        parts.append(json.dumps(item, separators=(",", ":")))
+    return ("[" + ",".join(parts) + "]").encode()
+
+
+class StubServer:
+    def __init__(self, fixtures: Path = FIXTURES):
+        self.fixtures = Path(fixtures)
+        self._payloads: Dict[str, bytes] = {route: (self.fixtures / name).read_bytes()
+                                            for route, name in _ROUTES.items()}
+        self._items = json.loads(self._payloads["/minerstat"])
+        self._synthetic: Dict[int, bytes] = {}
+        self.minerstat_rows: Optional[int] = None   # None: serve the fixture as-is
+        self.delays: Dict[str, float] = {}           # route -> seconds before answering
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._saved = {}
+
+    def payload(self, route: str) -> bytes:
+        if route == "/minerstat" and self.minerstat_rows is not None:
+            n = self.minerstat_rows
+            if n not in self._synthetic:
+                self._synthetic = {n: synthetic_hardware(self._items, n)}
+            return self._synthetic[n]
+        return self._payloads[route]
+
+    def etag(self, route: str) -> str:
+        rows = self.minerstat_rows if route == "/minerstat" else None
+        return f'"{route.strip("/")}-{rows}"'
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                route = self.path.split("?")[0]
+                if route not in _ROUTES:
+                    self.send_error(404)
+                    return
+                time.sleep(stub.delays.get(route, 0.0))
+                etag = stub.etag(route)
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                body = stub.payload(route)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self) -> "StubServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, name="stub-http", daemon=True).start()
+        for route in _ROUTES:
+            name = route.strip("/")
+            self._saved[name] = http_client.ENDPOINTS[name]
+            http_client.configure(name, url=self.base_url + route)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for name, ep in self._saved.items():
+            http_client.configure(name, url=ep.url, timeout=ep.timeout, hedge_after=ep.hedge_after)
+        self._server.shutdown()
+        self._server.server_close()
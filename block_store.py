@@ -0,0 +1,292 @@
+# block_store.py
+"""
+Per-block reward data (height, timestamp, subsidy, fees, difficulty) in a compact local store.
+
+calculate() by default pays BLOCKS_PER_DAY × BLOCK_REWARD a day, shared by network
+hashrate: no fees and an assumed ten-minute cadence. Here every block is one fixed-width
+record (BLOCK, 40 bytes; amounts in satoshis) appended in height order to
+BLOCK_STORE_PATH and read back as a read-only np.memmap. A block takes on average
+difficulty × 2³² hashes, so over any run of blocks
+
+    BTC per TH/s per day = Σ (subsidy + fees) / Σ (difficulty × 2³² / 10¹²) × 86,400
+
+which needs neither the network hashrate nor the cadence (both are reported alongside).
+rolling() evaluates it for every window end at once from cumulative sums. With
+REWARD_SOURCE = "blocks" (or reward_source="blocks" on calculate() and the engines built
+on it) the latest window × the market hashrate is the BTC paid to the network per day,
+in place of BLOCKS_PER_DAY × BLOCK_REWARD.
+
+New blocks come from mempool.space (fetch(): pages walked back from the tip until the
+stored height; refresh_async() runs it in a daemon thread, so readers never wait on it).
+Windows only ever span consecutive heights: one that would cross a hole in the store is
+left out. BLOCK_FIXTURE is a synthetic fortnight in the same JSON format, so the store
+and the calculator can be exercised offline; --record replaces it with live pages.
+
+    python block_store.py [--fixture] [--fetch] [--window 1008] [--record PATH]
+"""
+from __future__ import annotations
+import argparse, json, logging, os, threading, time
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from constants import (
+    BLOCK_STORE_PATH, BLOCK_FIXTURE, BLOCK_WINDOW, BLOCK_FETCH_MAX_PAGES, BLOCK_REFRESH_RETRY,
+)
+import metrics
+
+log = logging.getLogger(__name__)
+
+BLOCK = np.dtype([("height", "<i8"), ("time", "<i8"), ("subsidy", "<i8"), ("fees", "<i8"),
+                  ("difficulty", "<f8")])
+_SAT = 100_000_000
+_TH_PER_DIFFICULTY = 2 ** 32 / 1e12       # expected TH of work per unit of difficulty
+_HALVING_INTERVAL = 210_000
+
+
+def subsidy_sat(height) -> np.ndarray:
+    """Block subsidy in satoshis at each height (50 BTC halved every 210,000 blocks)."""
+    era = np.minimum(np.asarray(height, dtype=np.int64) // _HALVING_INTERVAL, 63)
+    return np.right_shift(np.int64(50 * _SAT), era)
+
+
+def from_mempool(raw: Iterable[dict]) -> np.ndarray:
+    """
+    BLOCK records from mempool.space /api/v1/blocks entries (height, timestamp,
+    difficulty, extras.reward / extras.totalFees). Without extras the subsidy comes from
+    the height and fees are 0.
+    """
+    raw = list(raw)
+    out = np.zeros(len(raw), BLOCK)
+    for i, b in enumerate(raw):
+        extras = b.get("extras") or {}
+        fees = int(extras.get("totalFees") or 0)
+        reward = extras.get("reward")
+        subsidy = int(reward) - fees if reward is not None else int(subsidy_sat(b["height"]))
+        out[i] = (b["height"], b["timestamp"], subsidy, fees, b["difficulty"])
+    return out
+
+
+class BlockStore:
+    """Append-only BLOCK records in one file; reads are a memory map of the whole records."""
+
+    def __init__(self, path=BLOCK_STORE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()             # serialises appends and refresh starts
+        # Immutable snapshots, swapped whole and read once per call, so readers on other
+        # threads never see one half-updated: (size it was mapped at, records) and
+        # ((records, window), rolling() frame).
+        self._map = (-1, np.empty(0, BLOCK))
+        self._rolled = (None, None)
+        self._thread: Optional[threading.Thread] = None
+        self._last_attempt = 0.0
+
+    def _mapped(self) -> tuple:
+        """(size, records) for the file as it is now, remapped only when it has grown."""
+        try:
+            size = os.path.getsize(self.path) // BLOCK.itemsize * BLOCK.itemsize
+        except OSError:
+            size = 0
+        current = self._map
+        if size != current[0]:
+            # a torn final record (crash mid-append) is left out of the map
+            rec = (np.memmap(self.path, dtype=BLOCK, mode="r", shape=(size // BLOCK.itemsize,))
+                   if size else np.empty(0, BLOCK))
+            current = self._map = (size, rec)
+        return current
+
+    def read(self) -> np.ndarray:
+        """Every stored block (ascending height), memory-mapped read-only."""
+        return self._mapped()[1]
+
+    def __len__(self) -> int:
+        return len(self.read())
+
+    def last_height(self) -> int:
+        rec = self.read()
+        return int(rec["height"][-1]) if len(rec) else -1
+
+    def append(self, blocks: np.ndarray) -> int:
+        """Append the blocks above the stored tip (deduplicated, in height order). Returns how many."""
+        blocks = np.asarray(blocks, dtype=BLOCK)
+        with self._lock:
+            h = blocks["height"]
+            if len(h) > 1 and not (h[1:] > h[:-1]).all():
+                blocks = blocks[np.argsort(h, kind="stable")]
+                h = blocks["height"]
+                blocks = blocks[np.r_[True, h[1:] != h[:-1]]]
+            size, rec = self._mapped()
+            if len(rec):
+                blocks = blocks[blocks["height"] > rec["height"][-1]]
+            if len(blocks):
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.truncate(size)              # drop a torn record before appending
+                    f.write(blocks.tobytes())
+        metrics.inc("block_store_ingest", result="appended" if len(blocks) else "unchanged")
+        return len(blocks)
+
+    def load_fixture(self, path=BLOCK_FIXTURE) -> int:
+        """Ingest a recorded mempool.space response (a JSON list of blocks)."""
+        return self.append(from_mempool(json.loads(Path(path).read_text())))
+
+    def fetch(self, max_pages: int = BLOCK_FETCH_MAX_PAGES) -> int:
+        """
+        Ingest new blocks from mempool.space: pages of 15 walked back from the tip until
+        the stored height, however many pages that takes, so the store stays gap-free.
+        An empty store starts from the latest `max_pages` pages. Raises (appending
+        nothing) if a page fails before the walk reaches the stored height.
+        """
+        stop = self.last_height()
+        return self.append(from_mempool(_walk_back(stop, max_pages if stop < 0 else None)))
+
+    def _refresh(self) -> None:
+        try:
+            with metrics.span("block_refresh"):
+                n = self.fetch()
+            metrics.inc("block_refresh", result="ok")
+            log.info("block store: %d new blocks from mempool.space", n)
+        except Exception as exc:
+            metrics.inc("block_refresh", result="failed")
+            log.warning("block store: mempool.space top-up failed (%s); serving stored blocks", exc)
+
+    def refresh_async(self, retry: float = BLOCK_REFRESH_RETRY) -> bool:
+        """
+        fetch() in a daemon thread: single-flight, and attempted at most every `retry`
+        seconds. Returns True while a top-up is running.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return True
+            if time.time() - self._last_attempt < retry:
+                return False
+            self._last_attempt = time.time()
+            self._thread = threading.Thread(target=self._refresh, name="block-refresh", daemon=True)
+            self._thread.start()
+            return True
+
+    def rolling(self, window: int = BLOCK_WINDOW) -> pd.DataFrame:
+        """
+        Per window of `window` consecutive stored blocks, indexed by the last block's height:
+        time, btc_per_th_day (subsidy + fees, before pool fee), fee_share, blocks_per_day
+        and hashrate_ehs (implied by the work and the timestamps). Empty if too few blocks.
+        """
+        rec = self.read()
+        key = (len(rec), window)
+        cached = self._rolled
+        if cached[0] == key:
+            return cached[1]
+        n = len(rec)
+        window = max(2, int(window))
+        if n < window:
+            return pd.DataFrame(columns=["time", "btc_per_th_day", "fee_share", "blocks_per_day", "hashrate_ehs"])
+        reward = (rec["subsidy"] + rec["fees"]).astype(float) / _SAT
+        work = rec["difficulty"] * _TH_PER_DIFFICULTY
+        c_reward = np.concatenate([[0.0], np.cumsum(reward)])
+        c_fees = np.concatenate([[0.0], np.cumsum(rec["fees"] / _SAT)])
+        c_work = np.concatenate([[0.0], np.cumsum(work)])
+        end = np.arange(window, n + 1)            # exclusive window ends
+        start = end - window
+        h = rec["height"]
+        whole = h[end - 1] - h[start] == window - 1      # no missing heights inside
+        end, start = end[whole], start[whole]
+        r = c_reward[end] - c_reward[start]
+        t = rec["time"]
+        span = (t[end - 1] - t[start]).astype(float)   # seconds over window - 1 intervals
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = pd.DataFrame({
+                "time": pd.to_datetime(t[end - 1], unit="s", utc=True),
+                "btc_per_th_day": r / (c_work[end] - c_work[start]) * 86_400,
+                "fee_share": (c_fees[end] - c_fees[start]) / r,
+                "blocks_per_day": np.where(span > 0, (window - 1) / span * 86_400, np.nan),
+                # work of every block after the first, over the time it took (TH/s → EH/s)
+                "hashrate_ehs": np.where(span > 0, (c_work[end] - c_work[start + 1]) / span / 1e6, np.nan),
+            }, index=pd.Index(h[end - 1], name="height"))
+        self._rolled = (key, out)
+        return out
+
+    def latest(self, window: int = BLOCK_WINDOW) -> Optional[pd.Series]:
+        """
+        The most recent window (fewer blocks if that is all the store has since its last
+        gap), or None.
+        """
+        h = self.read()["height"]
+        gaps = np.flatnonzero(np.diff(h) != 1)
+        tail = len(h) - (gaps[-1] + 1 if len(gaps) else 0)
+        if tail < 2:
+            return None
+        return self.rolling(min(window, tail)).iloc[-1]
+
+    def btc_per_th_day(self, window: int = BLOCK_WINDOW) -> float:
+        """BTC per TH/s per day (subsidy + fees, before pool fee) over the latest window."""
+        row = self.latest(window)
+        if row is None:
+            raise ValueError(f"block store {self.path} is empty; run `python block_store.py --fetch`")
+        return float(row["btc_per_th_day"])
+
+
+def _walk_back(stop: int, max_pages: Optional[int]) -> list:
+    """
+    Raw mempool.space blocks from the tip back to height `stop` + 1 (or `max_pages`
+    pages). Without a stop a failed page ends the walk with what arrived; with one it
+    raises, since the part above a hole could never be filled in later.
+    """
+    import http_client
+    pages, raw = 0, []
+    page = http_client.get_json("mempool_blocks")
+    while page:
+        raw += page
+        pages += 1
+        low = min(b["height"] for b in page)
+        if low <= stop + 1 or low == 0 or (max_pages is not None and pages >= max_pages):
+            break
+        try:
+            page = http_client.get_json("mempool_blocks", path=f"/{low - 1}")
+        except Exception:
+            if stop >= 0:
+                raise
+            break
+    return raw
+
+def record(path=BLOCK_FIXTURE, max_pages: int = BLOCK_FETCH_MAX_PAGES) -> int:
+    """Write the latest `max_pages` live pages as a fixture (the raw JSON list). Returns how many blocks."""
+    raw = sorted(_walk_back(-1, max_pages), key=lambda b: b["height"])
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(raw))
+    return len(raw)
+
+
+BLOCKS = BlockStore()
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Ingest per-block rewards and show the rolling reward per TH/s.")
+    ap.add_argument("--fixture", nargs="?", const=BLOCK_FIXTURE, help=f"ingest a recorded file (default {BLOCK_FIXTURE})")
+    ap.add_argument("--fetch", action="store_true", help="ingest new blocks from mempool.space")
+    ap.add_argument("--store", default=BLOCK_STORE_PATH)
+    ap.add_argument("--window", type=int, default=BLOCK_WINDOW)
+    ap.add_argument("--record", metavar="PATH", help="write the latest live pages to PATH as a fixture")
+    ap.add_argument("--pages", type=int, default=BLOCK_FETCH_MAX_PAGES, help="pages of 15 blocks to --record")
+    args = ap.parse_args(argv)
+    if args.record:
+        print(f"recorded {record(args.record, args.pages)} blocks → {args.record}")
+    store = BlockStore(args.store)
+    if args.fixture:
+        print(f"fixture: {store.load_fixture(args.fixture)} new blocks")
+    if args.fetch:
+        print(f"mempool.space: {store.fetch()} new blocks")
+    row = store.latest(args.window)
+    if row is None:
+        print(f"{store.path}: no blocks stored")
+        return
+    rec = store.read()
+    print(f"{store.path}: {len(rec):,} blocks, heights {rec['height'][0]:,} to {rec['height'][-1]:,}")
+    print(f"last {min(args.window, len(rec)):,} blocks to {row['time']:%Y-%m-%d %H:%M} UTC: "
+          f"{row['btc_per_th_day'] * 1e8:,.1f} sat per TH/s per day, fees {row['fee_share']:.2%} of rewards, "
+          f"{row['blocks_per_day']:.1f} blocks/day, {row['hashrate_ehs']:,.0f} EH/s implied")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# breakeven.py
+"""
+Break-even points and one-at-a-time sensitivities of a site's economics.
+
+Net revenue is linear in the BTC price, in 1 / network hashrate and in the
+grid-savings rate:
+
+    net = total_btc × price + rate × mining_mwh − (capex_annuity + opex),   total_btc ∝ 1 / hashrate
+
+so the price, hashrate and rate at which mining stops paying are closed-form for every
+catalog row at once. The load factor enters through a cap (mining MWh is limited by the
+site's exportable energy), so it is solved by vectorized bisection, each step one
+_calculate_arrays pass over all rows. sensitivities() moves every calculate() input
+down and up one at a time and evaluates all the variants in one batched pass.
+"""
+from __future__ import annotations
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from calculator import _calculate_arrays, _grid_save_mwh, _miner_arrays, _with_reward_source
+from constants import (
+    FALLBACK_HASHRATE, MINING_UPTIME, ROC_RTFO_OPTIONS, EII_OPTIONS, REWARD_SOURCE,
+    SENSITIVITY_DELTA, BREAKEVEN_BISECT_ITERS,
+)
+import metrics
+
+
+def bisect(fn: Callable[[np.ndarray], np.ndarray], lo, hi, iters: int = BREAKEVEN_BISECT_ITERS) -> np.ndarray:
+    """
+    Per-element root of a non-decreasing `fn` on [lo, hi], every element stepped together
+    (one call of `fn` per halving). NaN where fn(hi) < 0; lo where fn(lo) ≥ 0.
+    """
+    lo, hi = np.broadcast_arrays(np.asarray(lo, dtype=float), np.asarray(hi, dtype=float))
+    lo, hi = lo.copy(), hi.copy()
+    start, never = fn(lo) >= 0, fn(hi) < 0
+    for _ in range(iters):
+        mid = (lo + hi) / 2
+        up = fn(mid) < 0
+        lo = np.where(up, mid, lo)
+        hi = np.where(up, hi, mid)
+    return np.where(never, np.nan, np.where(start, lo, hi))
+
+
+@metrics.timed("break_even")
+def break_even(chp_mw, load_factor, roc_rtfo, eii, mining_mw, catalog: Optional[pd.DataFrame] = None,
+               market=None, cost_per_mw_gbp: Optional[float] = None,
+               reward_source: str = REWARD_SOURCE) -> pd.DataFrame:
+    """
+    Where annual net revenue reaches zero, for every row of `catalog` (default: today's;
+    rows need efficiency_J_per_TH or j_th, and may carry cost_per_mw_gbp), with BTC
+    paid as in calculate(..., reward_source=reward_source). Adds:
+
+    - breakeven_btc_price: mining pays above it (0 if grid savings alone cover the costs);
+    - breakeven_hashrate: mining pays below it (inf if grid savings alone cover the costs);
+    - breakeven_grid_save_mwh: GBP/MWh of avoided grid import needed (negative: mining
+      pays even if each MWh had to be bought at that price);
+    - breakeven_load_factor: lowest CHP load factor that pays (NaN if none does);
+    - price_headroom / hashrate_headroom: how far the price can fall / hashrate rise
+      from today's before mining stops paying.
+
+    Sorted by break-even price (then load factor), most robust first.
+    """
+    if market is None:
+        from market_data import get_market_snapshot
+        market = get_market_snapshot().market
+    if catalog is None:
+        from asics_data import load_today_df
+        catalog = load_today_df()
+    df = catalog.reset_index(drop=True)
+    _, j_th, cost = _miner_arrays(df, cost_per_mw_gbp)
+    site = _with_reward_source({"chp_mw": chp_mw, "load_factor": load_factor, "roc_rtfo": roc_rtfo,
+                                "eii": eii, "mining_mw": mining_mw, "j_th": j_th, "cost_per_mw_gbp": cost},
+                               reward_source, market)
+    base = _calculate_arrays(site, market)
+    price, hashrate = base["btc_price"], base["hashrate"]
+    costs = base["capex_annuity"] + base["opex_annual"]
+    uncovered = costs - base["grid_savings"]      # what BTC revenue has to pay for
+    mwh = base["actual_mining_mwh"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        be_price = np.where(uncovered <= 0, 0.0, uncovered / base["total_btc"])
+        be_hashrate = np.where(uncovered <= 0, np.inf, base["revenue_btc"] * hashrate / uncovered)
+        be_rate = np.where(mwh > 0, (costs - base["revenue_btc"]) / mwh, np.inf)
+    be_lf = bisect(lambda lf: _calculate_arrays({**site, "load_factor": lf}, market)["net_revenue"],
+                   np.zeros(len(df)), np.ones(len(df)))
+
+    out = df.assign(
+        breakeven_btc_price=be_price,
+        breakeven_hashrate=be_hashrate,
+        breakeven_grid_save_mwh=be_rate,
+        breakeven_load_factor=be_lf,
+        price_headroom=1 - be_price / price,
+        hashrate_headroom=be_hashrate / hashrate - 1,
+    )
+    return out.sort_values(["breakeven_btc_price", "breakeven_load_factor"], kind="stable")
+
+
+# calculate() inputs moved by ±delta (load factor and uptime capped at 1)
+_NUMERIC = {
+    "btc_price": "BTC price (£)",
+    "hashrate": "Network hashrate (EH/s)",
+    "grid_save_mwh": "Grid savings (£/MWh)",
+    "j_th": "Miner efficiency (J/TH)",
+    "cost_per_mw_gbp": "Capex (£/MW)",
+    "mining_mw": "Mining power (MW)",
+    "chp_mw": "CHP size (MW)",
+    "load_factor": "Load factor",
+    "uptime": "Mining uptime",
+}
+_CAPPED = {"load_factor", "uptime"}
+
+
+@metrics.timed("sensitivities")
+def sensitivities(chp_mw, load_factor, roc_rtfo, eii, mining_mw, j_th, cost_per_mw_gbp, market=None,
+                  delta: float = SENSITIVITY_DELTA, metric: str = "net_per_mwh",
+                  reward_source: str = REWARD_SOURCE) -> pd.DataFrame:
+    """
+    One-at-a-time sensitivity of `metric` (any calculate() output) for one site and miner:
+    each numeric input moved down and up by `delta` (a share of its value), and ROC/RTFO
+    and EII across their options (low / high are the worst / best option). Every variant
+    is one row of a single _calculate_arrays pass (BTC paid per `reward_source`, as in
+    calculate()). One row per input with low_input, high_input, low, high, base and
+    swing (|high − low|), largest swing first.
+    """
+    if market is None:
+        from market_data import get_market_snapshot
+        market = get_market_snapshot().market
+    base = {"btc_price": float(market[0]), "hashrate": float(market[1] or FALLBACK_HASHRATE),
+            "grid_save_mwh": float(_grid_save_mwh(eii)),
+            "j_th": float(j_th), "cost_per_mw_gbp": float(cost_per_mw_gbp), "mining_mw": float(mining_mw),
+            "chp_mw": float(chp_mw), "load_factor": float(load_factor), "uptime": float(MINING_UPTIME)}
+
+    # rows: base, then (low, high) per numeric input, then every ROC/RTFO and EII option
+    moves = [(None, None)]
+    for key in _NUMERIC:
+        lo, hi = base[key] * (1 - delta), base[key] * (1 + delta)
+        moves += [(key, lo), (key, min(hi, 1.0) if key in _CAPPED else hi)]
+    moves += [("roc_rtfo", o) for o in ROC_RTFO_OPTIONS]
+    moves += [("grid_save_mwh", _grid_save_mwh(o)) for o in EII_OPTIONS]
+    n = len(moves)
+
+    scen = {k: np.full(n, v) for k, v in base.items()}
+    scen["roc_rtfo"] = np.full(n, roc_rtfo, dtype=object)
+    scen["eii"] = eii
+    for i, (key, value) in enumerate(moves):
+        if key is not None:
+            scen[key][i] = value
+    y = _calculate_arrays(_with_reward_source(scen, reward_source, market), market)[metric]
+
+    rows, i = [], 1
+    for label in _NUMERIC.values():
+        rows.append((label, moves[i][1], moves[i + 1][1], y[i], y[i + 1]))
+        i += 2
+    for name, options in (("ROC/RTFO", ROC_RTFO_OPTIONS), ("EII exempt", EII_OPTIONS)):
+        vals = y[i:i + len(options)]
+        lo, hi = int(np.argmin(vals)), int(np.argmax(vals))
+        rows.append((name, options[lo], options[hi], vals[lo], vals[hi]))
+        i += len(options)
+
+    out = pd.DataFrame(rows, columns=["input", "low_input", "high_input", "low", "high"]).set_index("input")
+    out["base"] = y[0]
+    out["swing"] = (out["high"] - out["low"]).abs()
+    return out.sort_values("swing", ascending=False, kind="stable")
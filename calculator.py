@@ -1,39 +1,106 @@
 # calculator.py
+import numpy as np
+import pandas as pd
+
 from constants import *
+import metrics
+from market_data import get_market_snapshot
+
+def _min_export_pct(roc_rtfo):
+    return 0.05 if "ROC + RTFO" in roc_rtfo else 0.10 if "ROC only" in roc_rtfo else 0.0
+
+def _grid_save_mwh(eii):
+    return 72 if "Yes" in eii else 45
+
+def _lookup(values, n, fn):
+    """Map a scalar or array of labels through fn once per distinct label."""
+    if np.ndim(values) == 0:
+        return np.full(n, fn(values), dtype=float)
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    table = np.array([fn(u) for u in uniques], dtype=float)
+    return table[codes]
+
+def _column(scenarios, key, n):
+    return np.broadcast_to(np.asarray(scenarios[key], dtype=float), (n,))
 
-def fetch_market_data():
-    import requests
-    try:
-        btc = requests.get(COINGECKO_URL, timeout=COINGECKO_TIMEOUT).json()["bitcoin"]["gbp"]
-        hr_res = requests.get(BLOCKCHAIN_URL, timeout=BLOCKCHAIN_TIMEOUT).json()
-        values = [p["y"] for p in hr_res["values"] if p["y"] is not None]
-        if not values:
-            raise ValueError("No hashrate data")
-        hashrate_eh = round(sum(values) / len(values) / 1e18, 0)
-        return int(btc), int(hashrate_eh)
-    except Exception:
-        return 80000, 1111  # Nov 2025 fallback
-
-
-def calculate(chp_mw, load_factor, roc_rtfo, eii, miner_model, mining_mw):
-    # === Market Data ===
-    btc_price, hashrate = fetch_market_data()
+def _baseline_cost_per_mw() -> float:
+    """Catalog rows carry no price; cost them like the first MINER_SPECS entry (as the app does)."""
+    return float(next(iter(MINER_SPECS.values()))["cost_per_mw_gbp"])
+
+def _miner_arrays(miners=None, cost_per_mw_gbp=None):
+    """
+    (index, j_th, cost_per_mw_gbp) arrays for MINER_SPECS keys (default: all of them) or
+    a DataFrame of catalog rows (efficiency_J_per_TH) or calculator specs (j_th). Rows
+    without a cost_per_mw_gbp column cost `cost_per_mw_gbp`, else the baseline. A
+    DataFrame is indexed by its name column when it has one.
+    """
+    if miners is None:
+        miners = list(MINER_SPECS)
+    if isinstance(miners, str):
+        miners = [miners]
+    if isinstance(miners, pd.DataFrame):
+        index = pd.Index(miners["name"]) if "name" in miners.columns else miners.index
+        j_th = miners["j_th" if "j_th" in miners.columns else "efficiency_J_per_TH"].to_numpy(dtype=float)
+        if "cost_per_mw_gbp" in miners.columns:
+            cost = miners["cost_per_mw_gbp"].to_numpy(dtype=float)
+        else:
+            cost = np.full(len(miners), float(cost_per_mw_gbp if cost_per_mw_gbp is not None
+                                              else _baseline_cost_per_mw()))
+        return index, j_th, cost
+    index = pd.Index(miners)
+    j_th = np.array([MINER_SPECS[m]["j_th"] for m in miners], dtype=float)
+    cost = np.array([MINER_SPECS[m]["cost_per_mw_gbp"] for m in miners], dtype=float)
+    return index, j_th, cost
+
+
+def _calculate_arrays(scenarios, market):
+    """
+    Core vectorized model. `scenarios` maps input names to scalars or equal-length arrays:
+    chp_mw, load_factor, roc_rtfo, eii, mining_mw and either miner_model (a MINER_SPECS key)
+    or explicit j_th + cost_per_mw_gbp columns. Optional overrides: uptime (e.g. a fleet
+    simulation's achieved availability) for MINING_UPTIME, grid_save_mwh (GBP/MWh) for
+    the EII rate, per-row btc_price / hashrate for the market, and network_btc_per_day
+    (BTC paid to the whole network per day, e.g. subsidy + fees from the block store)
+    for BLOCKS_PER_DAY × BLOCK_REWARD. `market` is (btc_price, hashrate) as returned by
+    fetch_market_data() or MarketSnapshot.market. Returns a dict of numpy arrays, one
+    per output field.
+    """
+    btc_price, hashrate = market
     if hashrate == 0:
-        hashrate = 1111
+        hashrate = FALLBACK_HASHRATE
+
+    n = max((np.size(scenarios[k]) for k in scenarios), default=1)
+    if "btc_price" in scenarios:
+        btc_price = _column(scenarios, "btc_price", n)
+    if "hashrate" in scenarios:
+        hashrate = _column(scenarios, "hashrate", n)
 
     # === BTC YIELD (CORRECTED) ===
-    total_btc_per_year = BLOCKS_PER_DAY * DAYS_PER_YEAR * BLOCK_REWARD
+    if "network_btc_per_day" in scenarios:
+        total_btc_per_year = _column(scenarios, "network_btc_per_day", n) * DAYS_PER_YEAR
+    else:
+        total_btc_per_year = BLOCKS_PER_DAY * DAYS_PER_YEAR * BLOCK_REWARD
     network_th_s = hashrate * 1_000_000  # EH/s → TH/s
 
     # === Miner Specs ===
-    j_th = MINER_SPECS[miner_model]["j_th"]
-    cost_per_mw = MINER_SPECS[miner_model]["cost_per_mw_gbp"]
+    if "j_th" in scenarios:
+        j_th = _column(scenarios, "j_th", n)
+        cost_per_mw = _column(scenarios, "cost_per_mw_gbp", n)
+    else:
+        models = scenarios["miner_model"]
+        j_th = _lookup(models, n, lambda m: MINER_SPECS[m]["j_th"])
+        cost_per_mw = _lookup(models, n, lambda m: MINER_SPECS[m]["cost_per_mw_gbp"])
+
+    chp_mw = _column(scenarios, "chp_mw", n)
+    load_factor = _column(scenarios, "load_factor", n)
+    mining_mw = _column(scenarios, "mining_mw", n)
+    uptime = _column(scenarios, "uptime", n) if "uptime" in scenarios else MINING_UPTIME
 
     # === Energy ===
     annual_mwh = chp_mw * HOURS_PER_YEAR * load_factor
-    min_export_pct = 0.05 if "ROC + RTFO" in roc_rtfo else 0.10 if "ROC only" in roc_rtfo else 0.0
+    min_export_pct = _lookup(scenarios["roc_rtfo"], n, _min_export_pct)
     max_mining_mwh = annual_mwh * (1 - min_export_pct)
-    actual_mining_mwh = min(mining_mw * HOURS_PER_YEAR * 0.98, max_mining_mwh)
+    actual_mining_mwh = np.minimum(mining_mw * HOURS_PER_YEAR * uptime, max_mining_mwh)
 
     # === Mining Output (FIXED) ===
     th_per_mw = 1_000_000 / j_th  # TH/s per MW
@@ -46,22 +113,25 @@ def calculate(chp_mw, load_factor, roc_rtfo, eii, miner_model, mining_mw):
     # === Costs ===
     capex = mining_mw * cost_per_mw
     capex_annuity = capex * 0.20
-#    opex_annual = mining_mw * 12 * 6  # £6k/MW/month × 12
     opex_annual = mining_mw * 12 * 6000  # £6,000/MW/year
 
-    grid_save_mwh = 72 if "Yes" in eii else 45
+    if "grid_save_mwh" in scenarios:
+        grid_save_mwh = _column(scenarios, "grid_save_mwh", n)
+    else:
+        grid_save_mwh = _lookup(scenarios["eii"], n, _grid_save_mwh)
     grid_savings = grid_save_mwh * actual_mining_mwh
 
     # === Net ===
     net_revenue = revenue_btc + grid_savings - capex_annuity - opex_annual
-    net_per_mwh = net_revenue / actual_mining_mwh if actual_mining_mwh > 0 else 0
-    payback = (capex_annuity + opex_annual) / (revenue_btc + grid_savings) if (revenue_btc + grid_savings) > 0 else float('inf')
-    # After calculating payback in years
-    payback_months = payback * 12 if payback != float('inf') else float('inf')
+    with np.errstate(divide="ignore", invalid="ignore"):
+        net_per_mwh = np.where(actual_mining_mwh > 0, net_revenue / actual_mining_mwh, 0.0)
+        gross = revenue_btc + grid_savings
+        payback = np.where(gross > 0, (capex_annuity + opex_annual) / gross, np.inf)
+    payback_months = payback * 12
 
     return {
-        "btc_price": btc_price,
-        "hashrate": hashrate,
+        "btc_price": np.full(n, btc_price),
+        "hashrate": np.full(n, hashrate),
         "total_btc": total_btc,
         "revenue_btc": revenue_btc,
         "grid_savings": grid_savings,
@@ -77,4 +147,79 @@ def calculate(chp_mw, load_factor, roc_rtfo, eii, miner_model, mining_mw):
         "miner_th_s": miner_th_s,
         "th_per_mw": th_per_mw,
         "j_th": j_th,
-    }
\ No newline at end of file
+    }
+
+
+def _network_reward(market, reward_source: str = REWARD_SOURCE):
+    """
+    (subsidy, fees): BTC paid to the whole network per day. "subsidy" is BLOCKS_PER_DAY ×
+    BLOCK_REWARD and no fees; "blocks" is the block store's latest BTC per TH/s per day
+    × the market hashrate (so the miner's share at that hashrate is exactly the observed
+    yield, fees and cadence included), split by the observed fee share.
+    """
+    if reward_source not in ("subsidy", "blocks"):
+        raise ValueError(f"unknown reward_source {reward_source!r}")
+    if reward_source == "subsidy":
+        return BLOCKS_PER_DAY * BLOCK_REWARD, 0.0
+    from block_store import BLOCKS
+    total = BLOCKS.btc_per_th_day() * (market[1] or FALLBACK_HASHRATE) * 1_000_000
+    fee_share = float(BLOCKS.latest()["fee_share"])
+    return total * (1 - fee_share), total * fee_share
+
+def _with_reward_source(scenarios: dict, reward_source: str, market) -> dict:
+    """Add network_btc_per_day from the block store for reward_source="blocks"."""
+    if reward_source not in ("subsidy", "blocks"):
+        raise ValueError(f"unknown reward_source {reward_source!r}")
+    if reward_source == "blocks" and "network_btc_per_day" not in scenarios:
+        return {**scenarios, "network_btc_per_day": sum(_network_reward(market, reward_source))}
+    return scenarios
+
+
+@metrics.timed("calculate_batch")
+def calculate_batch(scenarios, market=None, reward_source: str = REWARD_SOURCE) -> pd.DataFrame:
+    """
+    Evaluate many scenarios in one vectorized pass.
+    `scenarios` is a DataFrame (or dict of arrays/scalars) with the calculate() inputs as
+    columns; `market` is a (btc_price, hashrate) snapshot shared by every row — pass it in
+    explicitly for sweeps; it defaults to the shared cached snapshot. Returns one row per
+    scenario with the same fields calculate() returns, in the same order.
+    """
+    if market is None:
+        market = get_market_snapshot().market
+    if isinstance(scenarios, pd.DataFrame):
+        index = scenarios.index
+        scenarios = {c: scenarios[c].to_numpy() for c in scenarios.columns}
+    else:
+        index = None
+    scenarios = _with_reward_source(scenarios, reward_source, market)
+    out = pd.DataFrame(_calculate_arrays(scenarios, market))
+    if index is not None:
+        out.index = index
+    return out
+
+
+@metrics.timed("calculate")
+def calculate(chp_mw, load_factor, roc_rtfo, eii, miner_model, mining_mw, market=None, miner_spec=None,
+              reward_source: str = REWARD_SOURCE):
+    """
+    One scenario. The miner is a MINER_SPECS key, or `miner_spec` (a dict with j_th and
+    cost_per_mw_gbp, e.g. a catalog pick) which takes precedence over `miner_model`.
+    reward_source "subsidy" pays BLOCK_REWARD per block at BLOCKS_PER_DAY shared by the
+    network hashrate; "blocks" pays subsidy + fees per unit of work over the latest
+    BLOCK_WINDOW blocks in the block store.
+    """
+    if market is None:
+        market = get_market_snapshot().market
+    scenario = {
+        "chp_mw": chp_mw,
+        "load_factor": load_factor,
+        "roc_rtfo": roc_rtfo,
+        "eii": eii,
+        "mining_mw": mining_mw,
+    }
+    if miner_spec is not None:
+        scenario.update(j_th=miner_spec["j_th"], cost_per_mw_gbp=miner_spec["cost_per_mw_gbp"])
+    else:
+        scenario["miner_model"] = miner_model
+    out = _calculate_arrays(_with_reward_source(scenario, reward_source, market), market)
+    return {k: v[0].item() for k, v in out.items()}
@@ -5,11 +5,29 @@ POOL_FEE_PCT     = 0.01
 SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
 DAYS_PER_YEAR    = 365.25
 HOURS_PER_YEAR   = 8760
+MINING_UPTIME    = 0.98
 
 COINGECKO_URL    = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=gbp"
 COINGECKO_TIMEOUT = 5
+COINGECKO_HISTORY_URL = "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart?vs_currency=gbp&days=30&interval=daily"
 BLOCKCHAIN_URL   = "https://api.blockchain.info/charts/hash-rate?format=json&timespan=30days"
 BLOCKCHAIN_TIMEOUT = 10
+MINERSTAT_URL    = "https://api.minerstat.com/v2/hardware"
+MINERSTAT_TIMEOUT = 60
+MEMPOOL_BLOCKS_URL = "https://mempool.space/api/v1/blocks"   # 15 blocks per page; "/<height>" pages back
+MEMPOOL_TIMEOUT  = 10
+
+HTTP_HEDGE_AFTER          = 2.0   # fire a duplicate request if the first is this slow (s)
+BREAKER_FAILURE_THRESHOLD = 3     # consecutive failures before an endpoint fails fast
+BREAKER_RESET_AFTER       = 60    # seconds an open breaker waits before a trial request
+
+MARKET_CACHE_TTL   = 60        # seconds before the shared market snapshot is revalidated
+FALLBACK_BTC_PRICE = 80000     # Nov 2025, used only when no live or persisted data exists
+FALLBACK_HASHRATE  = 1111      # EH/s, Nov 2025
+
+# Sidebar option labels; calculator keys off substrings of these.
+ROC_RTFO_OPTIONS = ["ROC + RTFO (5% min export)", "ROC only (10% min export)", "None (0% min export)"]
+EII_OPTIONS      = ["Yes (0 CCL)", "No"]
 
 MINER_SPECS = {
     "Whatsminer M53S++ Hydro (22 J/TH)": {"j_th": 22, "cost_per_mw_gbp": 1_800_000},
@@ -17,6 +35,80 @@ MINER_SPECS = {
     "Antminer S21 XP Hydro (11 J/TH)": {"j_th": 11, "cost_per_mw_gbp": 2_800_000},
 }
 
+# --- Multi-year projection ---
+# Halvings happen every 210,000 blocks; dates are estimates at ~10 min/block.
+ESTIMATED_HALVING_DATES      = ["2028-04-15", "2032-04-15", "2036-04-15"]
+PAST_HALVING_DATES           = ["2012-11-28", "2016-07-09", "2020-05-11", "2024-04-20"]
+PROJECTION_HASHRATE_GROWTH   = 0.30   # network hashrate growth per year
+PROJECTION_MINER_DEGRADATION = 0.03   # loss of miner output per year of age
+PROJECTION_DISCOUNT_RATE     = 0.10   # for NPV
+
+# --- Monte Carlo risk engine (annualised GBM parameters) ---
+# Defaults apply when the cached 30-day series are missing or too short to fit.
+MC_DEFAULT_PRICE_MU       = 0.0
+MC_DEFAULT_PRICE_SIGMA    = 0.55
+MC_DEFAULT_HASHRATE_MU    = 0.35
+MC_DEFAULT_HASHRATE_SIGMA = 0.25
+MC_DEFAULT_RHO            = 0.3
+MC_MAX_ABS_DRIFT          = 1.0      # 30 days is a short window; cap fitted drift at ±100%/yr
+MC_CHUNK_PATHS            = 5_000    # paths per vectorized chunk (bounds peak memory)
+MC_PARALLEL_THRESHOLD     = 200_000  # runs at least this large use a process pool
+
+# --- Half-hourly dispatch ---
+SETTLEMENT_PERIOD_HOURS = 0.5        # one metered interval
+DISPATCH_CHUNK_ROWS     = 500_000    # meter rows read per chunk when streaming files
+
+# --- Portfolio mode ---
+PORTFOLIO_CHUNK_SITES = 1_000   # sites per batch (× catalog models per vectorized pass)
+
+# --- JSON API service ---
+API_PORT       = 8765
+API_CACHE_SIZE = 4096    # memoized results kept (LRU)
+API_MAX_BATCH  = 100_000 # scenarios per /batch request
+
+# --- Break-even and sensitivities (breakeven.py) ---
+SENSITIVITY_DELTA      = 0.20   # each input moved down and up by this share (one at a time)
+BREAKEVEN_BISECT_ITERS = 30     # halvings of the bracket (1e-9 of it) where there is no closed form
+
+# --- Fleet reliability simulation (fleet_sim.py) ---
+FLEET_FAILURE_RATE     = 0.05   # failures per unit-year of running (hydro is typically <1%)
+FLEET_REPAIR_HOURS     = 48     # mean turnaround of one repair
+FLEET_REPAIR_SLOTS     = 4      # repairs in progress at once; the rest queue
+FLEET_SWAP_HOURS       = 4      # to install a spare or repaired unit in an empty slot
+FLEET_SPARES_PCT       = 0.02   # spares held per model, share of deployed units (rounded up)
+FLEET_CURTAIL_PER_YEAR = 12     # site curtailment events (CHP outages, export constraints)
+FLEET_CURTAIL_HOURS    = 8      # mean length of one
+FLEET_CURTAIL_SHARE    = 0.5    # share of fleet power shed, least efficient units first
+
+# --- Block-level rewards (block_store.py) ---
+# REWARD_SOURCE "subsidy" is BLOCKS_PER_DAY × BLOCK_REWARD over the network hashrate;
+# "blocks" is subsidy + fees per unit of work over the last BLOCK_WINDOW stored blocks.
+REWARD_SOURCE         = "subsidy"
+BLOCK_STORE_PATH      = "data/blocks/blocks.bin"              # append-only fixed-width records
+BLOCK_FIXTURE         = "data/fixtures/mempool_blocks.json"   # offline sample, mempool.space format
+BLOCK_WINDOW          = 1008     # blocks (~1 week) per rolling window
+BLOCK_FETCH_MAX_PAGES = 100      # pages of 15 walked back from the tip per fetch
+BLOCK_REFRESH_RETRY   = 600      # seconds between background top-ups (refresh_async)
+
+# --- Market history and backtests ---
+MARKET_HISTORY_DIR     = "data/market_history"   # append-only price/hashrate series (market_history.py)
+MARKET_HISTORY_MIN_GAP = 3600                    # seconds between stored points of a series
+
+# --- Fast cold start ---
+# With FAST_START a cold process serves the catalog and market from the prebuilt
+# STARTUP_SNAPSHOT (`python startup.py` rebuilds it) and refreshes them in the background,
+# instead of blocking the first page view on the minerstat download.
+FAST_START            = True
+STARTUP_SNAPSHOT      = "data/startup_snapshot.json"
+STARTUP_REFRESH_RETRY = 600    # seconds between background refresh attempts
+STARTUP_BUDGET_S      = 3.0    # time-to-first-render budget (benchmarks/bench_startup.py)
+
+# Prometheus text file rewritten after every app rerun (None to disable).
+METRICS_FILE = "data/metrics.prom"
+
+# Days of full minerstat history kept before older versions are compacted away.
+HISTORY_RETENTION_DAYS = 180
+
 # --- ASIC selection strategy ---
 # If non-empty, we ONLY show the top 6 miners from this brand.
 PREFERRED_BRAND_ASICS = ""   # e.g. "MicroBT" or "" to disable
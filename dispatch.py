@@ -0,0 +1,185 @@
+# dispatch.py
+"""
+Half-hourly dispatch against metered CHP output.
+
+calculate() works from chp_mw × load_factor and a flat mining uptime, so outages,
+maintenance and the ROC/RTFO minimum export are only honoured on average. Here every
+settlement period is dispatched on its own: generation first covers the minimum-export
+fraction, then the miners take what they can (their MW × availability) if mining is
+worth more than exporting at that period's price, and the rest is exported.
+
+Meter files (CSV or Parquet) are read in chunks and reduced to per-site (optionally
+per-year) totals as they stream, so multi-year, multi-site files never have to fit in
+memory. Columns: chp_mw (mean MW over the period) or chp_mwh, optional
+export_price_gbp_mwh, site_id and timestamp.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from calculator import _calculate_arrays, _grid_save_mwh, _lookup, _min_export_pct, _network_reward
+from constants import (
+    DAYS_PER_YEAR, HOURS_PER_YEAR, POOL_FEE_PCT, FALLBACK_HASHRATE, MINER_SPECS, MINING_UPTIME,
+    SETTLEMENT_PERIOD_HOURS, DISPATCH_CHUNK_ROWS, REWARD_SOURCE,
+)
+from market_data import get_market_snapshot
+
+_SUM_COLUMNS = ["hours", "generation_mwh", "mining_mwh", "export_mwh", "btc",
+                "revenue_btc", "grid_savings", "export_revenue", "forgone_export"]
+_AGG = {**{c: "sum" for c in _SUM_COLUMNS}, "mining_mw": "first", "cost_per_mw_gbp": "first"}
+
+
+def btc_per_mwh(j_th, market, reward_source: str = REWARD_SOURCE) -> np.ndarray:
+    """BTC mined per MWh consumed, on the same basis as calculate()."""
+    _, hashrate = market
+    network_th_s = (hashrate or FALLBACK_HASHRATE) * 1_000_000
+    total_btc_per_year = sum(_network_reward(market, reward_source)) * DAYS_PER_YEAR * (1 - POOL_FEE_PCT)
+    return (1_000_000 / np.asarray(j_th, dtype=float)) / network_th_s * total_btc_per_year / HOURS_PER_YEAR
+
+
+def dispatch(chp_mwh, mining_mw, roc_rtfo, eii, j_th, market, export_price=None,
+             period_hours: float = SETTLEMENT_PERIOD_HOURS,
+             availability: float = MINING_UPTIME, reward_source: str = REWARD_SOURCE) -> dict:
+    """
+    Dispatch every interval in one vectorized pass. `chp_mwh` is the energy generated
+    in each interval; the other inputs are scalars or per-interval arrays (so rows from
+    several sites can be dispatched together). Returns a dict of per-interval arrays.
+    """
+    btc_price = market[0]
+    chp_mwh = np.asarray(chp_mwh, dtype=float)
+    n = chp_mwh.size
+    min_export = _lookup(roc_rtfo, n, _min_export_pct)
+    grid_save = _lookup(eii, n, _grid_save_mwh)
+    btc_mwh = np.broadcast_to(btc_per_mwh(j_th, market, reward_source), (n,))
+
+    headroom = np.maximum(chp_mwh, 0.0) * (1 - min_export)
+    mining = np.minimum(np.asarray(mining_mw, dtype=float) * period_hours * availability, headroom)
+    if export_price is not None:
+        price = np.nan_to_num(np.asarray(export_price, dtype=float), nan=0.0)
+        mining = np.where(btc_mwh * btc_price + grid_save >= price, mining, 0.0)
+    else:
+        price = np.zeros(n)
+    export = np.maximum(chp_mwh, 0.0) - mining
+    btc = mining * btc_mwh
+    return {
+        "generation_mwh": chp_mwh,
+        "mining_mwh": mining,
+        "export_mwh": export,
+        "btc": btc,
+        "revenue_btc": btc * btc_price,
+        "grid_savings": mining * grid_save,
+        "export_revenue": export * price,
+        "forgone_export": mining * price,
+    }
+
+def read_meter(path: Union[str, Path, BinaryIO], chunksize: int = DISPATCH_CHUNK_ROWS,
+               period_hours: float = SETTLEMENT_PERIOD_HOURS) -> Iterator[pd.DataFrame]:
+    """
+    Stream a meter file (path or open binary file, e.g. an upload) in chunks with
+    normalised columns: chp_mwh, export_price_gbp_mwh (NaN if absent), site_id ("site"
+    if absent) and timestamp (if present).
+    """
+    if str(getattr(path, "name", path)).lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        chunks = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=chunksize))
+    else:
+        chunks = pd.read_csv(path, chunksize=chunksize)
+    for chunk in chunks:
+        out = pd.DataFrame(index=chunk.index)
+        if "chp_mwh" in chunk.columns:
+            out["chp_mwh"] = chunk["chp_mwh"].astype(float)
+        else:
+            out["chp_mwh"] = chunk["chp_mw"].astype(float) * period_hours
+        out["export_price_gbp_mwh"] = (chunk["export_price_gbp_mwh"].astype(float)
+                                       if "export_price_gbp_mwh" in chunk.columns else np.nan)
+        out["site_id"] = chunk["site_id"].astype(str) if "site_id" in chunk.columns else "site"
+        if "timestamp" in chunk.columns:
+            out["timestamp"] = pd.to_datetime(chunk["timestamp"], utc=True)
+        yield out
+
+
+def _site_params(site_ids: pd.Series, sites: Optional[pd.DataFrame], defaults: dict) -> dict:
+    """
+    Per-row dispatch parameters: the `sites` table's value where given, else the default.
+    Raises ValueError naming the parameter (and sites) left with neither.
+    """
+    codes, uniques = pd.factorize(site_ids)
+    table = None if sites is None else sites.reindex(uniques)
+    out = {}
+    for key, default in defaults.items():
+        if table is not None and key in table.columns:
+            col = table[key].where(table[key].notna(), default)
+            unset = col.isna().to_numpy()
+            if unset.any():
+                raise ValueError(f"{key} is not set for site(s) {', '.join(map(str, uniques[unset]))}: "
+                                 f"pass {key}= or give it in `sites`")
+            out[key] = col.to_numpy()[codes]
+        elif default is None:
+            raise ValueError(f"{key} is required: pass {key}= or give it in `sites`")
+        else:
+            out[key] = default
+    return out
+
+
+def dispatch_file(path: Union[str, Path, BinaryIO], mining_mw=None, roc_rtfo=None, eii=None,
+                  miner_model: Optional[str] = None, j_th: Optional[float] = None,
+                  cost_per_mw_gbp: Optional[float] = None, sites: Optional[pd.DataFrame] = None,
+                  market=None, by_year: bool = False, chunksize: int = DISPATCH_CHUNK_ROWS,
+                  period_hours: float = SETTLEMENT_PERIOD_HOURS,
+                  availability: float = MINING_UPTIME, reward_source: str = REWARD_SOURCE) -> pd.DataFrame:
+    """
+    Dispatch a (possibly multi-site, multi-year) meter file chunk by chunk and return
+    one row per site (and per calendar year with `by_year`). Site settings default to
+    the arguments; a `sites` frame indexed by site_id may override mining_mw, roc_rtfo,
+    eii, j_th and cost_per_mw_gbp per site. Costs are pro-rated to the metered hours and
+    net_revenue matches calculate()'s definition (forgone export shown separately), BTC
+    paid per `reward_source` as in calculate().
+    `by_year` needs a timestamp column, and every site needs all five settings from one
+    or the other (ValueError otherwise).
+    """
+    if market is None:
+        market = get_market_snapshot().market
+    if miner_model is not None:
+        j_th = MINER_SPECS[miner_model]["j_th"]
+        cost_per_mw_gbp = MINER_SPECS[miner_model]["cost_per_mw_gbp"]
+    defaults = {"mining_mw": mining_mw, "roc_rtfo": roc_rtfo, "eii": eii,
+                "j_th": j_th, "cost_per_mw_gbp": cost_per_mw_gbp}
+
+    parts = []
+    for chunk in read_meter(path, chunksize, period_hours):
+        if by_year and "timestamp" not in chunk.columns:
+            raise ValueError("by_year needs a timestamp column in the meter file")
+        p = _site_params(chunk["site_id"], sites, defaults)
+        out = dispatch(chunk["chp_mwh"].to_numpy(), p["mining_mw"], p["roc_rtfo"], p["eii"],
+                       p["j_th"], market, chunk["export_price_gbp_mwh"].to_numpy(),
+                       period_hours, availability, reward_source)
+        frame = pd.DataFrame(out, index=chunk.index)
+        frame["hours"] = period_hours
+        frame["mining_mw"] = np.broadcast_to(np.asarray(p["mining_mw"], dtype=float), len(frame))
+        frame["cost_per_mw_gbp"] = np.broadcast_to(np.asarray(p["cost_per_mw_gbp"], dtype=float), len(frame))
+        keys = [chunk["site_id"]]
+        if by_year:
+            keys.append(chunk["timestamp"].dt.year.rename("year"))
+        parts.append(frame.groupby(keys, sort=False).agg(_AGG))
+        # fold partial aggregates as we go so memory stays bounded by the number of groups
+        if len(parts) > 1:
+            both = pd.concat(parts)
+            parts = [both.groupby(level=list(range(both.index.nlevels)), sort=False).agg(_AGG)]
+    if not parts:
+        return pd.DataFrame(columns=_SUM_COLUMNS)
+
+    res = parts[0].sort_index()
+    years = res["hours"] / HOURS_PER_YEAR
+    costs = _calculate_arrays({"chp_mw": 0.0, "load_factor": 0.0, "roc_rtfo": "None", "eii": "No",
+                               "mining_mw": res["mining_mw"].to_numpy(), "j_th": 1.0,
+                               "cost_per_mw_gbp": res["cost_per_mw_gbp"].to_numpy()}, market)
+    res["capex_annuity"] = costs["capex_annuity"] * years
+    res["opex"] = costs["opex_annual"] * years
+    res["net_revenue"] = res["revenue_btc"] + res["grid_savings"] - res["capex_annuity"] - res["opex"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        res["net_per_mwh"] = np.where(res["mining_mwh"] > 0, res["net_revenue"] / res["mining_mwh"], 0.0)
+        res["mining_uptime"] = res["mining_mwh"] / (res["mining_mw"] * res["hours"])
+    return res
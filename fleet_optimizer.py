@@ -0,0 +1,182 @@
+# fleet_optimizer.py
+"""
+Fleet-mix optimizer: how many units of each catalog ASIC to deploy at one site.
+
+calculate() puts the whole mining_mw on a single model; real fleets mix models because
+of the capex budget, stock and rack space. Per-unit economics for every model come from
+one rank_catalog() pass (mining_mw = the unit's power_W), after which the choice is a
+bounded integer knapsack over the site's mineable power P, the capex budget B and an
+optional unit count U (rack slots):
+
+    maximise Σ v_i·x_i  s.t.  Σ p_i·x_i ≤ P,  Σ c_i·x_i ≤ B,  Σ x_i ≤ U,  0 ≤ x_i ≤ stock_i
+
+Budget and slots are priced out with Lagrange multipliers, leaving a single-constraint
+LP that a density sort solves exactly; bisection on the multipliers finds the LP
+optimum, whose value bounds every integer fleet. Flooring it is feasible and the
+leftover power, budget and slots are filled greedily, so the plan lands within about
+one unit's net revenue of the bound (reported as `upper_bound`).
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from calculator import _calculate_arrays
+from constants import HOURS_PER_YEAR, MINING_UPTIME, REWARD_SOURCE
+from asics_data import _catalog_cost_per_mw, load_today_df, rank_catalog
+
+_GRID = 17          # multipliers per axis per zoom step
+_ZOOM_ITERS = 12
+
+
+def mineable_mw(chp_mw, load_factor, roc_rtfo, eii, market=None) -> float:
+    """
+    Largest mining load the site's exportable energy can run at MINING_UPTIME (an energy
+    figure only, so it does not depend on the reward source).
+    """
+    site = _calculate_arrays({"chp_mw": chp_mw, "load_factor": load_factor, "roc_rtfo": roc_rtfo,
+                              "eii": eii, "mining_mw": 0.0, "j_th": 1.0, "cost_per_mw_gbp": 0.0},
+                             market or (0.0, 0.0))
+    return float(site["max_mining_mwh"][0]) / (HOURS_PER_YEAR * MINING_UPTIME)
+
+
+def _relaxation_value(r: np.ndarray, p: np.ndarray, cap: np.ndarray, power: float) -> np.ndarray:
+    """
+    Value of max Σ r·x s.t. Σ p·x ≤ power, 0 ≤ x ≤ cap (an LP solved by filling in
+    density order) for every row of `r` at once.
+    """
+    gain = r > 0
+    order = np.argsort(np.where(gain, -r / p, np.inf), axis=-1, kind="stable")
+    r_s, p_s, cap_s = np.take_along_axis(r, order, -1), p[order], cap[order]
+    used = np.where(r_s > 0, p_s * cap_s, 0.0)
+    before = np.cumsum(used, axis=-1) - used
+    x = np.where(r_s > 0, np.clip((power - before) / p_s, 0.0, cap_s), 0.0)
+    return (r_s * x).sum(axis=-1)
+
+
+def _dual(v, p, c, cap, power, budget, units) -> Tuple[float, float, float]:
+    """
+    Minimise the Lagrangian dual D(λ, μ) (λ prices capex, μ prices slots) by repeatedly
+    evaluating a grid of multipliers in one vectorized pass and zooming in on the best
+    cell. D is convex and every value of it bounds the integer optimum from above.
+    Returns (bound, λ, μ).
+    """
+    lam_hi = float((v[c > 0] / c[c > 0]).max()) if np.isfinite(budget) and (c > 0).any() else 0.0
+    mu_hi = float(v.max()) if np.isfinite(units) else 0.0
+    lam_rng, mu_rng = [0.0, lam_hi], [0.0, mu_hi]
+    best = (np.inf, 0.0, 0.0)
+    for _ in range(_ZOOM_ITERS):
+        lam = np.linspace(*lam_rng, _GRID if lam_rng[1] > lam_rng[0] else 1)
+        mu = np.linspace(*mu_rng, _GRID if mu_rng[1] > mu_rng[0] else 1)
+        L, M = (g.ravel() for g in np.meshgrid(lam, mu, indexing="ij"))
+        r = v[None, :] - L[:, None] * c[None, :] - M[:, None]
+        d = _relaxation_value(r, p, cap, power)
+        if lam_hi:
+            d += L * budget
+        if mu_hi:
+            d += M * units
+        k = int(np.argmin(d))
+        if d[k] < best[0]:
+            best = (float(d[k]), float(L[k]), float(M[k]))
+        i, j = np.unravel_index(k, (len(lam), len(mu)))
+        lam_rng = [lam[max(i - 1, 0)], lam[min(i + 1, len(lam) - 1)]]
+        mu_rng = [mu[max(j - 1, 0)], mu[min(j + 1, len(mu) - 1)]]
+        if len(lam) == 1 and len(mu) == 1:
+            break
+    return best
+
+
+def _fill(order, v, p, c, cap, power, budget, units) -> np.ndarray:
+    """Integer fleet built greedily: as many units as still fit of each model in `order`."""
+    n = np.zeros(len(v))
+    left_p, left_b, left_u = power, budget, units
+    for i in order:
+        if v[i] <= 0 or left_u < 1:
+            continue
+        k = min(cap[i], np.floor(left_p / p[i]), left_u,
+                np.floor(left_b / c[i]) if c[i] > 0 else np.inf)
+        if k >= 1:
+            n[i] = k
+            left_p, left_b, left_u = left_p - k * p[i], left_b - k * c[i], left_u - k
+    return n
+
+
+def _solve(v, p, c, cap, power, budget, units) -> Tuple[np.ndarray, float]:
+    """Best of a few greedy fills (led by the dual's reduced densities) and the dual bound."""
+    if len(v) == 0:
+        return np.zeros(0, dtype=np.int64), 0.0
+    bound, lam, mu = _dual(v, p, c, cap, power, budget, units)
+    r = v - lam * c - mu
+    with np.errstate(divide="ignore"):
+        keys = [r / p, v / p, v / np.where(c > 0, c, np.nan), v]
+    fleets = [_fill(np.argsort(-np.nan_to_num(k, nan=np.inf), kind="stable"),
+                    v, p, c, cap, power, budget, units) for k in keys]
+    n = max(fleets, key=lambda f: float(f @ v))
+    return n.astype(np.int64), max(bound, float(n @ v))
+
+
+@dataclass
+class FleetPlan:
+    """Chosen unit counts (one row per model used) and fleet totals."""
+    fleet: pd.DataFrame
+    available_mw: float
+    mining_mw: float
+    capex: float
+    net_revenue: float
+    btc_per_year: float
+    upper_bound: float      # LP bound: no integer fleet can earn more
+
+    @property
+    def gap(self) -> float:
+        return max(0.0, self.upper_bound - self.net_revenue)
+
+
+def optimize_fleet(chp_mw, load_factor, roc_rtfo, eii, capex_budget: float = np.inf,
+                   catalog: Optional[pd.DataFrame] = None, max_mining_mw: Optional[float] = None,
+                   max_units: Optional[int] = None, market=None,
+                   cost_per_mw_gbp: Optional[float] = None,
+                   reward_source: str = REWARD_SOURCE) -> FleetPlan:
+    """
+    Integer unit counts across the catalog that maximise annual net revenue for a site.
+    Mineable power follows calculate()'s max_mining_mwh (optionally capped further by
+    `max_mining_mw`). The catalog (default: today's) may carry optional per-row
+    `stock` (units available), `price_gbp` (per unit) or `cost_per_mw_gbp` columns.
+    BTC is paid per `reward_source` as in calculate().
+    """
+    df = (load_today_df() if catalog is None else catalog).reset_index(drop=True)
+    available = mineable_mw(chp_mw, load_factor, roc_rtfo, eii, market)
+    if max_mining_mw is not None:
+        available = min(available, float(max_mining_mw))
+
+    valid = (df["power_W"] > 0) & (df["efficiency_J_per_TH"] > 0) & (df["power_W"] <= available * 1e6)
+    df = df[valid.fillna(False)].reset_index(drop=True)
+    unit_mw = df["power_W"].to_numpy(dtype=float) / 1e6
+    df = df.assign(cost_per_mw_gbp=_catalog_cost_per_mw(df, cost_per_mw_gbp))
+    ranked = rank_catalog(df, chp_mw, load_factor, roc_rtfo, eii, unit_mw, market,
+                          reward_source=reward_source).sort_index()
+
+    v = ranked["net_revenue"].to_numpy(dtype=float)
+    p = unit_mw * 1e6
+    c = unit_mw * df["cost_per_mw_gbp"].to_numpy(dtype=float)
+    stock = df["stock"].to_numpy(dtype=float) if "stock" in df.columns else np.full(len(df), np.inf)
+    cap = np.minimum(np.nan_to_num(stock, nan=np.inf), np.floor(available * 1e6 / p))
+    units = np.inf if max_units is None else float(max_units)
+    power = available * 1e6
+
+    n, bound = _solve(v, p, c, cap, power, float(capex_budget), units)
+
+    chosen = n > 0
+    fleet = ranked[chosen].assign(
+        units=n[chosen],
+        mining_mw=n[chosen] * unit_mw[chosen],
+        capex_gbp=n[chosen] * c[chosen],
+        net_revenue=n[chosen] * v[chosen],
+        btc_per_year=n[chosen] * ranked["btc_per_year"].to_numpy()[chosen],
+    ).sort_values("net_revenue", ascending=False)
+    return FleetPlan(
+        fleet=fleet, available_mw=available, mining_mw=float(fleet["mining_mw"].sum()),
+        capex=float(fleet["capex_gbp"].sum()), net_revenue=float(fleet["net_revenue"].sum()),
+        btc_per_year=float(fleet["btc_per_year"].sum()), upper_bound=max(bound, float(n @ v)),
+    )
@@ -0,0 +1,364 @@
+# fleet_sim.py
+"""
+Per-unit fleet reliability: failures, a repair queue, spares and site curtailment.
+
+calculate() runs the whole mining_mw at a flat MINING_UPTIME. Here the fleet is built
+from units (catalog power_W and hashrate_THs, site MW / unit power of each model) and
+simulated event by event over a horizon:
+
+- a running unit fails after an exponential lifetime (failure_rate per unit-year);
+- the failed unit joins a FIFO repair queue served `repair_slots` at a time, and a
+  spare of the same model (if any is on hand) is swapped into its slot;
+- a repaired unit refills a vacant slot of its model, or goes back on the spares shelf;
+- curtailment events shed a share of the fleet's power, least efficient units first;
+  a unit installed during one starts only if it fits under the power left online.
+
+Unit state lives in flat NumPy arrays indexed by unit (model, state, slot, epoch, run
+hours) and only failures, repairs, installs and curtailments are events, so a year of
+10,000 units is a few thousand heap operations. The online hashrate and power are
+recorded as step functions; fleet_revenue() feeds the achieved energy and hashrate back
+into the calculator in place of MINING_UPTIME.
+
+    python fleet_sim.py --units 10000 [--th-s 200 --watts 3500] [--seed 0]
+"""
+from __future__ import annotations
+import argparse, heapq
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from calculator import _baseline_cost_per_mw, _calculate_arrays, _with_reward_source
+from constants import (
+    HOURS_PER_YEAR, FLEET_FAILURE_RATE, FLEET_REPAIR_HOURS, FLEET_REPAIR_SLOTS,
+    FLEET_SWAP_HOURS, FLEET_SPARES_PCT, FLEET_CURTAIL_PER_YEAR, FLEET_CURTAIL_HOURS,
+    FLEET_CURTAIL_SHARE, REWARD_SOURCE,
+)
+import metrics
+
+# unit states
+RUNNING, SPARE, QUEUED, REPAIR, INSTALL, CURTAILED = range(6)
+# event kinds (also the tie-break order at equal times)
+_FAIL, _REPAIRED, _INSTALLED, _CURTAIL_START, _CURTAIL_END = range(5)
+
+
+def build_fleet(miners, mining_mw=None, spares_pct: float = FLEET_SPARES_PCT) -> pd.DataFrame:
+    """
+    One row per model with hashrate_THs, power_W, units (deployed) and spares. `miners`
+    is a calculator spec dict (th_s/watts or hashrate_ths/power_w, as the app builds) or
+    a catalog-shaped DataFrame with a units column (e.g. FleetPlan.fleet) or mining_mw
+    per row; otherwise `mining_mw` is split into whole units of each row.
+    """
+    if isinstance(miners, dict):
+        miners = pd.DataFrame([{
+            "name": miners.get("name"),
+            "hashrate_THs": miners.get("th_s", miners.get("hashrate_ths")),
+            "power_W": miners.get("watts", miners.get("power_w")),
+            **{k: miners[k] for k in ("cost_per_mw_gbp", "failure_rate") if k in miners},
+        }])
+    df = miners.reset_index(drop=True)
+    ths = pd.to_numeric(df["hashrate_THs"], errors="coerce").to_numpy(dtype=float)
+    watts = pd.to_numeric(df["power_W"], errors="coerce").to_numpy(dtype=float)
+    if not (np.isfinite(ths) & np.isfinite(watts) & (ths > 0) & (watts > 0)).all():
+        raise ValueError("every model needs a positive hashrate_THs and power_W")
+    if "units" in df.columns:
+        units = df["units"].to_numpy(dtype=float)
+    else:
+        mw = df["mining_mw"].to_numpy(dtype=float) if "mining_mw" in df.columns else mining_mw
+        if mw is None:
+            raise ValueError("mining_mw is required unless miners has a units or mining_mw column")
+        units = np.floor(np.asarray(mw, dtype=float) * 1e6 / watts + 1e-9)
+    units = np.broadcast_to(units, ths.shape).astype(np.int64)
+    out = df.assign(hashrate_THs=ths, power_W=watts, units=units,
+                    spares=np.ceil(units * spares_pct - 1e-9).astype(np.int64))
+    return out[out["units"] > 0].reset_index(drop=True)
+
+
+def _curtailments(hours, per_year, mean_hours, share, rng) -> np.ndarray:
+    """Non-overlapping (start, length, share) events: Poisson arrivals, exponential lengths."""
+    out, t = [], 0.0
+    if per_year > 0 and share > 0:
+        while True:
+            t += rng.exponential(HOURS_PER_YEAR / per_year)
+            if t >= hours:
+                break
+            length = rng.exponential(mean_hours)
+            out.append((t, length, share))
+            t += length
+    return np.array(out, dtype=float).reshape(-1, 3)
+
+
+class _Draws:
+    """Standard exponential variates drawn in blocks (one generator call per block, not per event)."""
+
+    def __init__(self, rng: np.random.Generator, block: int = 4096):
+        self.rng, self.block, self.buf, self.i = rng, block, [], 0
+
+    def __call__(self) -> float:
+        if self.i == len(self.buf):
+            self.buf, self.i = self.rng.standard_exponential(self.block).tolist(), 0
+        self.i += 1
+        return self.buf[self.i - 1]
+
+
+@dataclass
+class FleetSim:
+    """One simulated horizon: per-model totals and the fleet's online step functions."""
+    fleet: pd.DataFrame         # per model: units, spares, failures, availability
+    hours: float
+    times: np.ndarray           # hours at which the online hashrate/power changed
+    online_th_s: np.ndarray     # TH/s online from each time to the next
+    online_w: np.ndarray
+    failures: int
+    stockouts: int              # failures with no spare of that model on the shelf
+    max_queue: int              # longest wait for a repair slot (units)
+    curtailments: int
+
+    @property
+    def nameplate_th_s(self) -> float:
+        return float((self.fleet["units"] * self.fleet["hashrate_THs"]).sum())
+
+    @property
+    def nameplate_w(self) -> float:
+        return float((self.fleet["units"] * self.fleet["power_W"]).sum())
+
+    def _integral(self, values: np.ndarray, at: np.ndarray) -> np.ndarray:
+        """∫ values dt from 0 to each of `at` (the step function is right-continuous)."""
+        cum = np.concatenate([[0.0], np.cumsum(values[:-1] * np.diff(self.times))])
+        i = np.searchsorted(self.times, at, side="right") - 1
+        return cum[i] + values[i] * (at - self.times[i])
+
+    def profile(self, step_hours: float = 24) -> pd.DataFrame:
+        """Mean online TH/s and MW in each `step_hours` bucket, indexed by the bucket's start hour."""
+        edges = np.append(np.arange(0.0, self.hours, step_hours), self.hours)
+        span = np.diff(edges)
+        return pd.DataFrame({
+            "th_s": np.diff(self._integral(self.online_th_s, edges)) / span,
+            "mw": np.diff(self._integral(self.online_w, edges)) / span / 1e6,
+        }, index=pd.Index(edges[:-1], name="hour"))
+
+    @property
+    def availability(self) -> float:
+        """Achieved share of nameplate hashrate over the horizon."""
+        total = self._integral(self.online_th_s, np.array([self.hours]))[0]
+        return float(total / (self.nameplate_th_s * self.hours)) if self.nameplate_th_s else 0.0
+
+    @property
+    def uptime(self) -> float:
+        """Achieved share of nameplate power (energy drawn / energy at full load)."""
+        total = self._integral(self.online_w, np.array([self.hours]))[0]
+        return float(total / (self.nameplate_w * self.hours)) if self.nameplate_w else 0.0
+
+
+@metrics.timed("fleet_sim")
+def simulate_fleet(fleet: pd.DataFrame, hours: float = HOURS_PER_YEAR,
+                   failure_rate: float = FLEET_FAILURE_RATE, repair_hours: float = FLEET_REPAIR_HOURS,
+                   repair_slots: int = FLEET_REPAIR_SLOTS, swap_hours: float = FLEET_SWAP_HOURS,
+                   curtail_per_year: float = FLEET_CURTAIL_PER_YEAR,
+                   curtail_hours: float = FLEET_CURTAIL_HOURS, curtail_share: float = FLEET_CURTAIL_SHARE,
+                   curtailments: Optional[Sequence[Tuple[float, float, float]]] = None,
+                   seed: Optional[int] = None) -> FleetSim:
+    """
+    Simulate a fleet from build_fleet() for `hours`. A failure_rate column on the fleet
+    overrides the default per model. `curtailments` is an explicit list of
+    non-overlapping (start_hour, length_hours, share) events in place of the random ones.
+    """
+    rng = np.random.default_rng(seed)
+    draw = _Draws(rng)
+    n_models = len(fleet)
+    units = fleet["units"].to_numpy(dtype=np.int64)
+    spares = fleet["spares"].to_numpy(dtype=np.int64)
+    rates = (fleet["failure_rate"].fillna(failure_rate).to_numpy(dtype=float)
+             if "failure_rate" in fleet.columns else np.full(n_models, failure_rate)) / HOURS_PER_YEAR
+
+    # units: the deployed ones in slots 0..N-1, then the spares
+    model = np.concatenate([np.repeat(np.arange(n_models), units), np.repeat(np.arange(n_models), spares)])
+    n_slots, n_units = int(units.sum()), len(model)
+    th = fleet["hashrate_THs"].to_numpy(dtype=float)[model]
+    watts = fleet["power_W"].to_numpy(dtype=float)[model]
+    rate = rates[model]
+    state = np.full(n_units, SPARE, dtype=np.int8)
+    state[:n_slots] = RUNNING
+    slot = np.full(n_units, -1, dtype=np.int64)
+    slot[:n_slots] = np.arange(n_slots)
+    epoch = np.zeros(n_units, dtype=np.int64)         # bumped to cancel a pending failure
+    run_since = np.zeros(n_units)
+    run_hours = np.zeros(n_units)
+    fails = np.zeros(n_units, dtype=np.int64)
+    shed_order = np.lexsort((np.arange(n_units), -watts / th))   # least efficient first
+
+    shelf = [deque((np.flatnonzero(model[n_slots:] == m) + n_slots).tolist()) for m in range(n_models)]
+    vacant = [deque() for _ in range(n_models)]
+    queue: deque = deque()
+    busy = failures = stockouts = max_queue = 0
+
+    with np.errstate(divide="ignore"):
+        fail_at = rng.standard_exponential(n_slots) / rate[:n_slots]
+    heap = [(float(t), _FAIL, int(u), 0) for u, t in enumerate(fail_at) if t < hours]
+    events = (_curtailments(hours, curtail_per_year, curtail_hours, curtail_share, rng)
+              if curtailments is None else np.asarray(curtailments, dtype=float).reshape(-1, 3))
+    for k, (start, length, _) in enumerate(events):
+        heap += [(float(start), _CURTAIL_START, -1, k), (float(start + length), _CURTAIL_END, -1, k)]
+    heapq.heapify(heap)
+
+    online_th, online_w = float(th[:n_slots].sum()), float(watts[:n_slots].sum())
+    times, trace_th, trace_w = [0.0], [online_th], [online_w]
+    cap_w = np.inf                                    # power the site can take during a curtailment
+
+    def run(u, t):
+        state[u], run_since[u] = RUNNING, t
+        if rate[u] > 0:
+            t_fail = t + draw() / rate[u]
+            if t_fail < hours:
+                heapq.heappush(heap, (t_fail, _FAIL, u, int(epoch[u])))
+
+    def stop(u, t, new_state):
+        state[u] = new_state
+        epoch[u] += 1
+        run_hours[u] += t - run_since[u]
+
+    def start_repair(u, t):
+        nonlocal busy
+        busy += 1
+        state[u] = REPAIR
+        heapq.heappush(heap, (t + draw() * repair_hours, _REPAIRED, u, 0))
+
+    def install(u, s, t):
+        state[u], slot[u] = INSTALL, s
+        heapq.heappush(heap, (t + swap_hours, _INSTALLED, u, 0))
+
+    while heap:
+        t, kind, u, tag = heapq.heappop(heap)
+        if t >= hours:
+            break
+        if kind == _FAIL:
+            if state[u] != RUNNING or epoch[u] != tag:
+                continue
+            stop(u, t, QUEUED)
+            fails[u] += 1
+            failures += 1
+            online_th -= th[u]
+            online_w -= watts[u]
+            s, m = slot[u], model[u]
+            slot[u] = -1
+            if busy < repair_slots:
+                start_repair(u, t)
+            else:
+                queue.append(u)
+                max_queue = max(max_queue, len(queue))
+            if shelf[m]:
+                install(shelf[m].popleft(), s, t)
+            else:
+                vacant[m].append(s)
+                stockouts += 1
+        elif kind == _REPAIRED:
+            busy -= 1
+            if queue:
+                start_repair(queue.popleft(), t)
+            m = model[u]
+            if vacant[m]:
+                install(u, vacant[m].popleft(), t)
+            else:
+                state[u] = SPARE
+                shelf[m].append(u)
+        elif kind == _INSTALLED:
+            if online_w + watts[u] > cap_w * (1 + 1e-12):
+                state[u] = CURTAILED                  # ready mid-curtailment: waits for the event to end
+            else:
+                run(u, t)
+                online_th += th[u]
+                online_w += watts[u]
+        elif kind == _CURTAIL_START:
+            cand = shed_order[state[shed_order] == RUNNING]
+            target = events[tag, 2] * watts[:n_slots].sum()
+            shed = cand[:np.searchsorted(np.cumsum(watts[cand]), target) + 1]
+            for v in shed.tolist():
+                stop(v, t, CURTAILED)
+            online_th -= th[shed].sum()
+            online_w -= watts[shed].sum()
+            cap_w = online_w
+        else:   # _CURTAIL_END
+            cap_w = np.inf
+            back = np.flatnonzero(state == CURTAILED)
+            for v in back.tolist():
+                run(v, t)
+            online_th += th[back].sum()
+            online_w += watts[back].sum()
+        times.append(t)
+        trace_th.append(online_th)
+        trace_w.append(online_w)
+
+    running = state == RUNNING
+    run_hours[running] += hours - run_since[running]
+    times.append(float(hours))
+    trace_th.append(online_th)
+    trace_w.append(online_w)
+
+    per_model = pd.DataFrame({"model": model, "fails": fails, "run_th": run_hours * th})
+    per_model = per_model.groupby("model").sum().reindex(range(n_models), fill_value=0)
+    out = fleet.assign(
+        failures=per_model["fails"].to_numpy(),
+        availability=per_model["run_th"].to_numpy() / (units * fleet["hashrate_THs"].to_numpy() * hours),
+    )
+    return FleetSim(
+        fleet=out, hours=float(hours), times=np.array(times), online_th_s=np.array(trace_th),
+        online_w=np.array(trace_w), failures=failures, stockouts=stockouts, max_queue=max_queue,
+        curtailments=len(events),
+    )
+
+
+def fleet_revenue(sim: FleetSim, chp_mw, load_factor, roc_rtfo, eii, market=None,
+                  cost_per_mw_gbp: Optional[float] = None, reward_source: str = REWARD_SOURCE) -> dict:
+    """
+    calculate()'s outputs for the simulated fleet: mining_mw is its nameplate power, the
+    achieved uptime replaces MINING_UPTIME and J/TH is what the units that were online
+    achieved (curtailment sheds the least efficient first). Capex includes the spares;
+    BTC is paid per `reward_source` as in calculate(). Adds availability, uptime, units
+    and spares.
+    """
+    if market is None:
+        from market_data import get_market_snapshot
+        market = get_market_snapshot().market
+    f = sim.fleet
+    if "cost_per_mw_gbp" in f.columns:
+        cost = f["cost_per_mw_gbp"].to_numpy(dtype=float)
+    else:
+        cost = np.full(len(f), cost_per_mw_gbp if cost_per_mw_gbp is not None else _baseline_cost_per_mw())
+    owned_w = (f["units"] + f["spares"]).to_numpy() * f["power_W"].to_numpy()
+    th_hours = sim._integral(sim.online_th_s, np.array([sim.hours]))[0]
+    wh = sim._integral(sim.online_w, np.array([sim.hours]))[0]
+    j_th = wh / th_hours if th_hours > 0 else sim.nameplate_w / sim.nameplate_th_s
+    out = _calculate_arrays(_with_reward_source({
+        "chp_mw": chp_mw, "load_factor": load_factor, "roc_rtfo": roc_rtfo, "eii": eii,
+        "mining_mw": sim.nameplate_w / 1e6, "uptime": sim.uptime, "j_th": j_th,
+        "cost_per_mw_gbp": float(owned_w @ cost) / sim.nameplate_w,
+    }, reward_source, market), market)
+    res = {k: v[0].item() for k, v in out.items()}
+    res.update(availability=sim.availability, uptime=sim.uptime,
+               units=int(f["units"].sum()), spares=int(f["spares"].sum()))
+    return res
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Simulate a year of fleet failures, repairs and curtailment.")
+    ap.add_argument("--units", type=int, default=10_000)
+    ap.add_argument("--th-s", type=float, default=200.0, help="unit hashrate (TH/s)")
+    ap.add_argument("--watts", type=float, default=3500.0, help="unit power (W)")
+    ap.add_argument("--failure-rate", type=float, default=FLEET_FAILURE_RATE, help="per unit-year")
+    ap.add_argument("--spares-pct", type=float, default=FLEET_SPARES_PCT)
+    ap.add_argument("--repair-slots", type=int, default=FLEET_REPAIR_SLOTS)
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args(argv)
+    fleet = build_fleet(pd.DataFrame({"hashrate_THs": [args.th_s], "power_W": [args.watts],
+                                      "units": [args.units]}), spares_pct=args.spares_pct)
+    sim = simulate_fleet(fleet, failure_rate=args.failure_rate, repair_slots=args.repair_slots, seed=args.seed)
+    print(f"{sim.fleet['units'].sum():,} units + {sim.fleet['spares'].sum():,} spares over {sim.hours:,.0f} h: "
+          f"{sim.failures:,} failures, {sim.stockouts:,} without a spare, repair queue up to {sim.max_queue}, "
+          f"{sim.curtailments} curtailments")
+    print(f"availability {sim.availability:.2%} of nameplate hashrate, uptime {sim.uptime:.2%} of nameplate power")
+
+
+if __name__ == "__main__":
+    main()
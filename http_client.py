@@ -0,0 +1,182 @@
+# http_client.py
+"""
+One outbound HTTP layer for every upstream data source (CoinGecko, blockchain.info,
+minerstat, mempool.space): a pooled keep-alive session, a per-endpoint circuit breaker, optional
+hedged requests and concurrent fan-out. Endpoint URLs can be re-pointed with
+configure(), e.g. at a local stub server.
+"""
+from __future__ import annotations
+import threading, time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants import (
+    COINGECKO_URL, COINGECKO_TIMEOUT, COINGECKO_HISTORY_URL,
+    BLOCKCHAIN_URL, BLOCKCHAIN_TIMEOUT,
+    MINERSTAT_URL, MINERSTAT_TIMEOUT, MEMPOOL_BLOCKS_URL, MEMPOOL_TIMEOUT, HTTP_HEDGE_AFTER,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_AFTER,
+)
+import metrics
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of making a request while an endpoint's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed → open → half-open breaker. After `failure_threshold` consecutive
+    failures the breaker opens and calls fail fast for `reset_after` seconds; then a
+    single trial call is let through and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_after: float = BREAKER_RESET_AFTER):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self._opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    url: str
+    timeout: float
+    hedge_after: Optional[float] = None   # seconds before a duplicate request is fired
+
+
+ENDPOINTS: Dict[str, Endpoint] = {
+    "coingecko": Endpoint(COINGECKO_URL, COINGECKO_TIMEOUT, HTTP_HEDGE_AFTER),
+    "coingecko_history": Endpoint(COINGECKO_HISTORY_URL, COINGECKO_TIMEOUT, HTTP_HEDGE_AFTER),
+    "blockchain": Endpoint(BLOCKCHAIN_URL, BLOCKCHAIN_TIMEOUT, HTTP_HEDGE_AFTER),
+    "minerstat": Endpoint(MINERSTAT_URL, MINERSTAT_TIMEOUT),
+    "mempool_blocks": Endpoint(MEMPOOL_BLOCKS_URL, MEMPOOL_TIMEOUT, HTTP_HEDGE_AFTER),
+}
+_BREAKERS: Dict[str, CircuitBreaker] = {name: CircuitBreaker() for name in ENDPOINTS}
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=len(ENDPOINTS), pool_maxsize=16)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+# Separate pools so fan-out tasks can never starve the requests (and hedges) they wait on.
+_FANOUT = ThreadPoolExecutor(max_workers=8, thread_name_prefix="http-fanout")
+_REQUESTS = ThreadPoolExecutor(max_workers=16, thread_name_prefix="http-request")
+
+
+def configure(name: str, **changes) -> Endpoint:
+    """Override url/timeout/hedge_after for an endpoint (and reset its breaker)."""
+    ENDPOINTS[name] = replace(ENDPOINTS[name], **changes)
+    _BREAKERS[name] = CircuitBreaker()
+    return ENDPOINTS[name]
+
+
+def breaker(name: str) -> CircuitBreaker:
+    return _BREAKERS[name]
+
+
+def _send(ep: Endpoint, path: str = "", **kwargs) -> requests.Response:
+    return _session.get(ep.url + path, timeout=ep.timeout, **kwargs)
+
+
+def _hedged(ep: Endpoint, **kwargs) -> requests.Response:
+    first = _REQUESTS.submit(_send, ep, **kwargs)
+    done, _ = wait([first], timeout=ep.hedge_after)
+    if done:
+        return first.result()
+    pending = {first, _REQUESTS.submit(_send, ep, **kwargs)}
+    deadline = time.monotonic() + ep.timeout
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for fut in done:
+            if fut.exception() is None:
+                for loser in pending:
+                    loser.add_done_callback(lambda f: f.exception() is None and f.result().close())
+                return fut.result()
+            error = fut.exception()
+    raise error or requests.Timeout(f"hedged request to {ep.url} timed out")
+
+
+def get(name: str, **kwargs) -> requests.Response:
+    """
+    GET an endpoint (plus an optional `path` suffix) through its circuit breaker.
+    Connection errors, timeouts, 5xx and 429 responses count as failures; other responses are returned as-is (the caller
+    decides whether to raise_for_status()).
+    """
+    ep, cb = ENDPOINTS[name], _BREAKERS[name]
+    if not cb.allow():
+        metrics.inc("upstream_requests", endpoint=name, outcome="circuit_open")
+        raise CircuitOpenError(f"{name} circuit open; skipping request")
+    try:
+        resp = _hedged(ep, **kwargs) if ep.hedge_after else _send(ep, **kwargs)
+    except Exception as exc:
+        cb.record_failure()
+        metrics.inc("upstream_requests", endpoint=name, outcome=type(exc).__name__)
+        raise
+    if resp.status_code >= 500 or resp.status_code == 429:
+        cb.record_failure()
+        metrics.inc("upstream_requests", endpoint=name, outcome=f"http_{resp.status_code}")
+    else:
+        cb.record_success()
+        metrics.inc("upstream_requests", endpoint=name, outcome="ok")
+    return resp
+
+
+def get_json(name: str, **kwargs):
+    resp = get(name, **kwargs)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def fetch_json_many(names: Iterable[str]) -> Dict[str, object]:
+    """
+    Fetch several endpoints concurrently. Returns {name: parsed JSON or the exception
+    raised}, so one failing source does not hide the others.
+    """
+    futures = {name: _FANOUT.submit(get_json, name) for name in names}
+    out: Dict[str, object] = {}
+    for name, fut in futures.items():
+        try:
+            out[name] = fut.result()
+        except Exception as exc:
+            out[name] = exc
+    return out
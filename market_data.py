@@ -0,0 +1,180 @@
+# market_data.py
+from __future__ import annotations
+import json, os, threading, time, traceback
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from constants import MARKET_CACHE_TTL, FALLBACK_BTC_PRICE, FALLBACK_HASHRATE
+import metrics
+
+SNAPSHOT_PATH = Path("data") / "market_snapshot.json"
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    btc_price: int
+    hashrate: int            # EH/s, 30-day mean
+    fetched_at: float        # unix seconds; 0 when never fetched
+    source: str              # "live", "disk", "startup" or "fallback"
+    # raw 30-day series behind the headline numbers, as (unix_seconds, value) pairs
+    price_series: Tuple[Tuple[float, float], ...] = ()      # GBP/BTC
+    hashrate_series: Tuple[Tuple[float, float], ...] = ()   # EH/s
+
+    @property
+    def market(self) -> Tuple[int, int]:
+        """(btc_price, hashrate) in the shape calculate()/calculate_batch() expect."""
+        return self.btc_price, self.hashrate
+
+    def age_seconds(self, now: Optional[float] = None) -> float:
+        if not self.fetched_at:
+            return float("inf")
+        return (now or time.time()) - self.fetched_at
+
+
+def _from_dict(raw: dict, source: str) -> MarketSnapshot:
+    return MarketSnapshot(int(raw["btc_price"]), int(raw["hashrate"]), float(raw["fetched_at"]), source,
+                          price_series=tuple(map(tuple, raw.get("price_series", ()))),
+                          hashrate_series=tuple(map(tuple, raw.get("hashrate_series", ()))))
+
+
+def _fetch_live() -> MarketSnapshot:
+    """Fetch a live snapshot from the upstream APIs, raising on any failure."""
+    import http_client
+    res = http_client.fetch_json_many(["coingecko", "blockchain", "coingecko_history"])
+    for name in ("coingecko", "blockchain"):
+        if isinstance(res[name], Exception):
+            raise res[name]
+    btc = res["coingecko"]["bitcoin"]["gbp"]
+    hr_res = res["blockchain"]
+    points = [(p["x"], p["y"] / 1e18) for p in hr_res["values"] if p["y"] is not None]
+    if not points:
+        raise ValueError("No hashrate data")
+    values = [y for _, y in points]
+    hashrate_eh = round(sum(values) / len(values), 0)
+    # price history only feeds risk models; losing it must not lose the snapshot
+    history = res["coingecko_history"]
+    prices = () if isinstance(history, Exception) else tuple(
+        (t / 1000, p) for t, p in history.get("prices", []) if p is not None)
+    return MarketSnapshot(int(btc), int(hashrate_eh), time.time(), "live",
+                          price_series=prices, hashrate_series=tuple(points))
+
+
+def _record(snap: MarketSnapshot) -> None:
+    """Keep the fetched series in the local history (only new points are written)."""
+    try:
+        from market_history import HISTORY
+        HISTORY.ingest(snap)
+    except Exception:
+        traceback.print_exc()
+
+
+@metrics.timed("fetch_market_data")
+def fetch_market_data():
+    """Blocking live fetch; falls back to the hard-coded Nov 2025 values on any error."""
+    try:
+        snap = _fetch_live()
+    except Exception:
+        return FALLBACK_BTC_PRICE, FALLBACK_HASHRATE
+    _record(snap)
+    return snap.market
+
+
+class MarketCache:
+    """
+    Process-wide stale-while-revalidate cache for market data.
+    get() never touches the network: it returns the newest snapshot held in memory
+    (or persisted on disk from a previous run) and, when that is older than the TTL,
+    wakes the background refresher. Successful fetches are written to `path`.
+    """
+
+    def __init__(self, ttl: float = MARKET_CACHE_TTL, path: Path = SNAPSHOT_PATH,
+                 fetcher: Callable[[], MarketSnapshot] = _fetch_live):
+        self.ttl = ttl
+        self.path = Path(path)
+        self.fetcher = fetcher
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot: Optional[MarketSnapshot] = None
+        self._last_attempt = 0.0
+
+    def _load_disk(self) -> Optional[MarketSnapshot]:
+        try:
+            return _from_dict(json.loads(self.path.read_text()), "disk")
+        except Exception:
+            return None
+
+    def _load_startup(self) -> Optional[MarketSnapshot]:
+        """The market in the prebuilt startup snapshot: newer than the hard-coded fallback."""
+        import startup
+        try:
+            return _from_dict(startup.read()["market"], "startup")
+        except Exception:
+            return None
+
+    def _save_disk(self, snap: MarketSnapshot) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(asdict(snap)))
+            os.replace(tmp, self.path)
+        except Exception:
+            traceback.print_exc()
+
+    def refresh(self) -> MarketSnapshot:
+        """Fetch synchronously; on failure keep (and return) the last good snapshot."""
+        self._last_attempt = time.time()
+        try:
+            with metrics.span("market_refresh"):
+                snap = self.fetcher()
+        except Exception:
+            traceback.print_exc()
+            metrics.inc("market_refresh", result="failed")
+            return self.get(revalidate=False)
+        metrics.inc("market_refresh", result="ok")
+        with self._lock:
+            self._snapshot = snap
+        self._save_disk(snap)
+        _record(snap)
+        return snap
+
+    def get(self, revalidate: bool = True) -> MarketSnapshot:
+        snap = self._snapshot
+        if snap is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load_disk() or self._load_startup() or MarketSnapshot(
+                        FALLBACK_BTC_PRICE, FALLBACK_HASHRATE, 0.0, "fallback")
+                snap = self._snapshot
+        stale = snap.age_seconds() > self.ttl
+        metrics.inc("market_cache", result="stale" if stale else "hit", source=snap.source)
+        if (revalidate and stale
+                and time.time() - self._last_attempt > self.ttl):
+            self.start()
+            self._wake.set()
+        return snap
+
+    def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            snap = self._snapshot
+            if snap is None or snap.age_seconds() > self.ttl:
+                self.refresh()
+            self._wake.wait(timeout=self.ttl)
+
+    def start(self) -> None:
+        """Start the daemon refresher thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="market-refresh", daemon=True)
+                self._thread.start()
+
+
+_CACHE = MarketCache()
+
+def get_market_snapshot() -> MarketSnapshot:
+    """Non-blocking read of the shared market snapshot (see MarketCache)."""
+    return _CACHE.get()
@@ -0,0 +1,136 @@
+# market_history.py
+"""
+Append-only local time series of BTC price (GBP) and network hashrate (EH/s).
+
+Each series is a flat file of fixed-width (unix_seconds, value) float64 records under
+MARKET_HISTORY_DIR, kept in time order. ingest() is called on every live market fetch
+and writes only points newer than the series' last record (at most one per
+MARKET_HISTORY_MIN_GAP), so re-downloading the same 30-day window costs nothing and the
+history grows by a few hundred bytes a day. A read is one
+np.fromfile; daily() bins a window into one value per calendar day (UTC) for backtests.
+"""
+from __future__ import annotations
+import os, threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from constants import MARKET_HISTORY_DIR, MARKET_HISTORY_MIN_GAP
+import metrics
+
+RECORD = np.dtype([("t", "<f8"), ("v", "<f8")])
+SERIES = ("price", "hashrate")
+_DAY = 86_400
+
+
+def _day(when) -> np.datetime64:
+    return np.datetime64(when, "D")
+
+
+class MarketHistory:
+    """The price and hashrate series under one directory (created on first append)."""
+
+    def __init__(self, root=MARKET_HISTORY_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def path(self, name: str) -> Path:
+        return self.root / f"{name}.f8"
+
+    def read(self, name: str) -> np.ndarray:
+        """Every record of a series (structured t/v array, ascending t)."""
+        path = self.path(name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, RECORD)
+        # a torn final record (crash mid-append) is ignored rather than misread
+        return np.fromfile(path, dtype=RECORD, count=size // RECORD.itemsize)
+
+    def last_time(self, name: str) -> float:
+        path = self.path(name)
+        try:
+            with open(path, "rb") as f:
+                size = f.seek(0, os.SEEK_END) // RECORD.itemsize * RECORD.itemsize
+                if not size:
+                    return -np.inf
+                f.seek(size - RECORD.itemsize)
+                return float(np.frombuffer(f.read(RECORD.itemsize), RECORD)["t"][0])
+        except OSError:
+            return -np.inf
+
+    def append(self, name: str, points: Iterable[Tuple[float, float]],
+               min_gap: float = MARKET_HISTORY_MIN_GAP) -> int:
+        """
+        Append the points that are at least `min_gap` seconds newer than the previous
+        record (the spot price changes on every fetch; the store keeps one point per
+        gap). Returns how many were written.
+        """
+        pts = np.array([(float(t), float(v)) for t, v in points if v is not None], dtype=RECORD)
+        with self._lock:
+            pts = np.sort(pts[np.isfinite(pts["v"])], order="t")
+            keep, last = [], self.last_time(name)
+            for i, t in enumerate(pts["t"]):   # a fetch brings a few dozen points at most
+                if t >= last + max(min_gap, 1e-9):
+                    keep.append(i)
+                    last = t
+            pts = pts[keep]
+            if len(pts):
+                self.root.mkdir(parents=True, exist_ok=True)
+                with open(self.path(name), "ab") as f:
+                    f.write(pts.tobytes())
+        metrics.inc("market_history_ingest", series=name, result="appended" if len(pts) else "unchanged")
+        return len(pts)
+
+    def ingest(self, snap) -> Dict[str, int]:
+        """Record a fetched MarketSnapshot: its 30-day series plus the spot price."""
+        return {
+            "price": self.append("price", [*snap.price_series, (snap.fetched_at, snap.btc_price)]),
+            "hashrate": self.append("hashrate", snap.hashrate_series),
+        }
+
+    def window(self) -> Optional[Tuple[np.datetime64, np.datetime64]]:
+        """First and last day on which both series have data, or None."""
+        first, last = [], []
+        for name in SERIES:
+            rec = self.read(name)
+            if not len(rec):
+                return None
+            first.append(rec["t"][0])
+            last.append(rec["t"][-1])
+        lo, hi = (np.datetime64(int(x) // _DAY, "D") for x in (max(first), min(last)))
+        return (lo, hi) if lo <= hi else None
+
+    def daily(self, name: str, start, end, how: str = "last") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One value per day from `start` to `end` inclusive: the day's last record ("last",
+        e.g. a closing price) or mean ("mean"). Days without a record carry the previous
+        value forward (seeded from before `start`); NaN until the first record. Also
+        returns the mask of days that had a record of their own.
+        """
+        start, end = _day(start), _day(end)
+        rec = self.read(name)
+        lo = int(start.astype("int64"))
+        n = max(0, int(end.astype("int64")) - lo + 1)
+        t = rec["t"]
+        i0, i1 = np.searchsorted(t, [lo * _DAY, (lo + n) * _DAY])
+        idx = (t[i0:i1] // _DAY).astype(np.int64) - lo
+        v = rec["v"][i0:i1]
+        out = np.full(n, np.nan)
+        if how == "mean":
+            counts = np.bincount(idx, minlength=n)
+            with np.errstate(invalid="ignore"):
+                out = np.bincount(idx, weights=v, minlength=n) / counts
+        else:
+            last = np.r_[idx[1:] != idx[:-1], True] if len(idx) else np.zeros(0, bool)
+            out[idx[last]] = v[last]
+        observed = ~np.isnan(out)
+        # forward-fill, seeded with the last record before the window
+        seed = rec["v"][i0 - 1] if i0 else np.nan
+        pos = np.maximum.accumulate(np.where(observed, np.arange(n), -1))
+        filled = np.where(pos >= 0, out[np.maximum(pos, 0)], seed)
+        return filled, observed
+
+
+HISTORY = MarketHistory()
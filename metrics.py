@@ -0,0 +1,176 @@
+# metrics.py
+"""
+In-process instrumentation: timing spans and counters for the hot paths.
+
+    with metrics.span("calculate"): ...        # or @metrics.timed("calculate")
+    metrics.inc("market_cache", result="hit")
+
+Every span feeds a process-wide latency histogram; spans opened while a trace is active
+(start_trace() … end_trace(), e.g. once per Streamlit rerun) are also recorded in that
+trace, nested, for a per-rerun breakdown. section() opens a trace of its own when none
+is active (a Streamlit fragment rerunning without the rest of the script). Recording is
+a perf_counter() pair and a dict update under a lock, cheap enough to leave on. Export
+with prometheus_text() or write_file().
+"""
+from __future__ import annotations
+import bisect, contextlib, contextvars, functools, os, tempfile, threading, time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PREFIX = "adbmc"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_histograms: Dict[str, list] = {}        # span -> [bucket counts..., +Inf count, sum]
+_counters: Dict[Tuple[str, tuple], float] = {}
+_trace: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("metrics_trace", default=None)
+_depth: contextvars.ContextVar[int] = contextvars.ContextVar("metrics_depth", default=0)
+
+
+def observe(name: str, seconds: float) -> None:
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = [0] * (len(BUCKETS) + 1) + [0.0]
+        h[bisect.bisect_left(BUCKETS, seconds)] += 1
+        h[-1] += seconds
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class span:
+    """Time a block (`with span(name):`), or call start()/stop() where a block does not fit."""
+    __slots__ = ("name", "_t", "_entry", "_token")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def start(self) -> "span":
+        trace = _trace.get()
+        self._entry = self._token = None
+        if trace is not None:
+            self._entry = [self.name, _depth.get(), 0.0]
+            trace.append(self._entry)
+            self._token = _depth.set(self._entry[1] + 1)
+        self._t = time.perf_counter()
+        return self
+
+    def stop(self) -> float:
+        elapsed = time.perf_counter() - self._t
+        observe(self.name, elapsed)
+        if self._entry is not None:
+            self._entry[2] = elapsed
+            _depth.reset(self._token)
+        return elapsed
+
+    def __enter__(self) -> "span":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def timed(name: str):
+    """Decorator form of span()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def start_trace() -> list:
+    """Begin recording spans in this context (e.g. one Streamlit rerun); returns the trace."""
+    trace: list = []
+    _trace.set(trace)
+    _depth.set(0)
+    return trace
+
+def end_trace() -> None:
+    """Stop recording spans into the current trace (they still feed the histograms)."""
+    _trace.set(None)
+    _depth.set(0)
+
+@contextlib.contextmanager
+def section(name: str):
+    """
+    span(name), nested in the active trace; with none active, the root of a new trace
+    that ends with it. Yields that new trace, or None when nested.
+    """
+    if _trace.get() is not None:
+        with span(name):
+            yield None
+        return
+    trace = start_trace()
+    try:
+        with span(name):
+            yield trace
+    finally:
+        end_trace()
+
+def trace_rows(trace: list) -> List[dict]:
+    """A trace as rows for display: indented span name and milliseconds."""
+    return [{"span": "  " * depth + name, "ms": round(seconds * 1000, 3)} for name, depth, seconds in trace]
+
+
+def snapshot() -> Tuple[dict, dict]:
+    with _lock:
+        return ({k: list(v) for k, v in _histograms.items()}, dict(_counters))
+
+def counters() -> Dict[str, float]:
+    """Counters flattened to 'name{label="v"}' keys (for display)."""
+    return {_series(name, dict(labels)): v for (name, labels), v in snapshot()[1].items()}
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _series(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return f"{name}{{{inner}}}"
+
+
+def prometheus_text() -> str:
+    """All spans and counters in the Prometheus text exposition format."""
+    histograms, counts = snapshot()
+    lines = []
+    if histograms:
+        metric = f"{PREFIX}_span_seconds"
+        lines += [f"# HELP {metric} Wall time of instrumented code paths.", f"# TYPE {metric} histogram"]
+        for name in sorted(histograms):
+            h, cumulative = histograms[name], 0
+            for le, n in zip([*map(str, BUCKETS), "+Inf"], h[:-1]):
+                cumulative += n
+                lines.append(f"{_series(metric + '_bucket', {'span': name, 'le': le})} {cumulative}")
+            lines.append(f"{_series(metric + '_sum', {'span': name})} {h[-1]:.6f}")
+            lines.append(f"{_series(metric + '_count', {'span': name})} {cumulative}")
+    for name in sorted({n for n, _ in counts}):
+        metric = f"{PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for (n, labels), v in sorted(counts.items()):
+            if n == name:
+                lines.append(f"{_series(metric, dict(labels))} {v:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path) -> None:
+    """Atomically (re)write the Prometheus text to `path`, e.g. for node_exporter's textfile collector."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
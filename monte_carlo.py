@@ -0,0 +1,192 @@
+# monte_carlo.py
+"""
+Monte Carlo risk engine for the two inputs that dominate BTC revenue uncertainty:
+BTC price and network hashrate. Both follow correlated geometric Brownian motions
+(drift/volatility fitted from the cached 30-day series when available), stepped
+daily; site economics are evaluated across every path in vectorized NumPy and large
+runs are split into chunks across a process pool. A fixed `seed` gives identical
+results regardless of how many processes are used.
+"""
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from calculator import _calculate_arrays, _network_reward
+from constants import (
+    DAYS_PER_YEAR, POOL_FEE_PCT, SECONDS_PER_YEAR, REWARD_SOURCE,
+    MC_DEFAULT_PRICE_MU, MC_DEFAULT_PRICE_SIGMA, MC_DEFAULT_HASHRATE_MU,
+    MC_DEFAULT_HASHRATE_SIGMA, MC_DEFAULT_RHO, MC_MAX_ABS_DRIFT,
+    MC_CHUNK_PATHS, MC_PARALLEL_THRESHOLD,
+)
+from market_data import MarketSnapshot, get_market_snapshot
+import metrics
+
+
+@dataclass(frozen=True)
+class GbmParams:
+    """Annualised GBM drift/volatility for price and hashrate plus their correlation."""
+    price_mu: float = MC_DEFAULT_PRICE_MU
+    price_sigma: float = MC_DEFAULT_PRICE_SIGMA
+    hashrate_mu: float = MC_DEFAULT_HASHRATE_MU
+    hashrate_sigma: float = MC_DEFAULT_HASHRATE_SIGMA
+    rho: float = MC_DEFAULT_RHO
+
+
+def _as_array(series) -> Optional[np.ndarray]:
+    arr = np.asarray(series, dtype=float).reshape(-1, 2) if len(series) else None
+    if arr is None:
+        return None
+    arr = arr[np.argsort(arr[:, 0])]
+    arr = arr[arr[:, 1] > 0]
+    return arr if len(arr) >= 5 else None
+
+def _fit_gbm(series) -> Optional[Tuple[float, float]]:
+    """MLE of (mu, sigma) per year from irregularly spaced (unix_seconds, value) points."""
+    arr = _as_array(series)
+    if arr is None:
+        return None
+    dt = np.diff(arr[:, 0]) / SECONDS_PER_YEAR
+    r = np.diff(np.log(arr[:, 1]))
+    keep = dt > 0
+    dt, r = dt[keep], r[keep]
+    if len(dt) < 4:
+        return None
+    m = r.sum() / dt.sum()
+    sigma2 = np.mean((r - m * dt) ** 2 / dt)
+    mu = float(np.clip(m + sigma2 / 2, -MC_MAX_ABS_DRIFT, MC_MAX_ABS_DRIFT))
+    return mu, float(np.sqrt(sigma2))
+
+def _fit_rho(a, b) -> Optional[float]:
+    """Correlation of daily log returns, both series interpolated onto a shared day grid."""
+    a, b = _as_array(a), _as_array(b)
+    if a is None or b is None:
+        return None
+    lo, hi = max(a[0, 0], b[0, 0]), min(a[-1, 0], b[-1, 0])
+    days = np.arange(lo, hi + 1, 86400.0)
+    if len(days) < 6:
+        return None
+    ra = np.diff(np.interp(days, a[:, 0], np.log(a[:, 1])))
+    rb = np.diff(np.interp(days, b[:, 0], np.log(b[:, 1])))
+    if ra.std() == 0 or rb.std() == 0:
+        return None
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+def fit_params(snapshot: MarketSnapshot) -> GbmParams:
+    """Fit GbmParams from a snapshot's cached series, keeping defaults for anything missing."""
+    defaults = GbmParams()
+    price = _fit_gbm(snapshot.price_series) or (defaults.price_mu, defaults.price_sigma)
+    hashrate = _fit_gbm(snapshot.hashrate_series) or (defaults.hashrate_mu, defaults.hashrate_sigma)
+    rho = _fit_rho(snapshot.price_series, snapshot.hashrate_series)
+    return GbmParams(*price, *hashrate, defaults.rho if rho is None else rho)
+
+
+def simulate_paths(params: GbmParams, price0: float, hashrate0: float, n_paths: int,
+                   steps: int, dt: float, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Correlated GBM paths, shape (n_paths, steps): price and hashrate at the end of each step."""
+    z1 = rng.standard_normal((n_paths, steps))
+    z2 = params.rho * z1 + np.sqrt(1 - params.rho ** 2) * rng.standard_normal((n_paths, steps))
+    sq = np.sqrt(dt)
+    z1 *= params.price_sigma * sq
+    z1 += (params.price_mu - params.price_sigma ** 2 / 2) * dt
+    z2 *= params.hashrate_sigma * sq
+    z2 += (params.hashrate_mu - params.hashrate_sigma ** 2 / 2) * dt
+    price = price0 * np.exp(np.cumsum(z1, axis=1, out=z1), out=z1)
+    hashrate = hashrate0 * np.exp(np.cumsum(z2, axis=1, out=z2), out=z2)
+    return price, hashrate
+
+
+def _simulate_chunk(args) -> np.ndarray:
+    """Worker: (btc_per_year, revenue_btc) per path for one chunk; shape (2, n)."""
+    params, price0, hashrate0, miner_th_s, network_btc_per_day, n, steps, horizon_years, seed = args
+    rng = np.random.default_rng(seed)
+    dt = horizon_years / steps
+    price, hashrate = simulate_paths(params, price0, hashrate0, n, steps, dt, rng)
+    # BTC mined in each step: share of network hashrate × block rewards paid in the step
+    btc_per_step = hashrate
+    np.reciprocal(btc_per_step, out=btc_per_step)
+    btc_per_step *= (miner_th_s / 1_000_000) * network_btc_per_day * DAYS_PER_YEAR * dt * (1 - POOL_FEE_PCT)
+    btc = btc_per_step.sum(axis=1) / horizon_years
+    revenue = np.einsum("ij,ij->i", btc_per_step, price) / horizon_years
+    return np.vstack([btc, revenue])
+
+
+@dataclass
+class MonteCarloResult:
+    """Per-path annualised outcomes of a run."""
+    btc_per_year: np.ndarray
+    revenue_btc: np.ndarray
+    net_revenue: np.ndarray
+    net_per_mwh: np.ndarray
+    payback_months: np.ndarray
+    params: GbmParams
+
+    def percentiles(self, qs: Sequence[float] = (10, 50, 90)) -> pd.DataFrame:
+        """P10/P50/P90 (by default) of each outcome; one row per metric."""
+        cols = {
+            "btc_per_year": self.btc_per_year,
+            "revenue_btc": self.revenue_btc,
+            "net_revenue": self.net_revenue,
+            "net_per_mwh": self.net_per_mwh,
+            "payback_months": self.payback_months,
+        }
+        return pd.DataFrame(
+            {f"P{q:g}": [np.percentile(v, q, method="nearest") for v in cols.values()] for q in qs},
+            index=list(cols),
+        )
+
+
+@metrics.timed("monte_carlo")
+def run_monte_carlo(chp_mw, load_factor, roc_rtfo, eii, miner_model, mining_mw,
+                    snapshot: Optional[MarketSnapshot] = None, params: Optional[GbmParams] = None,
+                    n_paths: int = 20_000, horizon_years: float = 1.0, seed: Optional[int] = None,
+                    processes: Optional[int] = None, miner_spec: Optional[dict] = None,
+                    reward_source: str = REWARD_SOURCE) -> MonteCarloResult:
+    """
+    Simulate `n_paths` price/hashrate paths over `horizon_years` (daily steps) for one
+    site scenario. Costs, grid savings, mining MWh and the reward paid to the network
+    per day (`reward_source`, as in calculate()) are fixed; only BTC revenue varies by
+    path. `processes=None` uses a process pool automatically above
+    MC_PARALLEL_THRESHOLD paths; pass 1 to stay in-process.
+    """
+    snapshot = snapshot or get_market_snapshot()
+    params = params or fit_params(snapshot)
+    scenario = {"chp_mw": chp_mw, "load_factor": load_factor, "roc_rtfo": roc_rtfo,
+                "eii": eii, "mining_mw": mining_mw}
+    if miner_spec is not None:
+        scenario.update(j_th=miner_spec["j_th"], cost_per_mw_gbp=miner_spec["cost_per_mw_gbp"])
+    else:
+        scenario["miner_model"] = miner_model
+    network_btc_per_day = sum(_network_reward(snapshot.market, reward_source))
+    scenario["network_btc_per_day"] = network_btc_per_day
+    base = {k: v[0].item() for k, v in _calculate_arrays(scenario, snapshot.market).items()}
+
+    steps = max(1, int(round(365 * horizon_years)))
+    sizes = [MC_CHUNK_PATHS] * (n_paths // MC_CHUNK_PATHS)
+    if n_paths % MC_CHUNK_PATHS:
+        sizes.append(n_paths % MC_CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(params, float(base["btc_price"]), float(base["hashrate"]), base["miner_th_s"],
+             network_btc_per_day, n, steps, horizon_years, s) for n, s in zip(sizes, seeds)]
+
+    if processes is None:
+        processes = (os.cpu_count() or 1) if n_paths >= MC_PARALLEL_THRESHOLD else 1
+    if processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+            parts = list(pool.map(_simulate_chunk, jobs))
+    else:
+        parts = [_simulate_chunk(j) for j in jobs]
+    btc, revenue = np.hstack(parts)
+
+    costs = base["capex_annuity"] + base["opex_annual"]
+    net = revenue + base["grid_savings"] - costs
+    mwh = base["actual_mining_mwh"]
+    gross = revenue + base["grid_savings"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        net_per_mwh = net / mwh if mwh > 0 else np.zeros_like(net)
+        payback_months = np.where(gross > 0, costs / gross, np.inf) * 12
+    return MonteCarloResult(btc, revenue, net, net_per_mwh, payback_months, params)
@@ -0,0 +1,182 @@
+# portfolio.py
+"""
+Portfolio mode: screen a whole pipeline of AD sites in one run.
+
+Reads a sites file (CSV or Parquet; columns chp_mw, load_factor, roc_rtfo, eii,
+mining_mw and optionally site_id), evaluates every site against every candidate miner
+(today's catalog, or MINER_SPECS) under one shared market snapshot, and writes each
+site's best miner and its calculate() outputs, with BTC paid per `reward_source` as in
+calculate() (resolved once, like the market, so every site sees the same reward). Sites are read, evaluated and written
+in chunks of PORTFOLIO_CHUNK_SITES, spread over a process pool with a bounded number
+of chunks in flight, so neither input nor output has to fit in memory.
+
+    python portfolio.py sites.csv -o results.parquet [--miners specs] [--processes 4] \
+        [--reward-source blocks]
+"""
+from __future__ import annotations
+import argparse, os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from calculator import _calculate_arrays, _with_reward_source
+from constants import MINER_SPECS, PORTFOLIO_CHUNK_SITES, REWARD_SOURCE
+from market_data import get_market_snapshot
+
+SITE_COLUMNS = ["chp_mw", "load_factor", "roc_rtfo", "eii", "mining_mw"]
+
+# Per-process state, set once by _init() rather than pickled with every chunk.
+_MODELS: dict = {}
+_MARKET: tuple = ()
+_REWARD: dict = {}
+
+
+def candidate_models(source: str = "catalog") -> dict:
+    """
+    Arrays of id, name, j_th and cost_per_mw_gbp for the miners each site is tried with.
+    Catalog models are costed per row where the catalog has prices (see rank_catalog);
+    minerstat has none, so with "catalog" every model costs the baseline per MW and the
+    best miner at a site is simply the most efficient one. "specs" uses each
+    MINER_SPECS entry's own cost.
+    """
+    if source == "specs":
+        names = list(MINER_SPECS)
+        return {"id": np.array(names, dtype=object), "name": np.array(names, dtype=object),
+                "j_th": np.array([MINER_SPECS[m]["j_th"] for m in names], dtype=float),
+                "cost_per_mw_gbp": np.array([MINER_SPECS[m]["cost_per_mw_gbp"] for m in names], dtype=float)}
+    from asics_data import _catalog_cost_per_mw, load_today_df
+    df = load_today_df()
+    df = df[df["efficiency_J_per_TH"] > 0]
+    return {"id": df["id"].to_numpy(dtype=object), "name": df["name"].to_numpy(dtype=object),
+            "j_th": df["efficiency_J_per_TH"].to_numpy(dtype=float),
+            "cost_per_mw_gbp": _catalog_cost_per_mw(df)}
+
+
+def _init(models: dict, market: tuple, reward: dict) -> None:
+    global _MODELS, _MARKET, _REWARD
+    _MODELS, _MARKET, _REWARD = models, market, reward
+
+
+def _evaluate_chunk(sites: pd.DataFrame) -> pd.DataFrame:
+    """All sites × all models in one vectorized pass; keep each site's best model."""
+    s, m = len(sites), len(_MODELS["j_th"])
+    scenarios = {**_REWARD, **{c: np.repeat(sites[c].to_numpy(), m) for c in SITE_COLUMNS}}
+    scenarios["j_th"] = np.tile(_MODELS["j_th"], s)
+    scenarios["cost_per_mw_gbp"] = np.tile(_MODELS["cost_per_mw_gbp"], s)
+    out = _calculate_arrays(scenarios, _MARKET)
+    net = np.nan_to_num(out["net_revenue"].reshape(s, m), nan=-np.inf)
+    best = net.argmax(axis=1)
+    pick = np.arange(s) * m + best
+    return sites.reset_index(drop=True).assign(
+        best_id=_MODELS["id"][best], best_name=_MODELS["name"][best],
+        **{k: v[pick] for k, v in out.items()},
+    )
+
+
+def read_sites(source: Union[str, Path, pd.DataFrame],
+               chunk_sites: int = PORTFOLIO_CHUNK_SITES) -> Iterator[pd.DataFrame]:
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_sites):
+            yield source.iloc[start:start + chunk_sites]
+        return
+    if str(source).lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_sites):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_sites)
+
+
+def _evaluate_chunks(chunks: Iterable[pd.DataFrame], models: dict, market: tuple, reward: dict,
+                     processes: int) -> Iterator[pd.DataFrame]:
+    """Results in input order, with at most 2 × processes chunks in flight."""
+    if processes <= 1:
+        _init(models, market, reward)
+        yield from map(_evaluate_chunk, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init,
+                             initargs=(models, market, reward)) as pool:
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_evaluate_chunk, chunk))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _Sink:
+    """Append chunks to a Parquet or CSV file as they arrive."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.parquet = self.path.suffix.lower() == ".parquet"
+        self._writer = None
+        self._header = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def evaluate_portfolio(sites: Union[str, Path, pd.DataFrame], out: Optional[Union[str, Path]] = None,
+                       miners: str = "catalog", market=None, processes: Optional[int] = None,
+                       chunk_sites: int = PORTFOLIO_CHUNK_SITES, reward_source: str = REWARD_SOURCE):
+    """
+    Evaluate every site against every candidate miner. With `out` the results stream to
+    that .parquet/.csv file and the number of sites written is returned; without it the
+    results come back as one DataFrame. `processes=None` uses every CPU.
+    """
+    market = tuple(market or get_market_snapshot().market)
+    models = candidate_models(miners)
+    reward = _with_reward_source({}, reward_source, market)   # network_btc_per_day for "blocks"
+    if processes is None:
+        processes = os.cpu_count() or 1
+    results = _evaluate_chunks(read_sites(sites, chunk_sites), models, market, reward, processes)
+    if out is None:
+        parts = list(results)
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    sink, written = _Sink(out), 0
+    try:
+        for part in results:
+            sink.write(part)
+            written += len(part)
+    finally:
+        sink.close()
+    return written
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Evaluate a portfolio of AD sites.")
+    ap.add_argument("sites", help="CSV or Parquet with " + ", ".join(SITE_COLUMNS))
+    ap.add_argument("-o", "--out", required=True, help="output .parquet or .csv")
+    ap.add_argument("--miners", choices=["catalog", "specs"], default="catalog")
+    ap.add_argument("--processes", type=int, default=None)
+    ap.add_argument("--chunk-sites", type=int, default=PORTFOLIO_CHUNK_SITES)
+    ap.add_argument("--reward-source", choices=["subsidy", "blocks"], default=REWARD_SOURCE)
+    args = ap.parse_args(argv)
+    n = evaluate_portfolio(args.sites, args.out, args.miners, processes=args.processes,
+                           chunk_sites=args.chunk_sites, reward_source=args.reward_source)
+    print(f"{n} sites → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# projection.py
+"""
+Multi-year, day-stepped cash-flow projection.
+
+Where calculate() is a steady-state year one, project() steps daily over a 5–10 year
+horizon: the block subsidy halves on the (estimated) halving dates, network hashrate
+follows a growth curve, miner output degrades with age and BTC price can drift. Opex,
+grid savings and mining MWh come from the same model as calculate(); capex is paid up
+front. Every array is (miners × days), so projecting the whole catalog is one pass.
+"""
+from __future__ import annotations
+import datetime as dt
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from calculator import _calculate_arrays, _miner_arrays, _network_reward
+from constants import (
+    BLOCK_REWARD, DAYS_PER_YEAR, POOL_FEE_PCT, REWARD_SOURCE,
+    ESTIMATED_HALVING_DATES, PROJECTION_HASHRATE_GROWTH, PROJECTION_MINER_DEGRADATION,
+    PROJECTION_DISCOUNT_RATE,
+)
+from market_data import get_market_snapshot
+import metrics
+
+Growth = Union[float, np.ndarray, Callable[[np.ndarray], np.ndarray]]
+
+
+def subsidy_schedule(dates: np.ndarray, start=None) -> np.ndarray:
+    """
+    Block subsidy (BTC) in force on each date: BLOCK_REWARD at `start` (default: the first
+    date), halving on every ESTIMATED_HALVING_DATES entry after it.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    start = np.datetime64(dates[0] if start is None else start, "D")
+    halvings = np.array(ESTIMATED_HALVING_DATES, dtype="datetime64[D]")
+    future = halvings[halvings > start]
+    return BLOCK_REWARD / 2.0 ** np.searchsorted(future, dates, side="right")
+
+def _curve(growth: Growth, t_years: np.ndarray) -> np.ndarray:
+    """Multiplier on the starting value for each step: annual rate, callable or explicit array."""
+    if np.ndim(growth) == 0 and not callable(growth):
+        return (1.0 + float(growth)) ** t_years
+    curve = np.asarray(growth(t_years) if callable(growth) else growth, dtype=float)
+    if curve.ndim and curve.shape != t_years.shape:
+        raise ValueError(f"growth curve has {curve.shape[0]} values for a {len(t_years)}-day horizon")
+    return curve
+
+def _npv(cash: np.ndarray, t_years: np.ndarray, rate) -> np.ndarray:
+    return (cash * (1.0 + np.asarray(rate, dtype=float)[..., None]) ** -t_years).sum(axis=-1)
+
+def _irr(cash: np.ndarray, t_years: np.ndarray, iters: int = 80) -> np.ndarray:
+    """Vectorized bisection for the annual rate that zeroes NPV (NaN where none in range)."""
+    lo = np.full(cash.shape[0], -0.99)
+    hi = np.full(cash.shape[0], 100.0)
+    f_lo, f_hi = _npv(cash, t_years, lo), _npv(cash, t_years, hi)
+    ok = np.sign(f_lo) != np.sign(f_hi)
+    for _ in range(iters):
+        mid = (lo + hi) / 2
+        f_mid = _npv(cash, t_years, mid)
+        left = np.sign(f_mid) == np.sign(f_lo)
+        lo, f_lo = np.where(left, mid, lo), np.where(left, f_mid, f_lo)
+        hi = np.where(left, hi, mid)
+    return np.where(ok, (lo + hi) / 2, np.nan)
+
+
+@dataclass
+class Projection:
+    """Per-miner daily arrays (shape M × D) and headline metrics (shape M)."""
+    miners: pd.Index
+    dates: np.ndarray
+    btc: np.ndarray
+    cash_flow: np.ndarray           # daily operating cash flow; capex is in cumulative[:, 0]
+    cumulative: np.ndarray
+    capex: np.ndarray
+    npv: np.ndarray
+    irr: np.ndarray
+    payback_date: np.ndarray        # datetime64[D], NaT if never paid back
+
+    def summary(self) -> pd.DataFrame:
+        years = len(self.dates) / DAYS_PER_YEAR
+        return pd.DataFrame({
+            "btc_total": self.btc.sum(axis=1),
+            "btc_per_year": self.btc.sum(axis=1) / years,
+            "capex": self.capex,
+            "cumulative_cash": self.cumulative[:, -1],
+            "npv": self.npv,
+            "irr": self.irr,
+            "payback_date": self.payback_date,
+        }, index=self.miners)
+
+
+@metrics.timed("projection")
+def project(chp_mw, load_factor, roc_rtfo, eii, mining_mw, miners=None, market=None,
+            horizon_years: float = 5.0, start: Optional[dt.date] = None,
+            hashrate_growth: Growth = PROJECTION_HASHRATE_GROWTH,
+            miner_degradation: float = PROJECTION_MINER_DEGRADATION,
+            btc_price_growth: Growth = 0.0,
+            discount_rate: float = PROJECTION_DISCOUNT_RATE,
+            cost_per_mw_gbp: Optional[float] = None,
+            reward_source: str = REWARD_SOURCE) -> Projection:
+    """
+    Project cash flows for one site and one or many miners. `miners` is a MINER_SPECS
+    key, a list of keys, or a DataFrame: the catalog (efficiency_J_per_TH, costed at
+    `cost_per_mw_gbp` or the baseline) or specs with j_th and cost_per_mw_gbp columns;
+    defaults to every MINER_SPECS entry. Growth arguments take an annual rate, a
+    callable of elapsed years, or an explicit per-day multiplier array. With
+    reward_source "blocks" today's observed fees are paid on top of the subsidy, flat
+    in BTC across halvings.
+    """
+    if market is None:
+        market = get_market_snapshot().market
+    index, j_th, cost = _miner_arrays(miners, cost_per_mw_gbp)
+
+    base = _calculate_arrays({
+        "chp_mw": chp_mw, "load_factor": load_factor, "roc_rtfo": roc_rtfo, "eii": eii,
+        "mining_mw": mining_mw, "j_th": j_th, "cost_per_mw_gbp": cost,
+    }, market)
+    btc_price, hashrate = base["btc_price"][0], base["hashrate"][0]
+
+    start = np.datetime64(start or dt.date.today(), "D")
+    n_days = int(round(horizon_years * DAYS_PER_YEAR))
+    dates = start + np.arange(n_days)
+    t_years = np.arange(n_days) / DAYS_PER_YEAR
+
+    # Everything that varies by day only is a (D,) vector; per-miner terms are (M,).
+    network_th_s = hashrate * 1_000_000 * _curve(hashrate_growth, t_years)
+    price = btc_price * _curve(btc_price_growth, t_years)
+    subsidy_per_day, fees_per_day = _network_reward(market, reward_source)
+    network_btc = subsidy_per_day * subsidy_schedule(dates, start) / BLOCK_REWARD + fees_per_day
+    per_th_btc = (network_btc * (1 - POOL_FEE_PCT)
+                  * (1.0 - miner_degradation) ** t_years / network_th_s)
+    btc = base["miner_th_s"][:, None] * per_th_btc[None, :]
+    fixed = (base["grid_savings"] - base["opex_annual"]) / DAYS_PER_YEAR
+    cash_flow = btc * price[None, :] + fixed[:, None]
+
+    capex = mining_mw * cost
+    cumulative = np.cumsum(cash_flow, axis=1) - capex[:, None]
+    paid = cumulative >= 0
+    first = paid.argmax(axis=1)
+    payback_date = np.where(paid.any(axis=1), dates[first], np.datetime64("NaT"))
+
+    # NPV/IRR discount 30-day buckets (at their midpoints) rather than every daily flow.
+    edges = np.arange(0, n_days, 30)
+    monthly = np.add.reduceat(cash_flow, edges, axis=1)
+    t_monthly = (edges + np.minimum(30, n_days - edges) / 2) / DAYS_PER_YEAR
+    cash = np.concatenate([-capex[:, None], monthly], axis=1)
+    t_cash = np.concatenate([[0.0], t_monthly])
+
+    return Projection(
+        miners=index, dates=dates, btc=btc, cash_flow=cash_flow, cumulative=cumulative,
+        capex=capex, npv=_npv(cash, t_cash, np.full(len(j_th), discount_rate)),
+        irr=_irr(cash, t_cash), payback_date=payback_date,
+    )
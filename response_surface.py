@@ -0,0 +1,165 @@
+# response_surface.py
+"""
+Precomputed calculate() results over the sidebar's input lattice.
+
+For one miner spec and one market snapshot every combination of CHP size, load factor,
+ROC/RTFO status, EII status and mining MW the sliders can produce is evaluated once,
+in a single calculate_batch-style pass, and kept as dense NumPy arrays. UI reruns then
+read their result by direct index. Surfaces are built in a background thread whenever
+the (market, miner) key changes; until one is ready, or for off-lattice inputs,
+evaluate() falls back to the exact calculation.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from calculator import _calculate_arrays, _with_reward_source, calculate
+from constants import MINER_SPECS, ROC_RTFO_OPTIONS, EII_OPTIONS, REWARD_SOURCE
+import metrics
+
+# (start, step, count) — must match the sliders in app.py
+CHP_AXIS = (0.1, 0.1, 50)        # 0.1 … 5.0 MW
+LOAD_AXIS = (0.80, 0.01, 19)     # 80 … 98 %
+MINING_AXIS = (0.05, 0.05, 110)  # 0.05 … 5.5 MW (slider max is CHP × 1.1)
+
+_MAX_SURFACES = 4
+
+
+def _axis_values(axis) -> np.ndarray:
+    start, step, count = axis
+    return np.round(start + step * np.arange(count), 10)
+
+def _axis_index(axis, x: float) -> Optional[int]:
+    start, step, count = axis
+    i = int(round((x - start) / step))
+    if 0 <= i < count and abs(start + i * step - x) < 1e-9:
+        return i
+    return None
+
+
+class ResponseSurface:
+    """
+    All calculate() outputs for one (market, j_th, cost_per_mw, network_btc_per_day) key
+    (network_btc_per_day None for the subsidy-only reward). Each field is
+    stored only along the axes it actually varies on (size-1 elsewhere), which keeps a
+    surface to a few tens of MB of float64.
+    """
+
+    def __init__(self, market: Tuple[float, float], j_th: float, cost_per_mw_gbp: float,
+                 network_btc_per_day: Optional[float] = None):
+        grids = np.meshgrid(
+            _axis_values(CHP_AXIS), _axis_values(LOAD_AXIS),
+            np.arange(len(ROC_RTFO_OPTIONS)), np.arange(len(EII_OPTIONS)),
+            _axis_values(MINING_AXIS), indexing="ij",
+        )
+        self.shape = grids[0].shape
+        chp, lf, roc, eii, mw = (g.ravel() for g in grids)
+        scenarios = {
+            "chp_mw": chp,
+            "load_factor": lf,
+            "roc_rtfo": np.asarray(ROC_RTFO_OPTIONS, dtype=object)[roc],
+            "eii": np.asarray(EII_OPTIONS, dtype=object)[eii],
+            "mining_mw": mw,
+            "j_th": j_th,
+            "cost_per_mw_gbp": cost_per_mw_gbp,
+        }
+        if network_btc_per_day is not None:
+            scenarios["network_btc_per_day"] = network_btc_per_day
+        out = _calculate_arrays(scenarios, market)
+        self.fields: Dict[str, np.ndarray] = {}
+        self.integer_fields = {k for k, v in out.items() if np.issubdtype(v.dtype, np.integer)}
+        for name, flat in out.items():
+            arr = flat.reshape(self.shape)
+            for axis in range(arr.ndim):
+                first = arr.take([0], axis=axis)
+                if np.array_equal(arr, np.broadcast_to(first, arr.shape)):
+                    arr = first
+            self.fields[name] = np.ascontiguousarray(arr)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.fields.values())
+
+    def index(self, chp_mw, load_factor, roc_rtfo, eii, mining_mw) -> Optional[Tuple[int, ...]]:
+        if roc_rtfo not in ROC_RTFO_OPTIONS or eii not in EII_OPTIONS:
+            return None
+        idx = (_axis_index(CHP_AXIS, chp_mw), _axis_index(LOAD_AXIS, load_factor),
+               ROC_RTFO_OPTIONS.index(roc_rtfo), EII_OPTIONS.index(eii),
+               _axis_index(MINING_AXIS, mining_mw))
+        return None if None in idx else idx
+
+    def lookup(self, idx: Tuple[int, ...]) -> dict:
+        out = {}
+        for name, arr in self.fields.items():
+            v = arr[tuple(i if n > 1 else 0 for i, n in zip(idx, arr.shape))]
+            out[name] = int(v) if name in self.integer_fields else float(v)
+        return out
+
+
+class SurfaceCache:
+    """LRU of built surfaces plus single-flight background builds."""
+
+    def __init__(self, max_surfaces: int = _MAX_SURFACES):
+        self.max_surfaces = max_surfaces
+        self._lock = threading.Lock()
+        self._surfaces: "OrderedDict[tuple, ResponseSurface]" = OrderedDict()
+        self._building: set = set()
+
+    def _build(self, key: tuple) -> None:
+        try:
+            surface = ResponseSurface(*key)
+            with self._lock:
+                self._surfaces[key] = surface
+                while len(self._surfaces) > self.max_surfaces:
+                    self._surfaces.popitem(last=False)
+        finally:
+            with self._lock:
+                self._building.discard(key)
+
+    def get(self, key: tuple, wait: bool = False) -> Optional[ResponseSurface]:
+        """The surface for key, or None while it is (re)built in the background."""
+        with self._lock:
+            surface = self._surfaces.get(key)
+            if surface is not None:
+                self._surfaces.move_to_end(key)
+                metrics.inc("surface_cache", result="hit")
+                return surface
+            metrics.inc("surface_cache", result="miss")
+            start = key not in self._building
+            if start:
+                self._building.add(key)
+        if wait:
+            if start:
+                self._build(key)
+            return self._surfaces.get(key)
+        if start:
+            threading.Thread(target=self._build, args=(key,), name="surface-build", daemon=True).start()
+        return None
+
+
+_CACHE = SurfaceCache()
+
+def surface_key(miner_model: Optional[str], market: Tuple[float, float],
+                miner_spec: Optional[dict] = None, reward_source: str = REWARD_SOURCE) -> tuple:
+    spec = miner_spec if miner_spec is not None else MINER_SPECS[miner_model]
+    reward = _with_reward_source({}, reward_source, market).get("network_btc_per_day")
+    return (tuple(market), float(spec["j_th"]), float(spec["cost_per_mw_gbp"]), reward)
+
+@metrics.timed("evaluate")
+def evaluate(chp_mw, load_factor, roc_rtfo, eii, miner_model, mining_mw, market, miner_spec=None,
+             reward_source: str = REWARD_SOURCE):
+    """
+    Drop-in for calculate(..., market=market, miner_spec=miner_spec, reward_source=...):
+    served from the precomputed surface when it is ready and the inputs sit on the
+    lattice, computed exactly otherwise.
+    """
+    surface = _CACHE.get(surface_key(miner_model, market, miner_spec, reward_source))
+    if surface is not None:
+        idx = surface.index(chp_mw, load_factor, roc_rtfo, eii, mining_mw)
+        if idx is not None:
+            return surface.lookup(idx)
+    return calculate(chp_mw, load_factor, roc_rtfo, eii, miner_model, mining_mw, market=market,
+                     miner_spec=miner_spec, reward_source=reward_source)
@@ -0,0 +1,113 @@
+# startup.py
+"""
+Fast cold start: a compact catalog + market snapshot shipped with the app.
+
+On a cold container the store under data/ is empty or stale, and bringing it up to date
+means replaying the bundled CSVs and a minerstat download of up to a minute. With
+FAST_START the first catalog and market reads are served from this snapshot instead,
+while refresh_async() updates the store in a background thread; the catalog switches
+over (and its version changes) once that finishes.
+
+    python startup.py [--out data/startup_snapshot.json]   # rebuild from live data
+"""
+from __future__ import annotations
+import argparse, json, os, threading, time, traceback
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+from constants import STARTUP_SNAPSHOT, STARTUP_REFRESH_RETRY
+import metrics
+
+CATALOG_COLUMNS = ("id", "name", "brand", "url", "hashrate_THs", "power_W",
+                   "efficiency_J_per_TH", "retrieved_at")
+
+_lock = threading.Lock()
+_parsed: dict = {}                 # path -> (mtime_ns, payload)
+_thread: Optional[threading.Thread] = None
+_last_attempt = 0.0
+
+
+def read(path=STARTUP_SNAPSHOT) -> Optional[dict]:
+    """The parsed snapshot ({"built_at", "catalog": {column: [...]}, "market"}), or None."""
+    path = Path(path)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _parsed.get(path)
+    if cached is None or cached[0] != mtime:
+        try:
+            cached = (mtime, json.loads(path.read_text()))
+        except ValueError:
+            return None
+        _parsed[path] = cached
+    return cached[1]
+
+
+def _refresh() -> None:
+    from asics_data import ensure_today_snapshot, get_catalog
+    try:
+        with metrics.span("startup_refresh"):
+            ensure_today_snapshot()
+    except Exception:
+        traceback.print_exc()
+    get_catalog().invalidate()   # next read picks up the store
+
+def refresh_async() -> bool:
+    """
+    Bring the catalog store up to date in a daemon thread: single-flight, and retried
+    at most every STARTUP_REFRESH_RETRY seconds. Returns True while a refresh is running.
+    """
+    global _thread, _last_attempt
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return True
+        if time.time() - _last_attempt < STARTUP_REFRESH_RETRY:
+            return False
+        _last_attempt = time.time()
+        _thread = threading.Thread(target=_refresh, name="startup-refresh", daemon=True)
+        _thread.start()
+        return True
+
+def wait(timeout: Optional[float] = None) -> bool:
+    """Block until the background refresh (if any) is done; False on timeout."""
+    thread = _thread
+    if thread is not None:
+        thread.join(timeout)
+    return thread is None or not thread.is_alive()
+
+
+def build(path=STARTUP_SNAPSHOT) -> Path:
+    """Write the snapshot from the store and market cache, updating both first."""
+    from asics_data import _read_source, ensure_today_snapshot
+    from market_data import _CACHE
+    df = _read_source(ensure_today_snapshot())
+    market = _CACHE.refresh()
+    catalog = {}
+    for c in CATALOG_COLUMNS:
+        if c in df.columns:
+            col = df[c].astype(str) if c == "retrieved_at" else df[c].astype(object)
+            catalog[c] = col.where(df[c].notna(), None).tolist()
+    payload = {"built_at": time.time(), "catalog": catalog,
+               "market": asdict(market) if market.fetched_at else None}
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, separators=(",", ":")))
+    os.replace(tmp, path)
+    return path
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Rebuild the fast-start snapshot")
+    ap.add_argument("--out", type=Path, default=Path(STARTUP_SNAPSHOT))
+    args = ap.parse_args(argv)
+    path = build(args.out)
+    snap = read(path)
+    print(f"wrote {path}: {len(snap['catalog'].get('id', []))} models, "
+          f"market {'included' if snap['market'] else 'not available'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# tests/test_api.py
+import json
+
+import pytest
+from tornado.testing import AsyncHTTPTestCase
+
+import api
+from calculator import calculate
+from constants import EII_OPTIONS, MINER_SPECS, ROC_RTFO_OPTIONS
+from market_data import MarketSnapshot
+
+SNAP = MarketSnapshot(btc_price=90_000, hashrate=1_000, fetched_at=0.0, source="fallback")
+MODEL = list(MINER_SPECS)[0]
+BODY = {"chp_mw": 1.0, "load_factor": 0.95, "roc_rtfo": ROC_RTFO_OPTIONS[0], "eii": EII_OPTIONS[1],
+        "mining_mw": 0.5, "miner_model": MODEL, "reward_source": "subsidy"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(api, "RESULTS", api.ResultCache(maxsize=16))
+    monkeypatch.setattr(api, "get_market_snapshot", lambda: SNAP)
+
+
+def test_results_match_calculate_and_repeat_from_the_lru():
+    first = api.evaluate_many([BODY], SNAP.market)[0]
+    want = calculate(1.0, 0.95, ROC_RTFO_OPTIONS[0], EII_OPTIONS[1], MODEL, 0.5, market=SNAP.market,
+                     reward_source="subsidy")
+    assert first["net_revenue"] == pytest.approx(want["net_revenue"], rel=1e-12)
+    assert api.RESULTS.stats()["misses"] == 1
+    assert api.evaluate_many([BODY, {**BODY, "chp_mw": 1}], SNAP.market) == [first, first]
+    assert api.RESULTS.stats()["hits"] == 2                 # 1 and 1.0 normalise to one key
+
+
+def test_a_new_market_is_a_new_key():
+    api.evaluate_many([BODY], SNAP.market)
+    api.evaluate_many([BODY], (95_000, 1_000))
+    assert api.RESULTS.stats() == {"size": 2, "maxsize": 16, "hits": 0, "misses": 2}
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"roc_rtfo": "None"}, "roc_rtfo must be one of"),
+    ({"eii": 1}, "eii must be one of"),
+    ({"chp_mw": "big"}, "chp_mw must be a number"),
+    ({"load_factor": float("nan")}, "load_factor must be finite"),
+    ({"miner_model": "nope"}, "unknown miner_model"),
+    ({"reward_source": "fees"}, "unknown reward_source"),
+])
+def test_bad_scenarios_are_rejected(change, message):
+    with pytest.raises(api.BadRequest, match=message):
+        api.scenario_key({**BODY, **change})
+
+
+def test_missing_miner_and_field():
+    body = {k: v for k, v in BODY.items() if k not in ("miner_model", "mining_mw")}
+    with pytest.raises(api.BadRequest, match="missing field: mining_mw"):
+        api.scenario_key(body)
+    with pytest.raises(api.BadRequest, match="need miner_model"):
+        api.scenario_key({**body, "mining_mw": 0.5})
+
+
+class TestHandlers(AsyncHTTPTestCase):
+    def get_app(self):
+        return api.make_app()
+
+    def setUp(self):
+        super().setUp()
+        self._patch = pytest.MonkeyPatch()
+        self._patch.setattr(api, "RESULTS", api.ResultCache(maxsize=16))
+        self._patch.setattr(api, "get_market_snapshot", lambda: SNAP)
+
+    def tearDown(self):
+        self._patch.undo()
+        super().tearDown()
+
+    def _post(self, path, body):
+        resp = self.fetch(path, method="POST", body=body if isinstance(body, str) else json.dumps(body))
+        return resp.code, json.loads(resp.body)
+
+    def test_calculate(self):
+        code, out = self._post("/calculate", BODY)
+        assert code == 200 and out["market"]["btc_price"] == SNAP.btc_price
+        assert out["result"]["net_revenue"] > 0
+
+    def test_400s(self):
+        for path, body, message in [
+            ("/calculate", "{not json", "body is not valid JSON"),
+            ("/calculate", [BODY], "scenario must be a JSON object"),
+            ("/calculate", {**BODY, "eii": "Maybe"}, "eii must be one of"),
+            ("/batch", {"scenarios": BODY}, "scenarios must be a list"),
+            ("/batch", {"scenarios": [BODY] * (api.API_MAX_BATCH + 1)}, "at most"),
+            ("/batch", {"scenarios": [BODY, {**BODY, "roc_rtfo": "ROC"}]}, "roc_rtfo must be one of"),
+        ]:
+            code, out = self._post(path, body)
+            assert code == 400, (path, body)
+            assert out["error"].startswith(message), out
+
+    def test_batch_hits_the_lru(self):
+        code, out = self._post("/batch", {"scenarios": [BODY, {**BODY, "mining_mw": 0.75}]})
+        assert code == 200 and len(out["results"]) == 2
+        self._post("/batch", {"scenarios": [BODY]})
+        health = json.loads(self.fetch("/health").body)
+        assert health["cache"]["hits"] == 1 and health["cache"]["misses"] == 2
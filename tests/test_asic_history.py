@@ -0,0 +1,66 @@
+# tests/test_asic_history.py
+import pandas as pd
+import pytest
+
+from asic_history import AsicHistory
+
+NOW = pd.Timestamp.now(tz="UTC").floor("s")
+
+
+def _snapshot(**models):
+    """{id: hashrate} -> a minerstat-shaped snapshot."""
+    return pd.DataFrame({"id": list(models), "name": [m.upper() for m in models], "brand": "Bitmain",
+                         "hashrate_THs": list(models.values()), "power_W": 3000.0,
+                         "efficiency_J_per_TH": [3000.0 / v for v in models.values()]})
+
+
+def _ago(days):
+    return NOW - pd.Timedelta(days=days)
+
+
+@pytest.fixture
+def history(tmp_path):
+    h = AsicHistory(tmp_path / "history")
+    h.append(_snapshot(a=100.0, b=200.0, c=300.0), retrieved_at=_ago(400))
+    h.append(_snapshot(a=110.0, b=200.0), retrieved_at=_ago(300))    # a changed, c removed
+    h.append(_snapshot(a=110.0, b=200.0, d=400.0), retrieved_at=_ago(10))
+    return h
+
+
+def _ids(df):
+    return sorted(df["id"])
+
+
+def test_append_writes_only_changes_and_tombstones(tmp_path):
+    h = AsicHistory(tmp_path / "history")
+    assert h.append(_snapshot(a=100.0, b=200.0), retrieved_at=_ago(2)) == 2
+    assert h.append(_snapshot(a=100.0, b=200.0), retrieved_at=_ago(1)) == 0
+    assert h.append(_snapshot(a=150.0), retrieved_at=NOW) == 2          # a changed + b tombstone
+
+
+def test_as_of_reconstructs_each_snapshot(history):
+    assert _ids(history.as_of(_ago(350))) == ["a", "b", "c"]
+    assert _ids(history.as_of(_ago(200))) == ["a", "b"]
+    assert _ids(history.as_of()) == ["a", "b", "d"]
+    assert history.as_of(_ago(350)).set_index("id").loc["a", "hashrate_THs"] == 100.0
+    assert history.as_of().set_index("id").loc["a", "hashrate_THs"] == 110.0
+    assert history.as_of(_ago(500)).empty
+
+
+def test_compact_keeps_recent_history_and_the_state_at_the_cutoff(history):
+    recent = [history.as_of(_ago(d)) for d in (0, 5)]
+    at_cutoff = history.as_of(_ago(180))
+    rows = len(history.read())
+    history.compact(retain_days=180)
+    assert len(history.read()) < rows                                   # superseded + tombstones gone
+    for d, before in zip((0, 5), recent):
+        pd.testing.assert_frame_equal(history.as_of(_ago(d)), before)
+    pd.testing.assert_frame_equal(history.as_of(_ago(180)), at_cutoff)
+
+
+def test_compact_is_idempotent_and_keeps_last_ingest(history):
+    history.compact(retain_days=180)
+    files, last = history._files(), history.last_ingest()
+    history.compact(retain_days=180)
+    assert history._files() == files
+    assert history.last_ingest() == last
@@ -0,0 +1,57 @@
+# tests/test_asics_data.py
+import json
+
+import pandas as pd
+import pytest
+
+from asics_data import _catalog_cost_per_mw, _iter_json_array, rank_catalog
+from calculator import _baseline_cost_per_mw
+
+ITEMS = [{"id": "a", "name": "Antminer S21 «Hyd»", "hashrate": 335.0}, 12, "x, ]", None,
+         {"nested": [1, 2, {"k": "v"}]}, 3.5e-3, True]
+
+
+def _split(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+def test_chunk_split_input_decodes_every_element(size):
+    data = json.dumps(ITEMS, ensure_ascii=False, indent=1).encode("utf-8")
+    assert list(_iter_json_array(_split(data, size))) == ITEMS
+
+
+def test_number_split_across_chunks_is_not_truncated():
+    assert list(_iter_json_array([b"[12", b"34, 5", b"6]"])) == [1234, 56]
+
+
+def test_empty_array():
+    assert list(_iter_json_array([b" [ ", b" ] "])) == []
+
+
+@pytest.mark.parametrize("data", [b'{"a": 1}', b"[1, 2", b"[1 2]"])
+def test_malformed_input_raises(data):
+    with pytest.raises(ValueError):
+        list(_iter_json_array(_split(data, 2)))
+
+
+CATALOG = pd.DataFrame({"id": ["a", "b", "c"], "name": ["A", "B", "C"], "brand": "Bitmain",
+                        "hashrate_THs": [200.0, 100.0, 300.0], "power_W": [3000.0, 2000.0, 3000.0],
+                        "efficiency_J_per_TH": [15.0, 20.0, 10.0]})
+SITE = {"chp_mw": 1.0, "load_factor": 0.95, "roc_rtfo": "None", "eii": "No", "mining_mw": 0.5}
+
+
+def test_catalog_cost_prefers_unit_prices_and_fills_gaps():
+    base = _baseline_cost_per_mw()
+    assert list(_catalog_cost_per_mw(CATALOG)) == [base] * 3
+    priced = CATALOG.assign(price_gbp=[3000.0, None, 0.0])
+    assert list(_catalog_cost_per_mw(priced, 5.0)) == [1e6, 5.0, 5.0]
+    assert list(_catalog_cost_per_mw(CATALOG.assign(cost_per_mw_gbp=[1.0, 2.0, None]))) == [1.0, 2.0, base]
+
+
+def test_flat_costed_ranking_is_by_efficiency():
+    ranked = rank_catalog(CATALOG, market=(90_000.0, 1_000.0), reward_source="subsidy", **SITE)
+    assert list(ranked["id"]) == ["c", "a", "b"]
+    priced = rank_catalog(CATALOG.assign(price_gbp=[1.0, 1.0, 1e9]), market=(90_000.0, 1_000.0),
+                          reward_source="subsidy", **SITE)
+    assert list(priced["id"]) == ["a", "b", "c"]          # per-model capex now moves the ranking
@@ -0,0 +1,63 @@
+# tests/test_backtest.py
+import numpy as np
+import pytest
+
+from backtest import backtest, historical_subsidy
+from calculator import calculate
+from constants import DAYS_PER_YEAR, EII_OPTIONS, MINER_SPECS, ROC_RTFO_OPTIONS
+from market_history import MarketHistory
+
+DAY = 86_400
+SITE = (1.0, 0.95, ROC_RTFO_OPTIONS[0], EII_OPTIONS[1], 0.5)
+MODEL = list(MINER_SPECS)[0]
+
+
+def _t(date, hour=12):
+    return int(np.datetime64(date, "D").astype("int64")) * DAY + hour * 3600
+
+
+def _history(tmp_path, price, hashrate):
+    h = MarketHistory(tmp_path / "market")
+    h.append("price", price, min_gap=0)
+    h.append("hashrate", hashrate, min_gap=0)
+    return h
+
+
+@pytest.fixture
+def flat(tmp_path):
+    """Ten days at 80,000 GBP/BTC and 800 EH/s, after the 2024 halving."""
+    days = np.arange(np.datetime64("2025-01-01"), np.datetime64("2025-01-11"))
+    return _history(tmp_path, [(_t(d), 80_000.0) for d in days], [(_t(d), 800.0) for d in days])
+
+
+def test_flat_history_is_calculate_pro_rata(flat):
+    bt = backtest(*SITE, miners=[MODEL], history=flat)
+    want = calculate(*SITE[:4], MODEL, SITE[4], market=(80_000.0, 800.0), reward_source="subsidy")
+    row = bt.summary().iloc[0]
+    assert row["days"] == 10 and bt.coverage == 1.0
+    for ours, theirs in [("btc", "total_btc"), ("revenue_btc", "revenue_btc"), ("net_revenue", "net_revenue")]:
+        assert row[ours] == pytest.approx(want[theirs] * 10 / DAYS_PER_YEAR, rel=1e-9), ours
+
+
+def test_window_is_clipped_and_checked(flat):
+    bt = backtest(*SITE, miners=[MODEL], start="2024-06-01", end="2025-01-03", history=flat)
+    assert str(bt.dates[0]) == "2025-01-01" and len(bt.dates) == 3
+    with pytest.raises(ValueError, match="no recorded market data"):
+        backtest(*SITE, miners=[MODEL], start="2026-01-01", history=flat)
+    with pytest.raises(ValueError, match="no recorded market history"):
+        backtest(*SITE, miners=[MODEL], history=MarketHistory(flat.root / "empty"))
+
+
+def test_halving_and_gaps(tmp_path):
+    # 2024-04-18 .. 04-22 across the 2024-04-20 halving; no records at all on the 21st
+    days = ["2024-04-18", "2024-04-19", "2024-04-20", "2024-04-22"]
+    price = [(_t(d, 1), 1.0) for d in days] + [(_t(d, 23), 50_000.0) for d in days]   # closes
+    hashrate = [(_t(d, 1), 500.0) for d in days] + [(_t(d, 23), 700.0) for d in days]   # mean 600
+    h = _history(tmp_path, sorted(price), sorted(hashrate))
+    bt = backtest(*SITE, miners=[MODEL], history=h)
+    assert len(bt.dates) == 5
+    assert list(bt.observed) == [True, True, True, False, True]
+    assert list(bt.btc_price) == [50_000.0] * 5 and list(bt.hashrate) == [600.0] * 5
+    btc = bt.btc[0]
+    assert btc[2] / btc[1] == pytest.approx(0.5) and btc[3] == btc[4] == btc[2]
+    assert list(historical_subsidy(bt.dates)) == [6.25, 6.25, 3.125, 3.125, 3.125]
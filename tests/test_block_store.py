@@ -0,0 +1,134 @@
+# tests/test_block_store.py
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import block_store
+from block_store import BLOCK, BlockStore, from_mempool
+
+FIXTURE = Path(__file__).resolve().parent.parent / "data" / "fixtures" / "mempool_blocks.json"
+RAW = sorted(json.loads(FIXTURE.read_text()), key=lambda b: b["height"])
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = BlockStore(tmp_path / "blocks.bin")
+    assert s.load_fixture(FIXTURE) == len(RAW)
+    return s
+
+
+def _brute(rec, window):
+    """(height, btc_per_th_day, fee_share) per window, one window at a time."""
+    out = []
+    for end in range(window, len(rec) + 1):
+        w = rec[end - window:end]
+        if w["height"][-1] - w["height"][0] != window - 1:
+            continue
+        reward = (w["subsidy"] + w["fees"]).sum() / 1e8
+        work = (w["difficulty"] * 2 ** 32 / 1e12).sum()
+        out.append((w["height"][-1], reward / work * 86_400, w["fees"].sum() / 1e8 / reward))
+    return np.array(out)
+
+
+def test_fixture_round_trips(store):
+    rec = store.read()
+    assert len(store) == len(RAW)
+    assert (np.diff(rec["height"]) == 1).all()
+    assert rec["fees"][-1] == RAW[-1]["extras"]["totalFees"]
+    assert rec["subsidy"][-1] + rec["fees"][-1] == RAW[-1]["extras"]["reward"]
+    assert store.load_fixture(FIXTURE) == 0                # already stored
+
+
+@pytest.mark.parametrize("window", [2, 144, 1008, len(RAW)])
+def test_rolling_matches_window_by_window_sums(store, window):
+    got = store.rolling(window)
+    want = _brute(store.read(), window)
+    assert len(got) == len(want)
+    np.testing.assert_array_equal(got.index.to_numpy(), want[:, 0])
+    np.testing.assert_allclose(got["btc_per_th_day"], want[:, 1], rtol=1e-9)
+    np.testing.assert_allclose(got["fee_share"], want[:, 2], rtol=1e-9)
+
+
+def test_latest_is_the_last_window(store):
+    row = store.latest(144)
+    assert row.name == RAW[-1]["height"]
+    assert row["btc_per_th_day"] == store.rolling(144)["btc_per_th_day"].iloc[-1]
+    assert store.btc_per_th_day(144) == row["btc_per_th_day"]
+    assert 100 < row["blocks_per_day"] < 200              # about 144 a day, noisy over one day
+
+
+def test_windows_never_cross_a_gap(tmp_path):
+    s = BlockStore(tmp_path / "blocks.bin")
+    s.append(np.concatenate([from_mempool(RAW[:1000]), from_mempool(RAW[1100:])]))
+    rolled = s.rolling(144)
+    assert len(rolled) == len(_brute(s.read(), 144)) == (1000 - 143) + (len(RAW) - 1100 - 143)
+    gap_lo, gap_hi = RAW[999]["height"], RAW[1100]["height"]
+    assert not ((rolled.index > gap_hi - 1) & (rolled.index < gap_hi + 143)).any()
+    assert rolled.index[rolled.index <= gap_lo].max() == gap_lo
+    # the latest window only uses blocks since the gap
+    assert s.latest(len(RAW)).name == RAW[-1]["height"]
+    assert s.latest(len(RAW))["btc_per_th_day"] == s.rolling(len(RAW) - 1100)["btc_per_th_day"].iloc[-1]
+
+
+def test_torn_record_is_ignored_and_overwritten(store):
+    with open(store.path, "ab") as f:
+        f.write(b"\0" * (BLOCK.itemsize // 2))
+    assert len(store) == len(RAW)
+    nxt = {**RAW[-1], "height": RAW[-1]["height"] + 1}
+    assert store.append(from_mempool([nxt])) == 1
+    assert store.path.stat().st_size == (len(RAW) + 1) * BLOCK.itemsize
+    assert store.read()["height"][-1] == nxt["height"]
+
+
+def _serve(monkeypatch, fail_below=None):
+    """Fake mempool.space pages of 15 from the fixture (optionally failing under a height)."""
+    import http_client
+    by_height = {b["height"]: b for b in RAW}
+    tip = RAW[-1]["height"]
+    calls = []
+
+    def get_json(name, path=""):
+        top = int(path.lstrip("/")) if path else tip
+        calls.append(top)
+        if fail_below is not None and top < fail_below:
+            raise OSError("offline")
+        return [by_height[h] for h in range(top, top - 15, -1) if h in by_height]
+
+    monkeypatch.setattr(http_client, "get_json", get_json)
+    return calls
+
+
+def test_fetch_closes_the_whole_gap(tmp_path, monkeypatch):
+    s = BlockStore(tmp_path / "blocks.bin")
+    s.append(from_mempool(RAW[:100]))
+    calls = _serve(monkeypatch)
+    assert s.fetch(max_pages=2) == len(RAW) - 100          # walks past max_pages to the stored tip
+    assert len(calls) > 2
+    assert (np.diff(s.read()["height"]) == 1).all()
+
+
+def test_fetch_into_an_empty_store_stops_at_max_pages(tmp_path, monkeypatch):
+    s = BlockStore(tmp_path / "blocks.bin")
+    _serve(monkeypatch)
+    assert s.fetch(max_pages=3) == 45
+    assert s.read()["height"][-1] == RAW[-1]["height"]
+
+
+def test_failed_walk_appends_nothing(tmp_path, monkeypatch):
+    s = BlockStore(tmp_path / "blocks.bin")
+    s.append(from_mempool(RAW[:100]))
+    _serve(monkeypatch, fail_below=RAW[1000]["height"])
+    with pytest.raises(OSError):
+        s.fetch()
+    assert len(s) == 100
+
+
+def test_record_writes_a_loadable_fixture(tmp_path, monkeypatch):
+    _serve(monkeypatch)
+    path = tmp_path / "rec.json"
+    assert block_store.record(path, max_pages=4) == 60
+    s = BlockStore(tmp_path / "blocks.bin")
+    assert s.load_fixture(path) == 60
+    assert s.read()["height"][-1] == RAW[-1]["height"]
@@ -0,0 +1,67 @@
+# tests/test_breakeven.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from breakeven import bisect, break_even
+from calculator import _calculate_arrays
+from constants import EII_OPTIONS, ROC_RTFO_OPTIONS
+
+MARKET = (90_000.0, 1_000.0)
+SITE = {"chp_mw": 1.0, "load_factor": 0.9, "roc_rtfo": ROC_RTFO_OPTIONS[0], "eii": EII_OPTIONS[1],
+        "mining_mw": 0.8}
+# the last row is so cheap that grid savings alone cover its costs
+CATALOG = pd.DataFrame({"name": ["a", "b", "c", "d"],
+                        "efficiency_J_per_TH": [15.0, 20.0, 30.0, 17.5],
+                        "cost_per_mw_gbp": [3_000_000.0, 2_500_000.0, 2_000_000.0, 1_000.0]})
+
+
+def _net(**override):
+    """net_revenue for every CATALOG row with SITE, one input overridden per row."""
+    scen = {**SITE, "j_th": CATALOG["efficiency_J_per_TH"].to_numpy(),
+            "cost_per_mw_gbp": CATALOG["cost_per_mw_gbp"].to_numpy(), **override}
+    return _calculate_arrays(scen, MARKET)["net_revenue"]
+
+
+@pytest.fixture(scope="module")
+def be():
+    return break_even(**SITE, catalog=CATALOG, market=MARKET, reward_source="subsidy").set_index("name")
+
+
+def test_closed_forms_match_bisection(be):
+    be = be.loc[CATALOG["name"]]
+    n = len(CATALOG)
+    price = bisect(lambda p: _net(btc_price=p), np.zeros(n), np.full(n, 10 * MARKET[0]), iters=60)
+    hashrate = bisect(lambda h: -_net(hashrate=h), np.full(n, 1.0), np.full(n, 1e5), iters=60)
+    rate = bisect(lambda r: _net(grid_save_mwh=r), np.full(n, -1e4), np.full(n, 1e4), iters=60)
+
+    np.testing.assert_allclose(be["breakeven_btc_price"], price, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(be["breakeven_grid_save_mwh"], rate, rtol=1e-6, atol=1e-6)
+    covered = be.index == "d"
+    np.testing.assert_allclose(be["breakeven_hashrate"][~covered], hashrate[~covered], rtol=1e-6)
+    assert be.loc["d", "breakeven_btc_price"] == 0 and np.isinf(be.loc["d", "breakeven_hashrate"])
+
+
+def test_net_is_zero_at_each_break_even(be):
+    be = be.loc[CATALOG["name"]]
+    paying = ~be.index.isin(["d"])
+    for key, col in [("btc_price", "breakeven_btc_price"), ("hashrate", "breakeven_hashrate"),
+                     ("grid_save_mwh", "breakeven_grid_save_mwh")]:
+        net = _net(**{key: be[col].to_numpy()})
+        np.testing.assert_allclose(net[paying], 0.0, atol=1e-3, err_msg=key)
+
+
+def test_load_factor_is_the_lowest_that_pays(be):
+    be = be.loc[CATALOG["name"]]
+    lf = be["breakeven_load_factor"].to_numpy()
+    ok = ~np.isnan(lf)
+    assert ok.any()
+    assert (_net(load_factor=np.where(ok, lf, 1.0))[ok] >= -1e-3).all()
+    assert (_net(load_factor=np.where(ok, lf - 1e-4, 1.0))[ok & (lf > 1e-4)] < 0).all()
+    assert (_net(load_factor=1.0)[~ok] < 0).all()                  # NaN only where nothing pays
+
+
+def test_headroom_is_relative_to_the_market(be):
+    np.testing.assert_allclose(be["price_headroom"], 1 - be["breakeven_btc_price"] / MARKET[0])
+    np.testing.assert_allclose(be["hashrate_headroom"], be["breakeven_hashrate"] / MARKET[1] - 1)
+    assert be["breakeven_btc_price"].is_monotonic_increasing     # most robust first
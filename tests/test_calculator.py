@@ -0,0 +1,43 @@
+# tests/test_calculator.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculator import calculate, calculate_batch
+from constants import MINER_SPECS, ROC_RTFO_OPTIONS, EII_OPTIONS, FALLBACK_BTC_PRICE, FALLBACK_HASHRATE
+
+MARKET = (FALLBACK_BTC_PRICE, FALLBACK_HASHRATE)
+
+
+def _scenarios(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    chp = np.round(rng.uniform(0.1, 5.0, n), 1)
+    return pd.DataFrame({
+        "chp_mw": chp,
+        "load_factor": np.round(rng.uniform(0.80, 0.98, n), 2),
+        "roc_rtfo": rng.choice(ROC_RTFO_OPTIONS, n),
+        "eii": rng.choice(EII_OPTIONS, n),
+        "miner_model": rng.choice(list(MINER_SPECS), n),
+        "mining_mw": np.round(chp * rng.uniform(0.1, 1.1, n), 2),
+    })
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_matches_calculate(seed):
+    scenarios = _scenarios(50, seed)
+    batch = calculate_batch(scenarios, MARKET)
+    expected = pd.DataFrame([calculate(**row, market=MARKET) for row in scenarios.to_dict("records")])
+    assert list(batch.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(batch, expected, check_dtype=False, rtol=1e-12)
+
+
+def test_batch_keeps_the_index():
+    scenarios = _scenarios(10, 0).set_axis(list("abcdefghij"))
+    assert list(calculate_batch(scenarios, MARKET).index) == list("abcdefghij")
+
+
+def test_miner_spec_matches_miner_model():
+    model = next(iter(MINER_SPECS))
+    args = (1.0, 0.95, ROC_RTFO_OPTIONS[0], EII_OPTIONS[0])
+    assert calculate(*args, model, 0.8, market=MARKET) == calculate(*args, None, 0.8, market=MARKET,
+                                                                     miner_spec=MINER_SPECS[model])
@@ -0,0 +1,54 @@
+# tests/test_dispatch.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculator import calculate
+from constants import EII_OPTIONS, HOURS_PER_YEAR, MINER_SPECS, ROC_RTFO_OPTIONS, SETTLEMENT_PERIOD_HOURS
+from dispatch import dispatch_file
+
+MARKET = (90_000.0, 1_000.0)
+MODEL = list(MINER_SPECS)[0]
+
+
+def _flat_year(tmp_path, chp_mw, sites=("site",)):
+    """A year of half-hourly periods at a constant output, for each site."""
+    n = int(HOURS_PER_YEAR / SETTLEMENT_PERIOD_HOURS)
+    path = tmp_path / "meter.csv"
+    pd.DataFrame({"site_id": np.repeat(sites, n), "chp_mw": chp_mw}).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("chp_mw, load_factor, roc_rtfo, eii, mining_mw", [
+    (1.0, 0.95, ROC_RTFO_OPTIONS[0], EII_OPTIONS[0], 0.5),      # miners limited by their MW
+    (1.0, 0.90, ROC_RTFO_OPTIONS[1], EII_OPTIONS[1], 1.2),      # limited by the exportable energy
+    (2.5, 0.80, ROC_RTFO_OPTIONS[2], EII_OPTIONS[1], 2.0),
+])
+def test_flat_profile_reproduces_calculate(tmp_path, chp_mw, load_factor, roc_rtfo, eii, mining_mw):
+    path = _flat_year(tmp_path, chp_mw * load_factor)
+    got = dispatch_file(path, mining_mw, roc_rtfo, eii, miner_model=MODEL, market=MARKET,
+                        reward_source="subsidy", chunksize=5_000).iloc[0]
+    want = calculate(chp_mw, load_factor, roc_rtfo, eii, MODEL, mining_mw, market=MARKET,
+                     reward_source="subsidy")
+    assert got["hours"] == HOURS_PER_YEAR
+    for ours, theirs in [("generation_mwh", "annual_mwh"), ("mining_mwh", "actual_mining_mwh"),
+                         ("btc", "total_btc"), ("revenue_btc", "revenue_btc"),
+                         ("grid_savings", "grid_savings"), ("capex_annuity", "capex_annuity"),
+                         ("opex", "opex_annual"), ("net_revenue", "net_revenue"),
+                         ("net_per_mwh", "net_per_mwh")]:
+        assert got[ours] == pytest.approx(want[theirs], rel=1e-9), ours
+
+
+def test_site_table_overrides_and_missing_settings_fail_fast(tmp_path):
+    path = _flat_year(tmp_path, 0.9, sites=("a", "b"))
+    spec = MINER_SPECS[MODEL]
+    sites = pd.DataFrame({"mining_mw": [0.5, 0.25]}, index=["a", "b"])
+    res = dispatch_file(path, None, ROC_RTFO_OPTIONS[0], EII_OPTIONS[1], miner_model=MODEL, sites=sites,
+                        market=MARKET, reward_source="subsidy")
+    assert list(res["mining_mw"]) == [0.5, 0.25]
+    with pytest.raises(ValueError, match="mining_mw is not set for site\\(s\\) b"):
+        dispatch_file(path, None, ROC_RTFO_OPTIONS[0], EII_OPTIONS[1], miner_model=MODEL, market=MARKET,
+                      sites=sites.assign(mining_mw=[0.5, None]), reward_source="subsidy")
+    with pytest.raises(ValueError, match="j_th is required"):
+        dispatch_file(path, 0.5, ROC_RTFO_OPTIONS[0], EII_OPTIONS[1], cost_per_mw_gbp=spec["cost_per_mw_gbp"],
+                      market=MARKET, reward_source="subsidy")
@@ -0,0 +1,33 @@
+# tests/test_fleet_sim.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from fleet_sim import build_fleet, simulate_fleet
+
+FLEET = build_fleet(pd.DataFrame({"name": ["old", "new"], "hashrate_THs": [100.0, 200.0],
+                                  "power_W": [3000.0, 3500.0], "units": [20, 20]}), spares_pct=0.5)
+EVENTS = [(500.0, 400.0, 0.5), (3000.0, 800.0, 0.3)]
+
+
+def _online_w_at(sim, t):
+    return sim.online_w[np.searchsorted(sim.times, t, side="right") - 1]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_installs_never_exceed_a_curtailment(seed):
+    # frequent failures and slow swaps: installs started before an event finish inside it
+    sim = simulate_fleet(FLEET, hours=5000, failure_rate=20.0, swap_hours=48.0, repair_hours=24.0,
+                         curtailments=EVENTS, seed=seed)
+    for start, length, _ in EVENTS:
+        cap = _online_w_at(sim, start)
+        inside = (sim.times >= start) & (sim.times < start + length)
+        assert inside.sum() > 10
+        assert sim.online_w[inside].max() <= cap * (1 + 1e-9)
+
+
+def test_no_curtailment_no_change():
+    a = simulate_fleet(FLEET, hours=2000, failure_rate=5.0, curtailments=[], seed=1)
+    assert a.curtailments == 0
+    assert a.online_w.max() <= FLEET["units"].to_numpy() @ FLEET["power_W"].to_numpy()
+    assert 0 < a.availability <= 1
@@ -0,0 +1,34 @@
+# tests/test_monte_carlo.py
+import pandas as pd
+
+from constants import MC_CHUNK_PATHS, ROC_RTFO_OPTIONS, EII_OPTIONS, FALLBACK_BTC_PRICE, FALLBACK_HASHRATE
+from market_data import MarketSnapshot
+from monte_carlo import GbmParams, run_monte_carlo
+
+SNAPSHOT = MarketSnapshot(FALLBACK_BTC_PRICE, FALLBACK_HASHRATE, 0.0, "fallback")
+SITE = (1.0, 0.95, ROC_RTFO_OPTIONS[0], EII_OPTIONS[0], None, 0.8)
+SPEC = {"j_th": 17.0, "cost_per_mw_gbp": 1_600_000}
+N_PATHS = 2 * MC_CHUNK_PATHS + 500   # three chunks, so the pool has work to split
+
+
+def _run(**kwargs):
+    return run_monte_carlo(*SITE, snapshot=SNAPSHOT, params=GbmParams(), n_paths=N_PATHS,
+                           miner_spec=SPEC, **kwargs).percentiles()
+
+
+def test_seed_gives_identical_percentiles():
+    pd.testing.assert_frame_equal(_run(seed=0, processes=1), _run(seed=0, processes=1))
+
+
+def test_seed_is_independent_of_process_count():
+    pd.testing.assert_frame_equal(_run(seed=0, processes=1), _run(seed=0, processes=2))
+
+
+def test_different_seeds_differ():
+    assert not _run(seed=0, processes=1).equals(_run(seed=1, processes=1))
+
+
+def test_percentiles_are_ordered():
+    p = _run(seed=0, processes=1)
+    assert (p["P10"] <= p["P50"]).all()
+    assert (p["P50"] <= p["P90"]).all()
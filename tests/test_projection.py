@@ -0,0 +1,33 @@
+# tests/test_projection.py
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from constants import BLOCK_REWARD, ESTIMATED_HALVING_DATES, MINER_SPECS
+from projection import project, subsidy_schedule
+
+SITE = {"chp_mw": 1.0, "load_factor": 0.95, "roc_rtfo": "None", "eii": "No", "mining_mw": 0.5}
+MARKET = (90_000.0, 1_000.0)
+
+
+def test_subsidy_halves_after_the_start_not_today():
+    halving = np.datetime64(ESTIMATED_HALVING_DATES[0], "D")
+    dates = halving - 2 + np.arange(4)
+    assert list(subsidy_schedule(dates)) == [BLOCK_REWARD] * 2 + [BLOCK_REWARD / 2] * 2
+    # started after that halving, its subsidy is already the one in force
+    assert list(subsidy_schedule(dates[2:])) == [BLOCK_REWARD] * 2
+
+
+def test_projection_halves_btc_on_the_halving_after_its_start():
+    halving = dt.date.fromisoformat(ESTIMATED_HALVING_DATES[0])
+    p = project(**SITE, miners=list(MINER_SPECS)[0], market=MARKET, horizon_years=0.1,
+                start=halving - dt.timedelta(days=10), reward_source="subsidy")
+    assert p.dates[10] == np.datetime64(halving)
+    assert p.btc[0, 10] / p.btc[0, 9] == pytest.approx(0.5, rel=1e-2)
+
+
+@pytest.mark.parametrize("growth", [np.ones(10), lambda t: np.ones(len(t) + 1)])
+def test_growth_array_must_cover_the_horizon(growth):
+    with pytest.raises(ValueError, match="horizon"):
+        project(**SITE, market=MARKET, horizon_years=1, hashrate_growth=growth, reward_source="subsidy")
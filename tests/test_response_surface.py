@@ -0,0 +1,47 @@
+# tests/test_response_surface.py
+import numpy as np
+import pytest
+
+import response_surface
+from calculator import calculate
+from constants import MINER_SPECS, ROC_RTFO_OPTIONS, EII_OPTIONS, FALLBACK_BTC_PRICE, FALLBACK_HASHRATE
+from response_surface import CHP_AXIS, LOAD_AXIS, MINING_AXIS, _axis_values, evaluate, surface_key
+
+MARKET = (FALLBACK_BTC_PRICE, FALLBACK_HASHRATE)
+MODEL = next(iter(MINER_SPECS))
+
+
+@pytest.fixture(scope="module")
+def built():
+    """The surface for MODEL, built synchronously so evaluate() serves from it."""
+    key = surface_key(MODEL, MARKET)
+    assert response_surface._CACHE.get(key, wait=True) is not None
+    return key
+
+
+def _lattice_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        chp = float(rng.choice(_axis_values(CHP_AXIS)))
+        mw = float(rng.choice(_axis_values(MINING_AXIS)[_axis_values(MINING_AXIS) <= chp * 1.1 + 1e-9]))
+        yield (chp, float(rng.choice(_axis_values(LOAD_AXIS))), str(rng.choice(ROC_RTFO_OPTIONS)),
+               str(rng.choice(EII_OPTIONS)), mw)
+
+
+@pytest.mark.parametrize("point", list(_lattice_points(25)))
+def test_surface_matches_calculate(built, point):
+    chp, lf, roc, eii, mw = point
+    got = evaluate(chp, lf, roc, eii, MODEL, mw, MARKET)
+    want = calculate(chp, lf, roc, eii, MODEL, mw, market=MARKET)
+    assert got.keys() == want.keys()
+    for k in want:
+        assert got[k] == pytest.approx(want[k], rel=1e-9, abs=1e-9), k
+
+
+def test_off_lattice_falls_back_to_calculate(built):
+    args = (1.03, 0.955, ROC_RTFO_OPTIONS[0], EII_OPTIONS[0], MODEL, 0.77)
+    assert evaluate(*args, MARKET) == calculate(*args, market=MARKET)
+
+
+def test_miner_spec_shares_the_model_surface(built):
+    assert surface_key(None, MARKET, miner_spec=MINER_SPECS[MODEL]) == built